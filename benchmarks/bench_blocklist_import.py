@@ -0,0 +1,97 @@
+"""
+Blocklist import benchmark: time and peak memory for a large hosts file.
+
+Generates a hosts list (default 500k entries), then measures the first import,
+an unchanged re-import, a re-import after appending entries, and compiling the
+keyword index from the imported tokens, then the memory a matcher built over
+that index costs (the fuzzy index covers the configured keywords only).
+
+Usage:
+    python benchmarks/bench_blocklist_import.py [--entries 500000] [--skip-index]
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+import threading
+
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocklist_import import BlocklistImporter  # noqa: E402
+
+TLDS = ["com", "net", "org", "xxx", "co.uk", "com.br", "ru", "de", "info"]
+
+
+def write_hosts(path: str, entries: int, seed: int = 3, mode: str = "w"):
+    rng = random.Random(seed)
+    with open(path, mode, encoding="utf-8") as f:
+        if mode == "w":
+            f.write("# Generated hosts blocklist\n127.0.0.1 localhost\n")
+        for _ in range(entries):
+            name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 14)))
+            prefix = rng.choice(["", "www.", "cdn.", "m."])
+            f.write(f"0.0.0.0 {prefix}{name}.{rng.choice(TLDS)}\n")
+
+
+def measure(label: str, fn):
+    """
+    Run fn and report wall time and peak RSS growth, sampled every 10 ms so the
+    timing is not distorted the way tracemalloc would distort it.
+    """
+    process = psutil.Process()
+    baseline = process.memory_info().rss
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.01):
+            peak[0] = max(peak[0], process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    peak[0] = max(peak[0], process.memory_info().rss)
+    print(f"{label:<28} {elapsed:>8.2f} s {(peak[0] - baseline) / 2**20:>9.1f} MiB peak RSS growth")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blocklist import time and peak memory")
+    parser.add_argument("--entries", type=int, default=500000)
+    parser.add_argument("--skip-index", action="store_true", help="Do not compile the keyword index")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hosts = os.path.join(tmp, "hosts.txt")
+        write_hosts(hosts, args.entries)
+        print(f"{args.entries} entries, {os.path.getsize(hosts) / 2**20:.1f} MiB")
+        importer = BlocklistImporter(os.path.join(tmp, "store"))
+
+        first = measure("first import", lambda: importer.import_source(hosts))
+        print(f"  {first.tokens} unique tokens")
+        measure("unchanged re-import", lambda: importer.import_source(hosts))
+        write_hosts(hosts, 1000, seed=4, mode="a")
+        update = measure("re-import after +1000", lambda: importer.import_source(hosts))
+        print(f"  +{update.added} -{update.removed}")
+        if not args.skip_index:
+            automaton = measure("compile index", lambda: importer.build_index(["porn"], os.path.join(tmp, "keywords.idx")))
+            print(f"  {len(automaton)} keywords, {automaton.state_count} states")
+            measure("index up to date", lambda: importer.build_index(["porn"], os.path.join(tmp, "keywords.idx")))
+            from config import DEFAULT_CONFIG, build_matcher
+            del automaton
+            matcher = measure("build matcher on index", lambda: build_matcher(
+                dict(DEFAULT_CONFIG, keyword_index=os.path.join(tmp, "keywords.idx"))))
+            print(f"  {len(matcher.automaton)} keywords, {len(matcher.fuzzy_index)} fuzzy")
+
+
+if __name__ == "__main__":
+    main()
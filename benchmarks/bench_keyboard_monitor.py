@@ -0,0 +1,213 @@
+"""
+Keystroke throughput and latency benchmark for KeyboardMonitor.
+
+Drives on_press with synthetic pynput-compatible key objects, headless and with a
+stub lock_callback, over generated and recorded keystroke streams and keyword
+sets of different sizes. Reports per-key p50/p99 latency for the hook
+(on_press, enqueue only) and for detection (draining the queue), keys/sec and
+allocations.
+
+Usage:
+    python benchmarks/bench_keyboard_monitor.py
+    python benchmarks/bench_keyboard_monitor.py --keywords 10,1000 --streams burst,backspace --keys 20000
+    python benchmarks/bench_keyboard_monitor.py --replay benchmarks/streams/sample_session.txt
+    python benchmarks/bench_keyboard_monitor.py --max-p99-us 50   # exit 1 on regression
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tracemalloc
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from keyboard_monitor import KeyboardMonitor  # noqa: E402
+
+STREAMS_DIR = os.path.join(os.path.dirname(__file__), "streams")
+COMMON_LETTERS = "etaoinshrdlucmfwypvbgkqjxz"
+
+
+class SyntheticKeyCode:
+    """
+    Stand-in for pynput.keyboard.KeyCode: a printable key with a char.
+    """
+    __slots__ = ("char",)
+
+    def __init__(self, char: str):
+        self.char = char
+
+
+class SyntheticKey:
+    """
+    Stand-in for a pynput.keyboard.Key member: a special key with a name and no char.
+    """
+    __slots__ = ("name",)
+    char = None
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+SPACE = SyntheticKey("space")
+BACKSPACE = SyntheticKey("backspace")
+ENTER = SyntheticKey("enter")
+SHIFT = SyntheticKey("shift")
+
+
+def make_keywords(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(count)]
+
+
+def _word(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choices(COMMON_LETTERS[:16], k=rng.randint(low, high)))
+
+
+def generate_stream(kind: str, keys: int, seed: int = 2) -> List[object]:
+    """
+    Build a synthetic keystroke stream.
+
+    Kinds:
+        burst: fast typing of short words with spaces and the odd Enter.
+        backspace: typing where roughly a third of the keys are backspaces.
+        longword: long unbroken runs of letters with no separators.
+    """
+    rng = random.Random(seed)
+    stream: List[object] = []
+    while len(stream) < keys:
+        if kind == "burst":
+            stream.extend(SyntheticKeyCode(c) for c in _word(rng, 2, 9))
+            stream.append(ENTER if rng.random() < 0.05 else SPACE)
+        elif kind == "backspace":
+            for c in _word(rng, 3, 10):
+                stream.append(SyntheticKeyCode(c))
+                if rng.random() < 0.5:
+                    stream.extend([BACKSPACE] * rng.randint(1, 2))
+            stream.append(SPACE)
+        elif kind == "longword":
+            stream.extend(SyntheticKeyCode(c) for c in _word(rng, 200, 400))
+            stream.append(SPACE)
+        else:
+            raise ValueError(f"Unknown stream kind: {kind}")
+    return stream[:keys]
+
+
+def load_recorded_stream(path: str) -> List[object]:
+    """
+    Replay a recorded session. Text is typed as-is; newlines are Enter and the
+    tokens <BS>, <ENTER>, <SHIFT> stand for the special keys.
+    """
+    specials = {"<BS>": BACKSPACE, "<ENTER>": ENTER, "<SHIFT>": SHIFT}
+    stream: List[object] = []
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    i = 0
+    while i < len(text):
+        if text[i] == "<":
+            end = text.find(">", i)
+            token = text[i:end + 1]
+            if token in specials:
+                stream.append(specials[token])
+                i = end + 1
+                continue
+        char = text[i]
+        stream.append(ENTER if char == "\n" else SPACE if char == " " else SyntheticKeyCode(char))
+        i += 1
+    return stream
+
+
+def _percentile(samples: List[int], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] / 1000
+
+
+def run_benchmark(monitor: KeyboardMonitor, stream: List[object]) -> Dict[str, float]:
+    """
+    Time each key through the hook and through detection, then measure allocations
+    in a separate pass so tracemalloc does not skew the latencies.
+    """
+    hook_ns: List[int] = []
+    detect_ns: List[int] = []
+    perf = time.perf_counter_ns
+    on_press, process_pending = monitor.on_press, monitor.process_pending
+
+    started = perf()
+    for key in stream:
+        t0 = perf()
+        on_press(key)
+        t1 = perf()
+        process_pending()
+        t2 = perf()
+        hook_ns.append(t1 - t0)
+        detect_ns.append(t2 - t1)
+    elapsed = (perf() - started) / 1e9
+
+    monitor.reset()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for key in stream:
+        on_press(key)
+        process_pending()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    hook_ns.sort()
+    detect_ns.sort()
+    return {
+        "keys": len(stream),
+        "keys_per_sec": len(stream) / elapsed if elapsed else float("inf"),
+        "hook_p50_us": _percentile(hook_ns, 0.50),
+        "hook_p99_us": _percentile(hook_ns, 0.99),
+        "detect_p50_us": _percentile(detect_ns, 0.50),
+        "detect_p99_us": _percentile(detect_ns, 0.99),
+        "retained_bytes": after - before,
+        "peak_bytes_per_key": (peak - before) / max(1, len(stream)),
+    }
+
+
+def build_monitor(keywords: List[str], fuzzy: int, detections: List[int]) -> KeyboardMonitor:
+    def on_detect():
+        detections[0] += 1
+
+    return KeyboardMonitor(keywords=keywords, lock_callback=on_detect, fuzzy_distance=fuzzy)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keywords", default="10,1000,100000", help="Comma-separated keyword set sizes")
+    parser.add_argument("--streams", default="burst,backspace,longword", help="Generated stream kinds")
+    parser.add_argument("--replay", action="append", default=[], help="Recorded stream file (repeatable)")
+    parser.add_argument("--keys", type=int, default=20000, help="Keys per generated stream")
+    parser.add_argument("--fuzzy", type=int, default=0, help="fuzzy_distance passed to KeyboardMonitor")
+    parser.add_argument("--max-p99-us", type=float, default=None, help="Fail if any detection p99 exceeds this")
+    args = parser.parse_args(argv)
+
+    streams = {kind: generate_stream(kind, args.keys) for kind in args.streams.split(",") if kind}
+    replays = args.replay
+    if not replays and os.path.isdir(STREAMS_DIR):
+        replays = [os.path.join(STREAMS_DIR, name) for name in sorted(os.listdir(STREAMS_DIR))]
+    for path in replays:
+        streams[f"replay:{os.path.basename(path)}"] = load_recorded_stream(path)
+
+    header = f"{'keywords':>8} {'stream':<28} {'keys/s':>10} {'hook p50':>9} {'hook p99':>9} {'det p50':>9} {'det p99':>9} {'B/key peak':>10} {'hits':>5}"
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for size in (int(n) for n in args.keywords.split(",")):
+        keywords = make_keywords(size)
+        for name, stream in streams.items():
+            detections = [0]
+            monitor = build_monitor(keywords, args.fuzzy, detections)
+            result = run_benchmark(monitor, stream)
+            print(f"{size:>8} {name:<28} {result['keys_per_sec']:>10.0f} {result['hook_p50_us']:>9.2f} {result['hook_p99_us']:>9.2f} "
+                  f"{result['detect_p50_us']:>9.2f} {result['detect_p99_us']:>9.2f} {result['peak_bytes_per_key']:>10.1f} {detections[0]:>5}")
+            if args.max_p99_us is not None and result["detect_p99_us"] > args.max_p99_us:
+                failed = True
+    print("latencies in microseconds per key")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
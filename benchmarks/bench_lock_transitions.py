@@ -0,0 +1,60 @@
+"""
+Lock/unlock transition latency with the recording command backend.
+
+Each recorded command sleeps for a simulated netsh latency, so the numbers show
+what parallel execution buys over running the same steps one after another.
+
+Usage:
+    python benchmarks/bench_lock_transitions.py [--latency 0.15] [--runs 5]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from command_runner import RecordingCommandRunner  # noqa: E402
+from lockdown import Lockdown  # noqa: E402
+
+
+class SequentialRunner(RecordingCommandRunner):
+    """
+    Baseline: the former behaviour, one command after another.
+    """
+
+    def run_parallel(self, commands, timeout=None):
+        return [self.run(args, timeout) for args in commands]
+
+
+def measure(runner_class, latency: float, runs: int):
+    lock_times, unlock_times = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        lockdown = Lockdown(lock_file=os.path.join(tmp, "lockdown.json"), command_runner=runner_class(latency=latency))
+        for _ in range(runs):
+            started = time.perf_counter()
+            lockdown._disable_internet()
+            lock_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            lockdown.unlock_system()
+            unlock_times.append(time.perf_counter() - started)
+        lockdown.journal.close()
+    return statistics.median(lock_times), statistics.median(unlock_times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lock/unlock transition latency")
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated seconds per command")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12} {'lock ms':>9} {'unlock ms':>10}")
+    for name, runner_class in (("sequential", SequentialRunner), ("parallel", RecordingCommandRunner)):
+        lock, unlock = measure(runner_class, args.latency, args.runs)
+        print(f"{name:<12} {lock * 1000:>9.1f} {unlock * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
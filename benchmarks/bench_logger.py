@@ -0,0 +1,82 @@
+"""
+Caller-side cost of logging: synchronous handlers vs the queued writer in logger.py,
+and the keystroke path with the queued writer active.
+
+Usage: python benchmarks/bench_logger.py [records]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import logger  # noqa: E402
+
+
+def percentiles(samples_ns):
+    samples_ns.sort()
+    count = len(samples_ns)
+    return (samples_ns[count // 2] / 1e3, samples_ns[int(count * 0.99)] / 1e3, samples_ns[-1] / 1e3)
+
+
+def time_calls(log, records, level=logging.INFO):
+    samples = []
+    for i in range(records):
+        started = time.perf_counter_ns()
+        log.log(level, f"keystroke {i} handled")
+        samples.append(time.perf_counter_ns() - started)
+    return percentiles(samples)
+
+
+def bench_synchronous(path, records):
+    # What main.py used to do: basicConfig with a FileHandler and a console StreamHandler
+    root = logging.getLogger()
+    handlers = [logging.FileHandler(path), logging.StreamHandler(open(os.devnull, "w"))]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(logger.DEFAULT_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    try:
+        return time_calls(logging.getLogger("keyboard_monitor"), records)
+    finally:
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+
+def bench_keystroke_path(records):
+    from keyboard_monitor import KeyboardMonitor
+
+    monitor = KeyboardMonitor(keywords=["porn", "nude", "xxx"], lock_callback=lambda: None)
+    keys = [SimpleNamespace(char=char) for char in ("the quick brown fox " * (records // 20 + 1))[:records]]
+    samples = []
+    for key in keys:
+        started = time.perf_counter_ns()
+        monitor.on_press(key)
+        monitor.process_pending()
+        samples.append(time.perf_counter_ns() - started)
+    return percentiles(samples)
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        sync = bench_synchronous(os.path.join(tmp, "sync.log"), records)
+        logger.configure(level="INFO", console=False, log_file=os.path.join(tmp, "queued.log"))
+        log = logger.get_logger("keyboard_monitor")
+        queued = time_calls(log, records)
+        disabled = time_calls(log, records, level=logging.DEBUG)
+        keystrokes = bench_keystroke_path(records)
+        logger.shutdown()
+
+    print(f"{records} calls per scenario, microseconds (p50 / p99 / max)")
+    for label, (p50, p99, worst) in (("synchronous file + console", sync), ("queued batched writer", queued),
+                                     ("DEBUG call with DEBUG off", disabled), ("keystroke enqueue + detect", keystrokes)):
+        print(f"  {label:28s} {p50:8.2f} {p99:8.2f} {worst:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
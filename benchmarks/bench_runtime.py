@@ -0,0 +1,111 @@
+"""
+Threads, context switches and wakeups of the agent's background machinery:
+one thread per component (consumer thread plus a Scheduler each for lockdown,
+config watching and stats) versus everything on one runtime.Runtime loop.
+
+Each mode runs in a fresh interpreter. It sits idle for a while and then types
+in short bursts, like a user would. Nothing is locked and no keyboard hook is
+installed.
+
+Usage:
+    python benchmarks/bench_runtime.py [--idle 10] [--typing 5]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+CHILD = r"""
+import os, sys, json, time, tempfile, threading
+from types import SimpleNamespace
+sys.path.insert(0, SRC_DIR)
+import psutil
+import metrics
+from lockdown import Lockdown
+from keyboard_monitor import KeyboardMonitor
+from config import ConfigWatcher
+from runtime import Runtime
+
+
+def ctx_switches():
+    # /proc/self/status only covers the main thread; sum every thread where possible
+    task_dir = "/proc/self/task"
+    if os.path.isdir(task_dir):
+        total = 0
+        for tid in os.listdir(task_dir):
+            try:
+                with open(os.path.join(task_dir, tid, "status")) as f:
+                    for line in f:
+                        if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+                            total += int(line.split()[1])
+            except OSError:
+                pass
+        return total
+    switches = psutil.Process().num_ctx_switches()
+    return switches.voluntary + switches.involuntary
+
+
+tmp = tempfile.mkdtemp()
+config_path = os.path.join(tmp, "config.json")
+runtime = Runtime() if MODE == "runtime" else None
+if runtime is not None:
+    runtime.start()
+lockdown = Lockdown(lock_file=os.path.join(tmp, "lockdown.json"), scheduler=runtime,
+                    executor=runtime.executor if runtime else None)
+monitor = KeyboardMonitor(keywords=["haram"], lockdown=lockdown, lock_callback=lambda: None)
+monitor.start_consumer(runtime)
+watcher = ConfigWatcher(lambda config: None, config_path, scheduler=runtime)
+watcher.start()
+stats = metrics.StatsWriter(os.path.join(tmp, "stats.json"), scheduler=runtime)
+stats.start()
+time.sleep(0.5)
+
+result = {"threads": threading.active_count()}
+before = ctx_switches()
+time.sleep(IDLE)
+result["idle_switches_per_s"] = (ctx_switches() - before) / IDLE
+
+before = ctx_switches()
+keys = [SimpleNamespace(char=c) for c in "the quick brown fox jumps "]
+deadline = time.monotonic() + TYPING
+typed = 0
+while time.monotonic() < deadline:
+    for key in keys[:6]:  # A short burst, then a pause
+        monitor.on_press(key)
+        typed += 1
+        time.sleep(0.03)
+    time.sleep(0.2)
+time.sleep(0.1)
+result["typing_switches_per_key"] = (ctx_switches() - before) / typed
+result["processed"] = monitor.processed_events == typed
+print(json.dumps(result))
+os._exit(0)
+"""
+
+
+def run_mode(mode: str, idle: float, typing: float) -> dict:
+    code = f"MODE = {mode!r}\nSRC_DIR = {SRC_DIR!r}\nIDLE = {idle}\nTYPING = {typing}\n" + CHILD
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=idle + typing + 60)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threads and wakeups: per-component threads vs one runtime loop")
+    parser.add_argument("--idle", type=float, default=10.0, help="Idle seconds measured")
+    parser.add_argument("--typing", type=float, default=5.0, help="Seconds of simulated typing")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'threads':>8} {'idle switches/s':>16} {'switches/key':>13} {'all keys':>9}")
+    for mode in ("threads", "runtime"):
+        result = run_mode(mode, args.idle, args.typing)
+        print(f"{mode:<10} {result['threads']:>8} {result['idle_switches_per_s']:>16.1f} "
+              f"{result['typing_switches_per_key']:>13.2f} {str(result['processed']):>9}")
+
+
+if __name__ == "__main__":
+    main()
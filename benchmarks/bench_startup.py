@@ -0,0 +1,125 @@
+"""
+Startup latency: time from process launch until a persisted lock is enforced
+again and until the keyboard listener is up.
+
+Source mode (default) launches fresh interpreters on the staged boot in
+src/boot.py with an active lock in a temporary state directory. Commands are
+recorded and nothing is killed, so it is safe to run on a workstation. Without
+a desktop session the keyboard hook cannot start; the listener phase then only
+starts the detection thread.
+
+Build mode compares PyInstaller layouts by launching each EXE with
+--exit-after-boot (no persisted lock) and timing it until it exits:
+
+    python src/build.py            # dist/ImaanGuard.exe (one-file, unpacks on every launch)
+    python src/build.py --onedir   # dist/ImaanGuard/ImaanGuard.exe
+    python benchmarks/bench_startup.py --exe dist/ImaanGuard.exe --exe dist/ImaanGuard/ImaanGuard.exe
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--exe PATH ...]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+CHILD = r"""
+import time
+started = time.perf_counter()
+import sys
+from contextlib import contextmanager
+sys.path.insert(0, SRC_DIR)
+from boot import BootTimer, run
+
+
+class BenchTimer(BootTimer):
+    @contextmanager
+    def phase(self, name):
+        with super().phase(name):  # Patches are applied inside the phase so its imports are still counted
+            if name == "restore":
+                import lockdown
+                from command_runner import RecordingCommandRunner
+                lockdown.create_command_runner = RecordingCommandRunner  # Never run netsh or kill anything here
+                lockdown.Lockdown._enforce_restrictions = lambda self: 0
+            elif name == "listener":
+                try:
+                    import pynput.keyboard  # noqa: F401
+                except Exception:
+                    import keyboard_monitor
+                    keyboard_monitor.KeyboardMonitor.start = keyboard_monitor.KeyboardMonitor.start_consumer
+            yield
+
+
+report = run(CONFIG_PATH, timer=BenchTimer(started), exit_after_boot=True)
+print(json.dumps(report))
+"""
+
+
+def _persist_lock(state_dir: str):
+    sys.path.insert(0, SRC_DIR)
+    from session_manager import SessionJournal
+
+    os.makedirs(os.path.join(state_dir, "data"), exist_ok=True)
+    journal = SessionJournal(os.path.join(state_dir, "data", "lockdown.json"))
+    journal.append({'is_locked': True, 'lock_end_time': time.time() + 3600, 'violation_count': 2}, durable=True)
+    journal.close()
+
+
+def measure_source(runs: int):
+    walls, reports = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as state_dir:
+            _persist_lock(state_dir)
+            config_path = os.path.join(state_dir, "config.json")
+            code = (f"import json\nSRC_DIR = {SRC_DIR!r}\nCONFIG_PATH = {config_path!r}\n" + CHILD)
+            started = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", code], cwd=state_dir, capture_output=True, text=True)
+            walls.append(time.perf_counter() - started)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr)
+            reports.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return walls, reports
+
+
+def measure_exe(path: str, runs: int):
+    walls = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as state_dir:
+            started = time.perf_counter()
+            subprocess.run([os.path.abspath(path), "--exit-after-boot"], cwd=state_dir, capture_output=True, timeout=120)
+            walls.append(time.perf_counter() - started)
+    return walls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--exe", action="append", default=[], help="Built EXE to launch (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.exe:
+        print(f"{'executable':<40} {'median ms':>10} {'min ms':>8}")
+        for path in args.exe:
+            walls = measure_exe(path, args.runs)
+            print(f"{path:<40} {statistics.median(walls) * 1000:>10.0f} {min(walls) * 1000:>8.0f}")
+        return
+
+    walls, reports = measure_source(args.runs)
+    launch = statistics.median(r["launch"].get("process_start", 0.0) for r in reports)
+    print(f"interpreter start before main: {launch:8.1f} ms")
+    print(f"{'phase':<12} {'phase ms':>9} {'ready ms':>9}")
+    for phase in reports[0]["phases"]:
+        duration = statistics.median(r["phases"][phase] for r in reports)
+        ready = statistics.median(r["ready"][phase] for r in reports)
+        print(f"{phase:<12} {duration:>9.1f} {ready:>9.1f}")
+    print(f"process wall time (launch to exit): {statistics.median(walls) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,18 @@ import os
 import time
 import psutil
 import subprocess
-import logging
+import threading
 from typing import Optional
+from logger import configure as configure_logging, get_logger
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] [Watchdog.%(funcName)s]: %(message)s",
-    handlers=[logging.StreamHandler()]
-)
+logger = get_logger(__name__)
 
 class Watchdog:
+    WAIT_SLICE = 1.0  # Seconds per blocking wait on the target handle, so stop() is noticed
+    MIN_BACKOFF = 0.5  # Delay before the second quick restart in a row, doubled for each further one
+    MAX_BACKOFF = 30.0
+    STABLE_AFTER = 60.0  # A target that ran this long resets the backoff
+
     def __init__(self, target_process: str = "python.exe", target_script: Optional[str] = "main.py", target_exe: Optional[str] = None):
         """
         Initialize the watchdog to monitor and restart the main ImaanGuard process.
@@ -22,38 +23,105 @@ class Watchdog:
             target_script: Script to relaunch if using Python (e.g., 'main.py').
             target_exe: Path to executable if bundled (e.g., 'dist/ImaanGuard.exe').
         """
-        logging.debug("Initializing watchdog")
+        logger.debug("Initializing watchdog")
         self.target_process = target_process.lower()
         self.target_script = target_script
         self.target_exe = target_exe
         self.running = False
         self.target_pid = None
-        logging.info("Watchdog initialized")
+        self.restarts = 0
+        self.last_restart_latency = None  # Seconds from target exit to relaunch
+        self._child = None  # Popen handle when the watchdog launched the target itself
+        self._stop_event = threading.Event()
+        logger.info("Watchdog initialized")
 
     def start(self):
         """
         Start the watchdog monitoring loop.
+
+        The target is found once (by scanning only if its PID is unknown) or
+        launched, then the watchdog blocks on the process handle until it exits
+        and relaunches it immediately. Repeated quick exits back off exponentially.
         """
-        logging.info("Starting watchdog")
+        logger.info("Starting watchdog")
         self.running = True
+        self._stop_event.clear()
+        quick_exits = 0
         try:
             while self.running:
-                if not self._is_target_running():
-                    logging.warning("Target process not running, attempting restart")
+                proc = self._attach()
+                if proc is None:
+                    logger.warning("Target process not running, attempting restart")
                     self._restart_target()
-                time.sleep(5)  # Check every 5 seconds
+                    proc = self._attach()
+                    if proc is None:
+                        quick_exits += 1
+                        self._stop_event.wait(self._backoff(quick_exits))
+                        continue
+
+                started = time.monotonic()
+                self._wait_for_exit(proc)
+                if not self.running:
+                    break
+                exited = time.monotonic()
+                logger.warning(f"Target process exited (PID: {self.target_pid}), restarting")
+                self.target_pid = None
+
+                quick_exits = 0 if exited - started >= self.STABLE_AFTER else quick_exits + 1
+                if self._stop_event.wait(self._backoff(quick_exits)):
+                    break
+                self._restart_target()
+                self.last_restart_latency = time.monotonic() - exited
         except KeyboardInterrupt:
-            logging.info("Watchdog interrupted, stopping")
+            logger.info("Watchdog interrupted, stopping")
             self.stop()
         except Exception as e:
-            logging.error(f"Error in watchdog loop: {e}")
+            logger.error(f"Error in watchdog loop: {e}")
 
     def stop(self):
         """
         Stop the watchdog.
         """
-        logging.info("Stopping watchdog")
+        logger.info("Stopping watchdog")
         self.running = False
+        self._stop_event.set()
+
+    def _backoff(self, quick_exits: int) -> float:
+        """
+        Delay before the next restart: none for an isolated exit, then MIN_BACKOFF
+        doubling up to MAX_BACKOFF while the target keeps exiting quickly.
+        """
+        if quick_exits <= 1:
+            return 0.0
+        return min(self.MAX_BACKOFF, self.MIN_BACKOFF * 2 ** (quick_exits - 2))
+
+    def _attach(self) -> Optional[psutil.Process]:
+        """
+        Return a handle on the target, scanning the process table only if its PID is unknown.
+        """
+        if self.target_pid is None and not self._is_target_running():
+            return None
+        try:
+            return psutil.Process(self.target_pid)
+        except psutil.NoSuchProcess:
+            self.target_pid = None
+            return None
+
+    def _wait_for_exit(self, proc: psutil.Process):
+        """
+        Block on the process handle until the target exits or the watchdog stops.
+        """
+        while self.running:
+            try:
+                if self._child is not None and self._child.pid == proc.pid:
+                    self._child.wait(timeout=self.WAIT_SLICE)  # Also reaps our own child
+                else:
+                    proc.wait(timeout=self.WAIT_SLICE)
+                return
+            except (psutil.TimeoutExpired, subprocess.TimeoutExpired):
+                continue
+            except psutil.NoSuchProcess:
+                return
 
     def _is_target_running(self) -> bool:
         """
@@ -62,64 +130,63 @@ class Watchdog:
         Returns:
             bool: True if target process is running, False otherwise.
         """
-        logging.debug(f"Checking if {self.target_process} is running")
+        logger.debug(f"Checking if {self.target_process} is running")
         try:
             for proc in psutil.process_iter(['name', 'pid', 'cmdline']):
-                proc_name = proc.info['name'].lower()
+                proc_name = (proc.info['name'] or '').lower()
                 if proc_name != self.target_process:
                     continue
                 # For Python, verify it's running the target script
                 if self.target_script and self.target_process == "python.exe":
-                    cmdline = proc.info.get('cmdline', [])
+                    cmdline = proc.info.get('cmdline') or []
                     if not any(self.target_script in arg for arg in cmdline):
                         continue
                 # For .exe, verify it's the target executable
                 if self.target_exe:
-                    cmdline = proc.info.get('cmdline', [])
+                    cmdline = proc.info.get('cmdline') or []
                     if not any(self.target_exe in arg for arg in cmdline):
                         continue
                 self.target_pid = proc.info['pid']
-                logging.debug(f"Target process found, PID: {self.target_pid}")
+                logger.debug(f"Target process found, PID: {self.target_pid}")
                 return True
-            logging.debug("Target process not found")
+            logger.debug("Target process not found")
             self.target_pid = None
             return False
         except psutil.Error as e:
-            logging.error(f"Error checking target process: {e}")
+            logger.error(f"Error checking target process: {e}")
             return False
 
     def _restart_target(self):
         """
-        Restart the target process.
+        Launch the target and keep its handle, so its exit can be waited on directly.
         """
-        logging.debug("Attempting to restart target process")
+        logger.debug("Attempting to restart target process")
+        creationflags = getattr(subprocess, "DETACHED_PROCESS", 0)  # Windows only
         try:
             if self.target_exe:
                 # Launch .exe
-                subprocess.Popen([self.target_exe], creationflags=subprocess.DETACHED_PROCESS)
-                logging.info(f"Restarted {self.target_exe}")
+                self._child = subprocess.Popen([self.target_exe], creationflags=creationflags)
+                logger.info(f"Restarted {self.target_exe}")
             elif self.target_script:
                 # Launch Python script
-                subprocess.Popen(["python", self.target_script], creationflags=subprocess.DETACHED_PROCESS)
-                logging.info(f"Restarted {self.target_script}")
-            else:
-                logging.error("No target executable or script specified")
-            # Wait briefly to confirm restart
-            time.sleep(2)
-            if self._is_target_running():
-                logging.info("Target process successfully restarted")
+                self._child = subprocess.Popen(["python", self.target_script], creationflags=creationflags)
+                logger.info(f"Restarted {self.target_script}")
             else:
-                logging.warning("Failed to restart target process")
+                logger.error("No target executable or script specified")
+                return
+            self.target_pid = self._child.pid
+            self.restarts += 1
         except (subprocess.SubprocessError, OSError) as e:
-            logging.error(f"Error restarting target process: {e}")
+            logger.error(f"Error restarting target process: {e}")
 
 def main():
     """
     Test the watchdog.
     """
-    logging.info("Starting watchdog test")
+    logger.info("Starting watchdog test")
     watchdog = Watchdog(target_process="Python.exe", target_script="main.py")
     watchdog.start()
 
 if __name__ == "__main__":
+    configure_logging(level="DEBUG")
     main()
\ No newline at end of file
@@ -0,0 +1,402 @@
+import os
+import sys
+import json
+import time
+import heapq
+import hashlib
+import tempfile
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from normalizer import Normalizer
+from logger import configure as configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "blocklists")
+
+HOSTS_ADDRESSES = {"0.0.0.0", "127.0.0.1", "::", "::1", "0", "localhost"}
+IGNORED_HOSTS = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback"}
+# Second-level labels of public suffixes such as example.co.uk, so "co" is never taken as the site name
+GENERIC_LABELS = {"co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go", "gen", "biz", "info", "www"}
+MIN_TOKEN_LENGTH = 5  # Shorter domain names match inside ordinary words
+# Everyday words that are also registrable names on blocklists (video.xxx, photos.net). A site
+# name becomes a substring keyword checked against every keystroke, so these would lock the
+# machine on ordinary typing.
+COMMON_WORDS = frozenset('''
+    about admin album apple audio beach black blogs board books cache camera chats cheap
+    china class click cloud clips daily dating drive email faces files flash forum freak
+    games girls glass group guide happy heart hello hotel house image index input items
+    links local lover media model money mobile movie movies music night notes online party
+    photo photos phone pictures place point press radio share shopping short
+    smart space sport stars static store story stream studio style super table teens
+    there thing times today tools topic track trade travel update users video videos
+    viewer watch water world yahoo young youtube
+'''.split())
+MIN_TERM_LENGTH = 3
+SORT_RUN_SIZE = 200_000  # Tokens sorted in memory at once; larger lists are merged from sorted runs on disk
+FORMATS = ("hosts", "domains", "terms")
+
+
+class ImportResult(NamedTuple):
+    source: str
+    changed: bool  # False when the source was unchanged and not parsed again
+    tokens: int
+    added: int
+    removed: int
+    seconds: float
+
+
+def detect_format(path: str) -> str:
+    """
+    Guess the list format from its first entries: hosts file, domain list or term list.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] in "#!":
+                continue
+            first = line.split()[0]
+            if first in HOSTS_ADDRESSES or first.count(".") == 3 and first.replace(".", "").isdigit():
+                return "hosts"
+            if line.startswith("||") or (" " not in line and _is_domain(first)):
+                return "domains"
+            return "terms"
+    return "terms"
+
+
+def iter_entries(path: str, fmt: str) -> Iterator[str]:
+    """
+    Stream the raw entries (domains or terms) of a list, one line at a time.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip() if fmt != "terms" else line.strip()
+            if not line or line[0] in "#!":
+                continue
+            if fmt == "hosts":
+                fields = line.split()
+                if len(fields) < 2 or fields[0] not in HOSTS_ADDRESSES and not fields[0].replace(".", "").isdigit():
+                    continue
+                yield from fields[1:]
+            elif fmt == "domains":
+                # Plain domains and adblock-style "||example.com^" rules
+                yield line.lstrip("|").split("^", 1)[0].split("/", 1)[0]
+            else:
+                yield line
+
+
+def domain_token(domain: str) -> Optional[str]:
+    """
+    The name a user would type for a domain: "cdn.example-site.co.uk" -> "example-site".
+
+    Returns:
+        str or None: None for hosts that yield nothing matchable (localhost, IPs, short names).
+    """
+    domain = domain.strip(".").lower()
+    if domain in IGNORED_HOSTS:
+        return None
+    labels = domain.split(".")
+    if len(labels) < 2 or labels[-1].isdigit():  # Bare names and IPv4 addresses
+        return None
+    labels.pop()  # Top-level domain
+    while len(labels) > 1 and labels[-1] in GENERIC_LABELS:
+        labels.pop()
+    token = labels[-1]
+    if token in GENERIC_LABELS or token in COMMON_WORDS or len(token) < MIN_TOKEN_LENGTH or token.startswith("xn--"):
+        return None
+    return token
+
+
+def _is_domain(entry: str) -> bool:
+    """
+    Whether a list entry looks like a host name rather than a dotted term such as
+    "p.o.r.n": an alphabetic top-level domain and at most one one-letter label.
+    """
+    labels = entry.lstrip("|").split("^", 1)[0].split("/", 1)[0].split(".")
+    if len(labels) < 2 or not all(labels):
+        return False
+    top = labels[-1]
+    return (len(top) >= 2 and (top.isalpha() or top.startswith("xn--"))
+            and sum(len(label) == 1 for label in labels) <= 1)
+
+
+def iter_tokens(path: str, fmt: str, normalizer: Normalizer) -> Iterator[str]:
+    """
+    Stream normalized, matchable tokens from a list (may contain duplicates).
+    """
+    for entry in iter_entries(path, fmt):
+        if fmt == "terms":
+            token = normalizer.text(entry)
+            if len(token) >= MIN_TERM_LENGTH:
+                yield token
+        else:
+            token = domain_token(entry)
+            if token is not None:
+                yield normalizer.text(token)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_tokens(path: str) -> Iterator[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+    except FileNotFoundError:
+        return
+
+
+def _unique(tokens: Iterable[str]) -> Iterator[str]:
+    """
+    Drop repeats from a sorted stream.
+    """
+    previous = None
+    for token in tokens:
+        if token != previous:
+            yield token
+            previous = token
+
+
+def _external_sort(tokens: Iterable[str], directory: str, run_size: int = SORT_RUN_SIZE) -> Iterator[str]:
+    """
+    Sort and deduplicate a token stream holding at most run_size tokens in memory.
+
+    Runs of run_size tokens are sorted and spilled to temporary files in
+    directory, then merged back lazily; a list that fits in one run never
+    touches the disk.
+    """
+    runs: List[str] = []
+    chunk = set()
+    try:
+        for token in tokens:
+            chunk.add(token)
+            if len(chunk) >= run_size:
+                fd, run_path = tempfile.mkstemp(suffix=".run", dir=directory)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.writelines(token + "\n" for token in sorted(chunk))
+                runs.append(run_path)
+                chunk = set()
+        streams = [_read_tokens(run_path) for run_path in runs]
+        yield from _unique(heapq.merge(sorted(chunk), *streams))
+    finally:
+        for run_path in runs:
+            try:
+                os.remove(run_path)
+            except OSError:
+                pass
+
+
+def _diff_counts(old: Iterable[str], new: Iterable[str]):
+    """
+    Count entries added and removed between two sorted, unique streams.
+    """
+    added = removed = 0
+    old_iter, new_iter = iter(old), iter(new)
+    a, b = next(old_iter, None), next(new_iter, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a < b):
+            removed += 1
+            a = next(old_iter, None)
+        elif a is None or b < a:
+            added += 1
+            b = next(new_iter, None)
+        else:
+            a, b = next(old_iter, None), next(new_iter, None)
+    return added, removed
+
+
+class BlocklistImporter:
+    """
+    Imports community blocklists into the keyword index.
+
+    Each source is stream-parsed line by line and reduced to a sorted, deduplicated
+    token file in the store directory, next to a manifest with the source's size,
+    mtime, hash and normalizer fingerprint. Parsing holds at most SORT_RUN_SIZE
+    tokens in memory (an external merge sort). Re-importing skips sources whose
+    manifest still matches, so an update to one list only re-parses that list.
+
+    The index is not built incrementally: when the merged token set changed,
+    compile_index rebuilds the whole automaton in memory from the merged
+    stream, so compiling needs memory proportional to the full index (about
+    440 MiB peak for 500k domains, see benchmarks/bench_blocklist_import.py).
+    It runs as an offline step; the service only maps the result.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, normalizer: Optional[Normalizer] = None):
+        """
+        Args:
+            store_dir: Where per-source token files and manifests are kept.
+            normalizer: Must match the one KeyboardMonitor folds keystrokes with.
+        """
+        self.store_dir = store_dir
+        self.normalizer = normalizer or Normalizer()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _source_id(self, path: str) -> str:
+        absolute = os.path.abspath(path)
+        return f"{os.path.basename(absolute)}-{hashlib.sha1(absolute.encode()).hexdigest()[:10]}"
+
+    def _paths(self, source_id: str):
+        base = os.path.join(self.store_dir, source_id)
+        return base + ".json", base + ".tokens"
+
+    def _manifests(self) -> List[dict]:
+        manifests = []
+        for name in sorted(os.listdir(self.store_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.store_dir, name), "r", encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+        return manifests
+
+    def import_source(self, path: str, fmt: Optional[str] = None) -> ImportResult:
+        """
+        Import one list unless it is unchanged since the last import.
+
+        Args:
+            path: hosts file, domain list or term list.
+            fmt: One of FORMATS; detected from the content if None.
+        """
+        started = time.perf_counter()
+        source_id = self._source_id(path)
+        manifest_path, tokens_path = self._paths(source_id)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+
+        stat = os.stat(path)
+        fingerprint = self.normalizer.fingerprint().hex()
+        # Tokens are folded with the normalizer, so a leet or homoglyph change re-parses the list
+        refold = manifest.get("normalizer") != fingerprint
+        if not refold and manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+            return ImportResult(path, False, manifest["tokens"], 0, 0, time.perf_counter() - started)
+        digest = _file_digest(path)
+        fmt = fmt or manifest.get("format") or detect_format(path)
+        if not refold and manifest.get("sha256") == digest and manifest.get("format") == fmt:
+            changed = False
+            added = removed = 0
+            count = manifest["tokens"]
+        else:
+            tmp_path = tokens_path + ".tmp"
+            count = 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for token in _external_sort(iter_tokens(path, fmt, self.normalizer), self.store_dir):
+                    f.write(token + "\n")
+                    count += 1
+            added, removed = _diff_counts(_read_tokens(tokens_path), _read_tokens(tmp_path))
+            os.replace(tmp_path, tokens_path)
+            changed = bool(added or removed) or refold
+
+        manifest = {"source": os.path.abspath(path), "format": fmt, "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns, "sha256": digest, "normalizer": fingerprint, "tokens": count}
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        result = ImportResult(path, changed, count, added, removed, time.perf_counter() - started)
+        logger.info(f"Imported {path} ({fmt}): {count} tokens, +{added} -{removed} in {result.seconds:.2f}s")
+        return result
+
+    def remove_source(self, path: str) -> bool:
+        """
+        Forget a previously imported list. Returns True if it was known.
+        """
+        removed = False
+        for store_path in self._paths(self._source_id(path)):
+            if os.path.exists(store_path):
+                os.remove(store_path)
+                removed = True
+        return removed
+
+    def sync(self, paths: List[str]) -> List[ImportResult]:
+        """
+        Make the store hold exactly the given lists: import each and drop the rest.
+        """
+        wanted = {self._source_id(path) for path in paths}
+        results = []
+        for manifest in self._manifests():
+            if self._source_id(manifest["source"]) not in wanted:
+                self.remove_source(manifest["source"])
+                results.append(ImportResult(manifest["source"], True, 0, 0, manifest["tokens"], 0.0))
+        results.extend(self.import_source(path) for path in paths)
+        return results
+
+    def tokens(self) -> Iterator[str]:
+        """
+        Stream the union of every imported list, sorted and deduplicated.
+        """
+        streams = [_read_tokens(self._paths(self._source_id(m["source"]))[1]) for m in self._manifests()]
+        return _unique(heapq.merge(*streams))
+
+    def build_index(self, keywords: Iterable[str], index_path: str, force: bool = False):
+        """
+        Compile the hand-written keywords and all imported tokens into the keyword index,
+        from scratch, unless neither changed since the last build. Sources imported with
+        a different normalizer are imported again first.
+
+        Returns:
+            KeywordAutomaton or None: None if the index is up to date and force is False.
+        """
+        from keyword_index import compile_index
+
+        stamp_path = os.path.join(self.store_dir, "index.stamp")
+        fingerprint = self.normalizer.fingerprint().hex()
+        for manifest in self._manifests():
+            if manifest.get("normalizer") != fingerprint:
+                logger.info(f"Normalizer changed since {manifest['source']} was imported, importing it again")
+                self.import_source(manifest["source"], manifest["format"])
+        keywords = sorted({self.normalizer.text(k) for k in keywords if k})
+        state = hashlib.sha256(fingerprint.encode())
+        for manifest in self._manifests():
+            state.update(manifest["sha256"].encode())
+        state.update("\n".join(keywords).encode("utf-8"))
+        stamp = f"{os.path.abspath(index_path)}:{state.hexdigest()}"
+        try:
+            with open(stamp_path, "r") as f:
+                up_to_date = f.read() == stamp and os.path.exists(index_path)
+        except FileNotFoundError:
+            up_to_date = False
+        if up_to_date and not force:
+            logger.info("Keyword index already up to date")
+            return None
+
+        automaton = compile_index(heapq.merge(keywords, self.tokens()), index_path, normalizer=self.normalizer)
+        with open(stamp_path, "w") as f:
+            f.write(stamp)
+        return automaton
+
+
+def main():
+    """
+    Import blocklists and rebuild the keyword index.
+
+    Usage: python blocklist_import.py [list ...]
+    Without arguments the lists named in data/config.json ("blocklists") are imported.
+    """
+    from config import DEFAULT_CONFIG_PATH, load_config
+    from keyword_index import DEFAULT_INDEX_PATH, read_keyword_source
+
+    config = load_config(DEFAULT_CONFIG_PATH)
+    sources = sys.argv[1:] or config["blocklists"]
+    importer = BlocklistImporter(normalizer=Normalizer(leet=config["leet"]))
+    for result in importer.sync(sources):
+        state = "updated" if result.changed else "unchanged"
+        print(f"{result.source}: {state}, {result.tokens} tokens (+{result.added} -{result.removed}) in {result.seconds:.2f}s")
+
+    keywords = list(config["keywords"])
+    for source in config["keyword_files"]:
+        keywords.extend(read_keyword_source(source))
+    index_path = config["keyword_index"] or DEFAULT_INDEX_PATH
+    automaton = importer.build_index(keywords, index_path)
+    if automaton is not None:
+        print(f"Compiled {len(automaton)} keywords into {index_path}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,163 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from logger import get_logger
+from config import DEFAULT_CONFIG_PATH, load_config
+import metrics
+
+logger = get_logger(__name__)
+
+
+class BootTimer:
+    """
+    Wall time of each startup phase, logged once boot completes and exported as
+    boot.<phase>_ms gauges in the stats file.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        """
+        Args:
+            started: time.perf_counter() taken as early as possible in the entry script.
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.phases: Dict[str, float] = {}  # Milliseconds per phase, in boot order
+        self.ready: Dict[str, float] = {}  # Milliseconds from start until each phase finished
+
+    @contextmanager
+    def phase(self, name: str):
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            self.phases[name] = (finished - phase_started) * 1000
+            self.ready[name] = (finished - self.started) * 1000
+            metrics.gauge(f"boot.{name}_ms").set(round(self.phases[name], 2))
+
+    def launch_overhead(self) -> Dict[str, float]:
+        """
+        Milliseconds spent before the entry script ran: interpreter startup and,
+        for a one-file build, the bootloader unpacking the bundle.
+        """
+        overhead = {}
+        try:
+            import psutil  # Already loaded by lockdown when called after the restore phase
+            process = psutil.Process()
+            started_at = time.time() - (time.perf_counter() - self.started)
+            overhead["process_start"] = max(0.0, (started_at - process.create_time()) * 1000)
+            parent = process.parent()
+            # A one-file build runs as a child of the bootloader, which is the same executable
+            if getattr(sys, "frozen", False) and parent is not None and parent.exe() == process.exe():
+                overhead["unpack"] = max(0.0, (process.create_time() - parent.create_time()) * 1000)
+        except Exception as e:
+            logger.debug(f"Launch overhead unavailable: {e}")
+        for name, value in overhead.items():
+            metrics.gauge(f"boot.{name}_ms").set(round(value, 2))
+        return overhead
+
+    def report(self) -> dict:
+        report = {"phases": dict(self.phases), "ready": dict(self.ready), "launch": self.launch_overhead()}
+        phases = ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.phases.items())
+        launch = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["launch"].items())
+        logger.info(f"Boot finished in {(time.perf_counter() - self.started) * 1000:.1f} ms ({phases})"
+                    + (f", before main: {launch}" if launch else ""))
+        return report
+
+
+def run(config_path: str = DEFAULT_CONFIG_PATH, timer: Optional[BootTimer] = None, exit_after_boot: bool = False,
+        runtime=None, engine: bool = False):
+    """
+    Boot and run the agent on one runtime.Runtime event loop until it is stopped.
+
+    Args:
+        config_path: Config file.
+        timer: Phase timer; pass one created at the top of the entry script to include its imports.
+        exit_after_boot: Stop everything once booted (used to measure startup).
+        runtime: Runtime to run on, e.g. one the Windows service stops from its control handler.
+        engine: Serve session agents over IPC instead of hooking the keyboard in this process.
+
+    Returns:
+        dict: The boot report when exit_after_boot is set.
+    """
+    from runtime import Runtime
+
+    runtime = runtime or Runtime()
+    return runtime.run(boot(runtime, config_path, timer or BootTimer(), exit_after_boot, engine))
+
+
+async def boot(runtime, config_path: str, timer: BootTimer, exit_after_boot: bool = False,
+               engine: bool = False) -> dict:
+    """
+    Staged startup, run as the first task on the runtime loop.
+
+    A lock persisted by the previous run is restored and enforced first, with
+    only lockdown's own dependencies imported. The matcher, the keyboard
+    listener and the background services are loaded afterwards, so a reboot
+    during a lock never leaves a window in which the lock is lifted. Every
+    component registers its cleanup with the runtime, which runs it in
+    reverse order on shutdown.
+
+    In engine mode (the Windows service) the listener phase starts the IPC
+    server instead of a keyboard hook; session agents stream keys to it.
+    """
+    with timer.phase("config"):
+        config = load_config(config_path)
+        from diagnostics import start_diagnostics
+        # Before the matcher is built, so its allocations are traced
+        diagnostics = start_diagnostics(config, scheduler=runtime, executor=runtime.executor)
+        if diagnostics:
+            runtime.on_shutdown(diagnostics.stop, "diagnostics")
+
+    with timer.phase("restore"):
+        from lockdown import Lockdown
+        lockdown = Lockdown(config=config, scheduler=runtime, executor=runtime.executor)
+        runtime.on_shutdown(lockdown.close, "lockdown")
+        lockdown.check_and_reapply_lock()
+
+    with timer.phase("matcher"):
+        # Keywords come from data/config.json; the compiled index from the build step
+        # (python keyword_index.py) takes precedence over the keyword list. Built off
+        # the loop, so enforcement of a restored lock keeps running meanwhile.
+        from config import build_matcher
+        matcher = await runtime.run_blocking(build_matcher, config)
+        logger.debug(f"Blocked keywords loaded: {len(matcher.automaton.keywords)}")
+
+    with timer.phase("listener"):
+        if engine:
+            from engine_ipc import EngineServer
+            monitor = EngineServer(runtime, matcher, lockdown, skip_separators=config['skip_separators'])
+            monitor.start()
+            runtime.on_shutdown(monitor.stop, "engine")
+        else:
+            from keyboard_monitor import KeyboardMonitor
+            monitor = KeyboardMonitor(automaton=matcher.automaton, normalizer=matcher.normalizer,
+                                      skip_separators=config['skip_separators'], lockdown=lockdown)
+            monitor.swap_matcher(matcher)  # Brings in the fuzzy index; nothing is buffered yet
+            monitor.start(runtime)
+            runtime.on_shutdown(monitor.stop, "keyboard_monitor")
+            runtime.call_later(monitor.SUPERVISE_INTERVAL, monitor.supervise, "listener_supervisor")
+
+    with timer.phase("services"):
+        from config import ConfigWatcher
+        from keyword_index import DEFAULT_INDEX_PATH
+
+        def reload(new_config: dict):
+            new_matcher = build_matcher(new_config)  # Built on the reload thread while typing continues
+            monitor.skip_separators = new_config['skip_separators']
+            monitor.swap_matcher(new_matcher)
+            lockdown.apply_config(new_config)
+
+        watcher = ConfigWatcher(reload, config_path, extra_paths=[config['keyword_index'] or DEFAULT_INDEX_PATH],
+                                scheduler=runtime)
+        watcher.start()
+        runtime.on_shutdown(watcher.stop, "config_watcher")
+        stats_writer = metrics.StatsWriter(scheduler=runtime)  # data/stats.json
+        stats_writer.start()
+        runtime.on_shutdown(stats_writer.stop, "stats_writer")
+
+    report = timer.report()
+    logger.info("Keyboard monitor running")
+    if exit_after_boot:
+        runtime.request_stop()
+    return report
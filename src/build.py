@@ -1,11 +1,17 @@
 import os
+import argparse
 import subprocess
 import sys
 import platform
 
-def build_exe():
+def build_exe(onedir: bool = False):
     """
-    Compile ImaanGuard project into a single EXE using PyInstaller.
+    Compile ImaanGuard project into an EXE using PyInstaller.
+
+    Args:
+        onedir: Build a folder with the EXE next to its libraries instead of a single
+            self-extracting EXE. Starts faster, since nothing is unpacked to a temp
+            folder on every launch (compare with benchmarks/bench_startup.py).
     """
     print("Starting build process for ImaanGuard...")
 
@@ -14,10 +20,21 @@ def build_exe():
     main_script = os.path.join(project_root, "src", "main.py")
     data_dir = os.path.join(project_root, "data")
 
+    # Compile the keyword list into the binary index that ships in data/
+    keyword_source = os.path.join(data_dir, "keywords.json")
+    if os.path.exists(keyword_source):
+        sys.path.insert(0, os.path.join(project_root, "src"))
+        from config import load_config
+        from keyword_index import compile_index, read_keyword_source
+        from normalizer import Normalizer
+        normalizer = Normalizer(leet=load_config(os.path.join(data_dir, "config.json"))["leet"])  # As keystrokes are folded
+        compile_index(read_keyword_source(keyword_source), os.path.join(data_dir, "keywords.idx"), normalizer=normalizer)
+        print("Keyword index compiled")
+
     # PyInstaller options
     pyinstaller_cmd = [
         "pyinstaller",
-        "--onefile",            # Single EXE
+        "--onedir" if onedir else "--onefile",  # Folder layout or single self-extracting EXE
         "--noconsole",         # No console window
         f"--add-data={data_dir}{os.pathsep}data",  # Bundle data/ folder
         "--hidden-import=pynput",  # Ensure pynput is included
@@ -31,10 +48,13 @@ def build_exe():
     try:
         print(f"Running PyInstaller: {' '.join(pyinstaller_cmd)}")
         subprocess.run(pyinstaller_cmd, check=True)
-        print(f"Build successful! EXE located at: dist/ImaanGuard.exe")
+        location = "dist/ImaanGuard/ImaanGuard.exe" if onedir else "dist/ImaanGuard.exe"
+        print(f"Build successful! EXE located at: {location}")
     except subprocess.CalledProcessError as e:
         print(f"Build failed: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    build_exe()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build ImaanGuard with PyInstaller")
+    parser.add_argument("--onedir", action="store_true", help="Build a folder instead of a single EXE")
+    build_exe(onedir=parser.parse_args().onedir)
\ No newline at end of file
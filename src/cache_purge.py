@@ -0,0 +1,212 @@
+import os
+import time
+import queue
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from logger import get_logger
+import metrics
+
+logger = get_logger(__name__)
+
+# Cache folders inside a Chromium profile (Default, Profile 1, Guest Profile, ...)
+CHROMIUM_CACHE_DIRS = ("Cache", "Code Cache", "GPUCache", "Service Worker\\CacheStorage")
+FIREFOX_CACHE_DIRS = ("cache2", "startupCache", "thumbnails")
+
+# Process name -> (folder under %LOCALAPPDATA% holding the profiles, cache folders in each profile)
+BROWSERS = {
+    "chrome.exe": ("Google\\Chrome\\User Data", CHROMIUM_CACHE_DIRS),
+    "msedge.exe": ("Microsoft\\Edge\\User Data", CHROMIUM_CACHE_DIRS),
+    "brave.exe": ("BraveSoftware\\Brave-Browser\\User Data", CHROMIUM_CACHE_DIRS),
+    "opera.exe": ("Opera Software", CHROMIUM_CACHE_DIRS),  # Opera Stable, Opera GX Stable
+    "firefox.exe": ("Mozilla\\Firefox\\Profiles", FIREFOX_CACHE_DIRS),
+}
+
+
+class PurgeResult(NamedTuple):
+    browser: str
+    path: str
+    files: int
+    bytes: int
+    errors: int  # Entries that could not be removed (e.g. still locked by a running browser)
+    seconds: float
+
+
+class CachePurger:
+    """
+    Deletes browser caches on a background thread.
+
+    Cache folders of every profile of every supported browser are discovered
+    once, on the worker thread, and reused for every later request. request()
+    only enqueues work, so the enforcement tick never waits for a large cache.
+    Deletion walks the tree file by file and is throttled to a maximum rate of
+    files and bytes per second, so purging gigabytes does not saturate the disk
+    while the rest of the lockdown runs.
+    """
+
+    THROTTLE_EVERY = 32  # Files deleted between rate checks
+
+    def __init__(self, local_appdata: Optional[str] = None, max_files_per_second: float = 2000,
+                 max_bytes_per_second: float = 64 * 1024 * 1024, browsers: Optional[Dict[str, tuple]] = None):
+        """
+        Args:
+            local_appdata: Folder holding the browser data (defaults to %LOCALAPPDATA%).
+            max_files_per_second: Deletion rate limit (0 for none).
+            max_bytes_per_second: Reclaimed bytes per second limit (0 for none).
+            browsers: Process name -> (profiles folder, cache folders), defaults to BROWSERS.
+        """
+        self.local_appdata = local_appdata or os.getenv("LOCALAPPDATA") or (
+            os.path.join(os.getenv("USERPROFILE"), "AppData", "Local") if os.getenv("USERPROFILE") else None)
+        self.max_files_per_second = max_files_per_second
+        self.max_bytes_per_second = max_bytes_per_second
+        self.browsers = browsers or BROWSERS
+        self.results: List[PurgeResult] = []
+        self.files = 0
+        self.bytes = 0
+        self._cache_dirs: Optional[Dict[str, List[str]]] = None
+        self._queue = queue.Queue()
+        self._pending = set()  # Browsers queued but not yet purged
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._files_metric = metrics.counter("cache_purge.files")
+        self._bytes_metric = metrics.counter("cache_purge.bytes")
+        self._duration_metric = metrics.histogram("cache_purge.duration_ms")
+
+    def _path(self, relative: str) -> str:
+        return os.path.join(self.local_appdata, *relative.split("\\"))
+
+    def discover(self) -> Dict[str, List[str]]:
+        """
+        Find the cache folders of every profile, once.
+
+        Returns:
+            dict: Process name -> existing cache folders.
+        """
+        if self._cache_dirs is not None:
+            return self._cache_dirs
+        cache_dirs = {}
+        for browser, (profiles_dir, cache_names) in self.browsers.items():
+            found = []
+            root = self._path(profiles_dir) if self.local_appdata else None
+            if root and os.path.isdir(root):
+                with os.scandir(root) as entries:
+                    profiles = sorted(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+                for profile in profiles:
+                    for name in cache_names:
+                        path = os.path.join(profile, *name.split("\\"))
+                        if os.path.isdir(path):
+                            found.append(path)
+            cache_dirs[browser] = found
+        self._cache_dirs = cache_dirs
+        logger.info(f"Browser cache folders: { {browser: len(paths) for browser, paths in cache_dirs.items() if paths} }")
+        return cache_dirs
+
+    def request(self, browser: str) -> bool:
+        """
+        Queue a purge of one browser's caches. Returns immediately.
+
+        Returns:
+            bool: False if the browser is unsupported or a purge for it is already queued.
+        """
+        browser = browser.lower()
+        if browser not in self.browsers:
+            return False
+        with self._lock:
+            if browser in self._pending:
+                return False
+            self._pending.add(browser)
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="CachePurge", daemon=True)
+                self._thread.start()
+        self._queue.put(browser)
+        return True
+
+    def join(self):
+        """
+        Wait until every queued purge has finished.
+        """
+        self._queue.join()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            browser = self._queue.get()
+            try:
+                if browser is None:
+                    return
+                with self._lock:
+                    self._pending.discard(browser)  # A request arriving from here on purges again
+                for path in self.discover()[browser]:
+                    if self._stop_event.is_set():
+                        break
+                    self._record(self.purge_tree(browser, path))
+            except Exception as e:
+                logger.error(f"Cache purge for {browser} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def purge_tree(self, browser: str, root: str) -> PurgeResult:
+        """
+        Delete everything below root (and root itself), file by file at the throttled rate.
+        """
+        started = time.perf_counter()
+        files = reclaimed = errors = 0
+        directories = []
+        stack = [root]
+        while stack and not self._stop_event.is_set():
+            directory = stack.pop()
+            directories.append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError:
+                errors += 1
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                    os.remove(entry.path)
+                    files += 1
+                    reclaimed += size
+                except OSError:
+                    errors += 1
+                    continue
+                if files % self.THROTTLE_EVERY == 0:
+                    self._throttle(started, files, reclaimed)
+        for directory in reversed(directories):  # Children were found after their parents
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass  # Not empty because something could not be deleted
+        return PurgeResult(browser, root, files, reclaimed, errors, time.perf_counter() - started)
+
+    def _throttle(self, started: float, files: int, reclaimed: int):
+        budget = 0.0
+        if self.max_files_per_second:
+            budget = files / self.max_files_per_second
+        if self.max_bytes_per_second:
+            budget = max(budget, reclaimed / self.max_bytes_per_second)
+        ahead = budget - (time.perf_counter() - started)
+        if ahead > 0:
+            self._stop_event.wait(ahead)
+
+    def _record(self, result: PurgeResult):
+        self.results.append(result)
+        self.files += result.files
+        self.bytes += result.bytes
+        self._files_metric.inc(result.files)
+        self._bytes_metric.inc(result.bytes)
+        self._duration_metric.observe(result.seconds * 1000)
+        logger.info(f"Purged {result.files} files ({result.bytes / (1024 * 1024):.1f} MiB) from {result.path} "
+                    f"in {result.seconds:.2f}s" + (f", {result.errors} entries left" if result.errors else ""))
@@ -0,0 +1,160 @@
+import sys
+import time
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+from logger import get_logger
+import metrics
+
+logger = get_logger(__name__)
+
+Command = Sequence[str]
+
+
+class CommandResult(NamedTuple):
+    args: tuple
+    returncode: Optional[int]  # None if the command could not be started or timed out
+    duration: float  # Seconds
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class CommandRunner:
+    """
+    Runs system commands (netsh, explorer, shutdown) without a shell.
+
+    Every command gets a timeout and its exit code and duration are recorded.
+    Independent steps of a lock or unlock transition run in parallel on a
+    small persistent pool, so a transition takes as long as its slowest step
+    instead of the sum of all of them.
+    """
+
+    CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    HISTORY_SIZE = 64
+    dry_run = False  # True when commands are only recorded, so their effects cannot be read back
+
+    def __init__(self, timeout: float = 10.0, max_workers: int = 4):
+        """
+        Args:
+            timeout: Default per-command timeout in seconds.
+            max_workers: Commands that may run at the same time.
+        """
+        self.timeout = timeout
+        self.history = deque(maxlen=self.HISTORY_SIZE)  # Most recent CommandResults
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Command")
+
+    def run(self, args: Command, timeout: Optional[float] = None) -> CommandResult:
+        """
+        Run one command and wait for it.
+
+        Returns:
+            CommandResult: Never raises for failed, missing or hung commands.
+        """
+        started = time.perf_counter()
+        returncode, error = self._execute(tuple(args), timeout or self.timeout)
+        result = CommandResult(tuple(args), returncode, time.perf_counter() - started, error)
+        self._record(result)
+        return result
+
+    def run_parallel(self, commands: List[Command], timeout: Optional[float] = None) -> List[CommandResult]:
+        """
+        Run independent commands concurrently.
+
+        Returns:
+            list: CommandResults in the order the commands were given.
+        """
+        futures = [self._executor.submit(self.run, args, timeout) for args in commands]
+        return [future.result() for future in futures]
+
+    def spawn(self, args: Command) -> CommandResult:
+        """
+        Start a long-running program (e.g. explorer.exe) without waiting for it to exit.
+        """
+        started = time.perf_counter()
+        returncode, error = self._launch(tuple(args))
+        result = CommandResult(tuple(args), returncode, time.perf_counter() - started, error)
+        self._record(result)
+        return result
+
+    def _execute(self, args: tuple, timeout: float):
+        try:
+            completed = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                       timeout=timeout, creationflags=self.CREATE_NO_WINDOW)
+        except subprocess.TimeoutExpired:
+            return None, f"timed out after {timeout}s"
+        except OSError as e:
+            return None, str(e)
+        if completed.returncode != 0:
+            return completed.returncode, completed.stderr.decode(errors="replace").strip() or None
+        return 0, None
+
+    def _launch(self, args: tuple):
+        try:
+            subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                             creationflags=self.CREATE_NO_WINDOW)
+            return 0, None
+        except OSError as e:
+            return None, str(e)
+
+    def _record(self, result: CommandResult):
+        self.history.append(result)
+        metrics.histogram("command.duration_ms").observe(result.duration * 1000)
+        if not result.ok:
+            metrics.counter("command.failures").inc()
+        command = " ".join(result.args)
+        if result.ok:
+            logger.debug(f"'{command}' finished in {result.duration * 1000:.1f} ms")
+        else:
+            logger.warning(f"'{command}' failed in {result.duration * 1000:.1f} ms "
+                           f"(exit code {result.returncode}): {result.error}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class RecordingCommandRunner(CommandRunner):
+    """
+    Dry-run backend: records commands instead of executing them.
+
+    Used on platforms without netsh and in benchmarks and tests. An optional
+    simulated latency per command makes transition timings comparable.
+    """
+
+    dry_run = True
+
+    def __init__(self, timeout: float = 10.0, max_workers: int = 4, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds each recorded command pretends to take.
+        """
+        super().__init__(timeout, max_workers)
+        self.latency = latency
+        self.commands: List[tuple] = []
+        self._commands_lock = threading.Lock()
+
+    def _execute(self, args: tuple, timeout: float):
+        with self._commands_lock:
+            self.commands.append(args)
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        return 0, None
+
+    def _launch(self, args: tuple):
+        with self._commands_lock:
+            self.commands.append(args)
+        return 0, None
+
+
+def create_command_runner() -> CommandRunner:
+    """
+    Execute commands for real on Windows; record them everywhere else.
+    """
+    if sys.platform == "win32":
+        return CommandRunner()
+    logger.info("Not running on Windows, system commands are recorded instead of executed")
+    return RecordingCommandRunner()
@@ -0,0 +1,176 @@
+import os
+import copy
+import json
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+from logger import get_logger
+from scheduler import Scheduler
+
+logger = get_logger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "config.json")
+
+DEFAULT_CONFIG = {
+    # Keywords that trigger a lockdown, matched next to the compiled keyword_index if it exists
+    "keywords": ["porn", "adult", "nsfw", "xxx", "sex", "nude", "hentai", "erotic", "fetish", "kink", "mature", "spicy",
+                 "fitgirl", "dodi", "pussy", "anal", "boobs", "sexy", "naked", "bikini", "lingerie", "striptease"],
+    "keyword_files": [],  # Extra keyword sources, JSON lists or one keyword per line
+    "keyword_index": os.path.join(os.path.dirname(__file__), "..", "data", "keywords.idx"),
+    "blocklists": [],  # Community hosts/domain/term lists, imported into the index by blocklist_import.py
+    # Applies to keywords and keyword_files only, never to the compiled index. Keywords under
+    # 7 characters always match exactly (one edit turns "mature" into "nature"), so of the
+    # defaults only fitgirl, lingerie and striptease are matched fuzzily; short misspellings
+    # need their own entries, and leetspeak such as "p0rn" is folded by the Normalizer.
+    "fuzzy_distance": 2,
+    "skip_separators": True,
+    "leet": None,  # Leetspeak substitutions, None for the built-in table
+    "policies": {
+        "tools": ["taskmgr.exe", "cmd.exe", "powershell.exe"],
+        "network": ["chrome.exe", "msedge.exe", "firefox.exe", "opera.exe", "brave.exe"],
+        "explorer": ["explorer.exe"],
+    },
+    "lock_durations": [30, 60, 120, 240],  # Seconds, indexed by violation count
+    "max_lock_duration": 500,  # Once the violation count passes the table
+    "bypass_duration": 300,
+    "diagnostics": False,  # Sampling profiler and allocation snapshots into data/diagnostics (see diagnostics.py)
+}
+
+
+class Matcher(NamedTuple):
+    """
+    Everything KeyboardMonitor needs to match keystrokes, built and swapped as one unit.
+    """
+    automaton: object  # KeywordAutomaton
+    fuzzy_index: Optional[object]  # FuzzyIndex
+    normalizer: object  # Normalizer
+
+
+def load_config(path: str = DEFAULT_CONFIG_PATH) -> dict:
+    """
+    Read the config file over the defaults. A missing file yields the defaults.
+
+    Raises:
+        ValueError: If the file is not a JSON object.
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        return config
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must contain a JSON object")
+    unknown = set(overrides) - set(DEFAULT_CONFIG)
+    if unknown:
+        logger.warning(f"Ignoring unknown config keys: {sorted(unknown)}")
+    config.update({key: value for key, value in overrides.items() if key in DEFAULT_CONFIG})
+    return config
+
+
+def build_matcher(config: dict) -> Matcher:
+    """
+    Compile the keyword matcher described by config. Can take seconds for large
+    keyword sets, so reloads run it off the keystroke path.
+    """
+    from matcher import FuzzyIndex, KeywordAutomaton, LayeredAutomaton
+    from normalizer import Normalizer
+    from keyword_index import load_index, read_keyword_source
+
+    normalizer = Normalizer(leet=config["leet"])
+    index_path = config["keyword_index"]
+    keywords: List[str] = list(config["keywords"])
+    for source in config["keyword_files"]:
+        keywords.extend(read_keyword_source(source))
+    keywords = normalizer.keywords(keywords)
+
+    index = None
+    if index_path and os.path.exists(index_path):
+        try:
+            index = load_index(index_path, normalizer)
+        except ValueError as e:
+            logger.error(f"Keyword index unusable, matching the configured keywords only: {e}")
+    if index is None:
+        automaton = KeywordAutomaton(keywords)
+    else:
+        # Config keywords the index already catches (itself or a part of it) need no second automaton
+        extra = [keyword for keyword in keywords if index.search(keyword) is None]
+        automaton = LayeredAutomaton(index, KeywordAutomaton(extra)) if extra else index
+        if extra:
+            logger.info(f"Matching {len(extra)} configured keywords missing from the index next to it")
+    # Over the curated keywords only: a deletion index over an imported blocklist would
+    # hold every variant of every entry in Python dicts, undoing the mapped index
+    distance = config["fuzzy_distance"]
+    fuzzy_index = FuzzyIndex(keywords, max_distance=distance) if distance > 0 else None
+    return Matcher(automaton, fuzzy_index, normalizer)
+
+
+class ConfigWatcher:
+    """
+    Reloads the configuration when its files change.
+
+    Every interval seconds the watched files are stat()ed on the scheduler
+    thread, which costs a few microseconds and no handles. When a modification
+    time or size changes, the config is read and handed to on_change on a
+    separate thread, so rebuilding a large matcher never blocks the scheduler.
+    A config that fails to load or apply is logged and the running one is kept.
+    """
+
+    def __init__(self, on_change: Callable[[dict], None], path: str = DEFAULT_CONFIG_PATH,
+                 extra_paths: Optional[List[str]] = None, interval: float = 2.0, scheduler: Optional[Scheduler] = None):
+        """
+        Args:
+            on_change: Called with the new config on the reload thread.
+            path: Config file.
+            extra_paths: Other files whose change requires a reload (e.g. the compiled keyword index).
+            interval: Seconds between checks.
+            scheduler: Scheduler to run checks on (a private one is started if None).
+        """
+        self.on_change = on_change
+        self.path = path
+        self.paths = [path] + list(extra_paths or [])
+        self.interval = interval
+        self.reloads = 0
+        self._scheduler = scheduler or Scheduler("ConfigWatcher")
+        self._signatures: Dict[str, Optional[tuple]] = {}
+        self._task = None
+        self._reload_thread = None
+
+    def start(self):
+        self._signatures = {path: self._signature(path) for path in self.paths}
+        self._scheduler.start()
+        self._task = self._scheduler.call_later(self.interval, self._check, "config_watch")
+        logger.info(f"Watching {len(self.paths)} config file(s) for changes")
+
+    def stop(self):
+        self._scheduler.cancel(self._task)
+        self._task = None
+
+    @staticmethod
+    def _signature(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _check(self) -> float:
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return self.interval  # Picked up again once the running reload finishes
+        signatures = {path: self._signature(path) for path in self.paths}
+        if signatures != self._signatures:
+            self._signatures = signatures
+            self._reload_thread = threading.Thread(target=self.reload, name="ConfigReload", daemon=True)
+            self._reload_thread.start()
+        return self.interval
+
+    def reload(self):
+        """
+        Load the config and apply it. Runs on the reload thread.
+        """
+        try:
+            config = load_config(self.path)
+            self.on_change(config)
+            self.reloads += 1
+            logger.info("Configuration reloaded")
+        except Exception as e:
+            logger.error(f"Config reload failed, keeping the running configuration: {e}")
@@ -0,0 +1,321 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import threading
+import tracemalloc
+from collections import Counter
+from concurrent.futures import Executor, Future, wait
+from typing import Dict, List, Optional, Sequence
+from logger import configure as configure_logging, get_logger
+from scheduler import Scheduler
+
+logger = get_logger(__name__)
+
+DIAGNOSTICS_ENV = "IMAANGUARD_DIAGNOSTICS"  # Set to 1 to enable diagnostics without touching the config
+DEFAULT_DIAGNOSTICS_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "diagnostics")
+# Threads worth profiling: the pynput listener, the runtime loop (main thread) and its blocking pool,
+# and the standalone consumer, enforcement and scheduler threads used without a runtime
+DEFAULT_THREADS = ("KeyboardListener", "MainThread", "Runtime", "Blocking", "KeystrokeConsumer", "Enforcement",
+                   "Scheduler", "ProcessEvents")
+PROFILE_PREFIX = "profile-"
+ALLOC_PREFIX = "alloc-"
+
+
+def diagnostics_enabled(config: Optional[dict] = None) -> bool:
+    """
+    Diagnostics are on when IMAANGUARD_DIAGNOSTICS is truthy or the config sets "diagnostics".
+    """
+    value = os.environ.get(DIAGNOSTICS_ENV)
+    if value is not None:
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(config and config.get("diagnostics"))
+
+
+def _rotate(directory: str, prefix: str, keep: int):
+    files = sorted(glob.glob(os.path.join(directory, prefix + "*")))
+    for path in files[:-keep] if keep else files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler over selected threads.
+
+    A background thread reads every thread's current frame via
+    sys._current_frames() every interval seconds and counts the collapsed call
+    stacks of the threads whose name starts with one of the given prefixes. The
+    profiled threads are never interrupted or traced, so the cost is one stack
+    walk per sample rather than a hook on every function call.
+
+    Counts are written in collapsed-stack format ("thread;outer;...;inner count"),
+    which flamegraph tools read directly.
+    """
+
+    MAX_DEPTH = 64
+
+    def __init__(self, interval: float = 0.01, threads: Sequence[str] = DEFAULT_THREADS):
+        """
+        Args:
+            interval: Seconds between samples.
+            threads: Thread name prefixes to sample.
+        """
+        self.interval = interval
+        self.thread_prefixes = tuple(threads)
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="DiagnosticsSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _watched_threads(self) -> Dict[int, str]:
+        return {thread.ident: thread.name for thread in threading.enumerate()
+                if thread.ident is not None and thread.name.startswith(self.thread_prefixes)}
+
+    def _run(self):
+        own = threading.get_ident()
+        watched = self._watched_threads()
+        refreshed = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            if time.monotonic() - refreshed > 1.0:  # Threads come and go; names are looked up once a second
+                watched = self._watched_threads()
+                refreshed = time.monotonic()
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, name in watched.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    self._stacks[self._collapse(name, frame)] += 1
+                self.samples += 1
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.MAX_DEPTH:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        parts.append(thread_name.rstrip("_0123456789"))  # Pool workers share one root
+        return ";".join(reversed(parts))
+
+    def take(self) -> Counter:
+        """
+        Return the stacks counted so far and start a new period.
+        """
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+        return stacks
+
+
+class Diagnostics:
+    """
+    Diagnostics mode: sampling profiler plus periodic tracemalloc snapshots.
+
+    Every profile_interval seconds the collected stacks are written to
+    data/diagnostics/profile-<time>.txt; every snapshot_interval seconds a
+    tracemalloc snapshot goes to alloc-<time>.snap. Only the newest keep files
+    of each kind are kept. Summarize them with: python diagnostics.py summarize
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIAGNOSTICS_DIR, sample_interval: float = 0.01,
+                 profile_interval: float = 60.0, snapshot_interval: float = 300.0, trace_frames: int = 8,
+                 keep: int = 24, threads: Sequence[str] = DEFAULT_THREADS, scheduler: Optional[Scheduler] = None,
+                 executor: Optional[Executor] = None):
+        """
+        Args:
+            directory: Output directory.
+            sample_interval: Seconds between stack samples.
+            profile_interval: Seconds per written profile file.
+            snapshot_interval: Seconds between allocation snapshots (0 disables tracemalloc).
+            trace_frames: Frames tracemalloc records per allocation; more is slower.
+            keep: Files of each kind kept in the directory.
+            threads: Thread name prefixes to profile.
+            scheduler: Times the periodic writes (a private one is started if None).
+            executor: Runs the writes, so a scheduler that also drains keystrokes (the
+                runtime loop) only hands them off. None writes on the scheduler thread.
+        """
+        self.directory = directory
+        self.profile_interval = profile_interval
+        self.snapshot_interval = snapshot_interval
+        self.trace_frames = trace_frames
+        self.keep = keep
+        self.profiler = SamplingProfiler(sample_interval, threads)
+        self._scheduler = scheduler or Scheduler("Diagnostics")
+        self._executor = executor
+        self._pending: Dict[str, Future] = {}
+        self._tasks = []
+        self._written = 0
+        self._stamp_lock = threading.Lock()
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.profiler.start()
+        self._scheduler.start()
+        self._tasks.append(self._scheduler.call_later(self.profile_interval, self._profile_tick, "diagnostics_profile"))
+        if self.snapshot_interval > 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+            self._tasks.append(self._scheduler.call_later(0, self._snapshot_tick, "diagnostics_snapshot"))
+        logger.info(f"Diagnostics enabled, writing to {self.directory}")
+
+    def stop(self):
+        for task in self._tasks:
+            self._scheduler.cancel(task)
+        self._tasks = []
+        self.profiler.stop()
+        wait(list(self._pending.values()))
+        self.write_profile()
+        if tracemalloc.is_tracing():
+            self.write_snapshot()
+            tracemalloc.stop()
+
+    def _stamp(self) -> str:
+        with self._stamp_lock:  # Profile and snapshot writes may run on two executor threads
+            self._written += 1  # Keeps names unique and ordered within one millisecond
+            written = self._written
+        return time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}-{written:05d}"
+
+    def _profile_tick(self) -> float:
+        self._run_write("profile", self.write_profile)
+        return self.profile_interval
+
+    def _snapshot_tick(self) -> float:
+        self._run_write("snapshot", self.write_snapshot)
+        return self.snapshot_interval
+
+    def _run_write(self, kind: str, write):
+        """
+        Hand a write to the executor, skipping it while the previous one of its kind still runs.
+        """
+        if self._executor is None:
+            write()
+            return
+        pending = self._pending.get(kind)
+        if pending is not None and not pending.done():
+            logger.debug(f"Previous {kind} write still running, skipping this one")
+            return
+        self._pending[kind] = self._executor.submit(write)
+
+    def write_profile(self) -> Optional[str]:
+        stacks = self.profiler.take()
+        if not stacks:
+            return None
+        path = os.path.join(self.directory, f"{PROFILE_PREFIX}{self._stamp()}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        _rotate(self.directory, PROFILE_PREFIX, self.keep)
+        return path
+
+    def write_snapshot(self) -> Optional[str]:
+        if not tracemalloc.is_tracing():
+            return None
+        path = os.path.join(self.directory, f"{ALLOC_PREFIX}{self._stamp()}.snap")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        snapshot.dump(path)
+        _rotate(self.directory, ALLOC_PREFIX, self.keep)
+        return path
+
+
+def start_diagnostics(config: Optional[dict] = None, **kwargs) -> Optional[Diagnostics]:
+    """
+    Start diagnostics if enabled by IMAANGUARD_DIAGNOSTICS or the config.
+    """
+    if not diagnostics_enabled(config):
+        return None
+    diagnostics = Diagnostics(**kwargs)
+    diagnostics.start()
+    return diagnostics
+
+
+def load_profiles(directory: str) -> Counter:
+    stacks: Counter = Counter()
+    for path in sorted(glob.glob(os.path.join(directory, PROFILE_PREFIX + "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def summarize_profiles(stacks: Counter, top: int = 15) -> List[str]:
+    """
+    Top stacks and the functions most often on top of the stack (self time), per thread.
+    """
+    total = sum(stacks.values())
+    if not total:
+        return ["No profile samples found"]
+    leaves: Counter = Counter()
+    threads: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        threads[frames[0]] += count
+        leaves[f"{frames[0]}: {frames[-1]}"] += count
+
+    lines = [f"{total} samples"]
+    lines.append("Samples by thread:")
+    lines += [f"  {count / total:6.1%}  {thread}" for thread, count in threads.most_common()]
+    lines.append("Top functions (self):")
+    lines += [f"  {count / total:6.1%}  {leaf}" for leaf, count in leaves.most_common(top)]
+    lines.append("Top stacks:")
+    for stack, count in stacks.most_common(top):
+        frames = stack.split(";")
+        tail = " <- ".join(reversed(frames[-4:]))
+        lines.append(f"  {count / total:6.1%}  [{frames[0]}] {tail}")
+    return lines
+
+
+def summarize_allocations(directory: str, top: int = 15) -> List[str]:
+    """
+    Allocation growth between the oldest and newest snapshot, by source line.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, ALLOC_PREFIX + "*.snap")))
+    if len(paths) < 2:
+        return [f"Need at least two allocation snapshots, found {len(paths)}"]
+    first, last = tracemalloc.Snapshot.load(paths[0]), tracemalloc.Snapshot.load(paths[-1])
+    stats = last.compare_to(first, "lineno")
+    total = sum(stat.size_diff for stat in stats)
+    lines = [f"Allocation growth {os.path.basename(paths[0])} -> {os.path.basename(paths[-1])}: {total / 1024:+.1f} KiB"]
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  "
+                     f"{os.path.basename(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def main(argv=None):
+    """
+    Usage: python diagnostics.py summarize [--dir data/diagnostics] [--top 15]
+    """
+    parser = argparse.ArgumentParser(description="Summarize ImaanGuard diagnostics output")
+    parser.add_argument("command", choices=["summarize"])
+    parser.add_argument("--dir", default=DEFAULT_DIAGNOSTICS_DIR)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    for line in summarize_profiles(load_profiles(args.dir), args.top) + [""] + summarize_allocations(args.dir, args.top):
+        print(line)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,454 @@
+import os
+import sys
+import mmap
+import time
+import base64
+import struct
+import logging
+import argparse
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "logs")
+DEFAULT_KEY_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "log.key")
+KEY_ENV = "IMAANGUARD_LOG_KEY"  # Base64 AES-256 key, overrides the key file
+
+MAGIC = b"IGLOG\x00\x01\x00"  # Segment header: format and version
+SEGMENT_PATTERN = "segment-{:06d}.igl"
+INDEX_NAME = "index.bin"
+DPAPI_MARKER = b"DPAPI:"
+
+# Chunk header: ciphertext length, record count, first and last record time, nonce.
+# The header is authenticated, with the segment number and chunk offset, as associated data.
+CHUNK_HEADER = struct.Struct("<IIdd12s")
+# One index entry per chunk: first record time, latest record time of this chunk and every
+# chunk before it, segment number, chunk offset, record count. The second field never
+# decreases along the index, even when the clock is set back, so readers can bisect on it.
+INDEX_ENTRY = struct.Struct("<ddIQI")
+KEY_SDDL = "D:P(A;;FA;;;SY)(A;;FA;;;BA)(A;;FA;;;OW)"  # Key file: SYSTEM, admins and its owner only
+RECORD_HEADER = struct.Struct("<dI")  # Record time, UTF-8 length
+
+
+class IndexEntry(NamedTuple):
+    first: float
+    last: float  # Latest record time up to and including this chunk
+    segment: int
+    offset: int
+    records: int
+
+
+def load_key(path: str = DEFAULT_KEY_PATH, create: bool = True) -> bytes:
+    """
+    Return the log key, creating it on first use.
+
+    IMAANGUARD_LOG_KEY takes precedence. Otherwise the key lives in a file next
+    to the log (data/log.key by default), so its protection is what keeps the
+    log private. The file is created readable by its owner only: mode 0600, or
+    on Windows a protected DACL for SYSTEM, administrators and the owner. On
+    Windows the key is also sealed with DPAPI for the machine, so a copied key
+    file cannot be opened on another computer.
+
+    Raises:
+        FileNotFoundError: If there is no key and create is False.
+    """
+    if os.environ.get(KEY_ENV):
+        return base64.b64decode(os.environ[KEY_ENV])
+    try:
+        with open(path, "rb") as f:
+            stored = f.read()
+        if stored.startswith(DPAPI_MARKER):
+            import win32crypt
+            return win32crypt.CryptUnprotectData(stored[len(DPAPI_MARKER):], None, None, None, 0)[1]
+        return stored
+    except FileNotFoundError:
+        if not create:
+            raise
+    key = AESGCM.generate_key(bit_length=256)
+    stored = key
+    try:
+        import win32crypt
+        stored = DPAPI_MARKER + win32crypt.CryptProtectData(key, "ImaanGuard log key", None, None, None,
+                                                            0x4)  # CRYPTPROTECT_LOCAL_MACHINE
+    except ImportError:
+        pass
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(stored)
+    _restrict_access(path)
+    return key
+
+
+def _restrict_access(path: str):
+    """
+    Replace the inherited Windows ACL of a file with KEY_SDDL. The 0600 mode
+    already covers other platforms.
+    """
+    if sys.platform != "win32":
+        return
+    try:
+        import win32security
+    except ImportError:
+        return
+    descriptor = win32security.ConvertStringSecurityDescriptorToSecurityDescriptor(
+        KEY_SDDL, win32security.SDDL_REVISION_1)
+    win32security.SetNamedSecurityInfo(
+        path, win32security.SE_FILE_OBJECT,
+        win32security.DACL_SECURITY_INFORMATION | win32security.PROTECTED_DACL_SECURITY_INFORMATION,
+        None, None, descriptor.GetSecurityDescriptorDacl(), None)
+
+
+def _associated_data(segment: int, offset: int, header: bytes) -> bytes:
+    return MAGIC + struct.pack("<IQ", segment, offset) + header[:CHUNK_HEADER.size - 12]
+
+
+def _segment_numbers(directory: str) -> List[int]:
+    numbers = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        if name.startswith("segment-") and name.endswith(".igl"):
+            try:
+                numbers.append(int(name[8:-4]))
+            except ValueError:
+                pass
+    return sorted(numbers)
+
+
+class EncryptedLogWriter:
+    """
+    Append-only encrypted log in fixed-size segments.
+
+    Records are buffered into a chunk and each chunk is encrypted once with
+    AES-GCM, so the cipher setup, nonce and 16-byte tag are paid per chunk
+    rather than per line. A chunk is sealed when it reaches chunk_size bytes or
+    when seal_if_due() finds it older than max_chunk_age. A segment is closed
+    once it grows past segment_size, and only the newest keep segments are kept.
+    A new writer appends to the newest segment while it is below segment_size
+    and prunes old segments right away, so frequent restarts do not pile up
+    small segments.
+
+    Every sealed chunk adds an entry to a small plaintext side index (time range,
+    segment, offset), so a reader can decrypt just the chunks covering the
+    range it asks for.
+    """
+
+    def __init__(self, directory: str = DEFAULT_LOG_DIR, key: Optional[bytes] = None,
+                 segment_size: int = 4 * 1024 * 1024, chunk_size: int = 64 * 1024, max_chunk_age: float = 2.0,
+                 keep: int = 64):
+        """
+        Args:
+            directory: Folder holding the segments and the index.
+            key: 256-bit AES key (load_key() if None).
+            segment_size: Bytes after which a new segment is started.
+            chunk_size: Plaintext bytes buffered before a chunk is sealed.
+            max_chunk_age: Seconds a record may wait in an unsealed chunk (see seal_if_due).
+            keep: Segments kept; older ones are deleted.
+        """
+        self.directory = directory
+        self._aead = AESGCM(key or load_key())
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.max_chunk_age = max_chunk_age
+        self.keep = keep
+        self.chunks = 0
+        self.records = 0
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._first = self._last = 0.0
+        self._opened_at = 0.0  # monotonic() when the current chunk got its first record
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        numbers = _segment_numbers(directory)
+        self.segment = (numbers[-1] if numbers else 0) + 1
+        if numbers and self._resumable(numbers[-1]):
+            # A torn chunk at the end of the previous run stays unindexed, so it is never read
+            self.segment = numbers[-1]
+        self._file = None
+        self._index = self._open_index()
+        self._prune()
+
+    def _resumable(self, number: int) -> bool:
+        path = os.path.join(self.directory, SEGMENT_PATTERN.format(number))
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(MAGIC)) == MAGIC and os.fstat(f.fileno()).st_size < self.segment_size
+        except OSError:
+            return False
+
+    def _open_index(self):
+        """
+        Open the index for appending, dropping a torn trailing entry, and pick up
+        the latest record time written so far.
+        """
+        index = open(os.path.join(self.directory, INDEX_NAME), "a+b")
+        size = index.seek(0, os.SEEK_END)
+        if size % INDEX_ENTRY.size:
+            size -= size % INDEX_ENTRY.size
+            index.truncate(size)
+        self._high = float("-inf")
+        if size:
+            index.seek(size - INDEX_ENTRY.size)
+            self._high = INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))[1]
+        return index
+
+    def write(self, ts: float, text: str):
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            if not self._buffer:
+                self._first = self._last = ts
+                self._opened_at = time.monotonic()
+            else:
+                self._last = max(self._last, ts)
+            self._buffer.append(RECORD_HEADER.pack(ts, len(data)))
+            self._buffer.append(data)
+            self._buffered += RECORD_HEADER.size + len(data)
+            if self._buffered >= self.chunk_size:
+                self._seal()
+
+    def seal_if_due(self):
+        with self._lock:
+            if self._buffer and time.monotonic() - self._opened_at >= self.max_chunk_age:
+                self._seal()
+
+    def flush(self):
+        """
+        Seal the pending chunk now.
+        """
+        with self._lock:
+            self._seal()
+
+    def close(self):
+        with self._lock:
+            self._seal()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._index.close()
+
+    def _seal(self):
+        if not self._buffer:
+            return
+        plaintext = b"".join(self._buffer)
+        records = len(self._buffer) // 2
+        self._buffer, self._buffered = [], 0
+        if self._file is None:
+            self._file = open(os.path.join(self.directory, SEGMENT_PATTERN.format(self.segment)), "ab")
+            if self._file.tell() == 0:
+                self._file.write(MAGIC)
+        offset = self._file.tell()
+        nonce = os.urandom(12)
+        header = CHUNK_HEADER.pack(len(plaintext) + 16, records, self._first, self._last, nonce)
+        ciphertext = self._aead.encrypt(nonce, plaintext, _associated_data(self.segment, offset, header))
+        self._file.write(header + ciphertext)
+        self._file.flush()
+        # After the chunk, so the index never points at a chunk that was not written
+        self._high = max(self._high, self._last)
+        self._index.write(INDEX_ENTRY.pack(self._first, self._high, self.segment, offset, records))
+        self._index.flush()
+        self.chunks += 1
+        self.records += records
+        if self._file.tell() >= self.segment_size:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        self.segment += 1
+        self._prune()
+
+    def _prune(self):
+        """
+        Delete the oldest segments so that, with the current one, keep remain.
+        """
+        older = [number for number in _segment_numbers(self.directory) if number < self.segment]
+        expired = older[:max(0, len(older) - max(1, self.keep) + 1)]
+        if not expired:
+            return
+        for number in expired:
+            try:
+                os.remove(os.path.join(self.directory, SEGMENT_PATTERN.format(number)))
+            except OSError:
+                pass
+        # Drop the index entries of deleted segments (write-then-rename)
+        oldest = expired[-1] + 1
+        entries = [entry for entry in read_index(self.directory) if entry.segment >= oldest]
+        self._index.close()
+        path = os.path.join(self.directory, INDEX_NAME)
+        with open(path + ".tmp", "wb") as f:
+            f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+        try:
+            os.replace(path + ".tmp", path)
+        except OSError:  # A reader has the index open (Windows); its stale entries are skipped on read
+            os.remove(path + ".tmp")
+        self._index = open(path, "a+b")
+
+
+class _LatestTimes:
+    """
+    The non-decreasing latest-time field of a mapped index, for bisection
+    without unpacking every entry.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self._buffer) // INDEX_ENTRY.size
+
+    def __getitem__(self, position):
+        return struct.unpack_from("<d", self._buffer, position * INDEX_ENTRY.size + 8)[0]
+
+
+def read_index(directory: str) -> List[IndexEntry]:
+    """
+    All chunk entries in write order. A torn trailing entry is ignored.
+    """
+    try:
+        with open(os.path.join(directory, INDEX_NAME), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return [IndexEntry(*fields) for fields in INDEX_ENTRY.iter_unpack(data[:usable])]
+
+
+class EncryptedLogReader:
+    """
+    Decrypts the chunks of an encrypted log that overlap a time range.
+    """
+
+    def __init__(self, directory: str = DEFAULT_LOG_DIR, key: Optional[bytes] = None):
+        self.directory = directory
+        self._aead = AESGCM(key or load_key())
+        self.chunks_read = 0
+
+    def _chunks(self, since: float, until: float) -> List[IndexEntry]:
+        """
+        Index entries of the chunks that may hold records in [since, until], in
+        write order. Every entry before the first whose latest time reaches since
+        is skipped by bisecting the mapped index; only the rest are unpacked.
+        """
+        try:
+            f = open(os.path.join(self.directory, INDEX_NAME), "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < INDEX_ENTRY.size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                start = bisect_left(_LatestTimes(buffer), since)
+                end = len(buffer) - len(buffer) % INDEX_ENTRY.size
+                entries = [IndexEntry(*fields) for fields in
+                           INDEX_ENTRY.iter_unpack(buffer[start * INDEX_ENTRY.size:end])]
+        return [entry for entry in entries if entry.first <= until]
+
+    def read(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+        """
+        Yield (time, line) for the records in [since, until], oldest chunk first.
+        Chunks that fail authentication are skipped with a note.
+        """
+        since = float("-inf") if since is None else since
+        until = float("inf") if until is None else until
+        handle, segment = None, None
+        try:
+            for entry in self._chunks(since, until):
+                if entry.segment != segment:
+                    if handle is not None:
+                        handle.close()
+                    path = os.path.join(self.directory, SEGMENT_PATTERN.format(entry.segment))
+                    try:
+                        handle, segment = open(path, "rb"), entry.segment
+                    except FileNotFoundError:
+                        handle, segment = None, None
+                        continue
+                handle.seek(entry.offset)
+                header = handle.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    continue
+                length, _, _, _, nonce = CHUNK_HEADER.unpack(header)
+                try:
+                    plaintext = self._aead.decrypt(nonce, handle.read(length),
+                                                   _associated_data(entry.segment, entry.offset, header))
+                except InvalidTag:
+                    yield entry.first, f"[chunk {entry.segment}:{entry.offset} failed authentication]"
+                    continue
+                self.chunks_read += 1
+                position = 0
+                while position < len(plaintext):
+                    ts, size = RECORD_HEADER.unpack_from(plaintext, position)
+                    position += RECORD_HEADER.size
+                    if since <= ts <= until:
+                        yield ts, plaintext[position:position + size].decode("utf-8", errors="replace")
+                    position += size
+        finally:
+            if handle is not None:
+                handle.close()
+
+
+class EncryptedLogHandler(logging.Handler):
+    """
+    Logging handler writing formatted records to an EncryptedLogWriter.
+
+    Meant to run behind logger.configure's background writer, which calls
+    flush() after every batch and once a second while idle; flush() only seals
+    the chunk once it is max_chunk_age old, so chunks span many batches.
+    """
+
+    def __init__(self, directory: str = DEFAULT_LOG_DIR, key: Optional[bytes] = None, **writer_options):
+        super().__init__()
+        self.writer = EncryptedLogWriter(directory, key, **writer_options)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.writer.write(record.created, self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.seal_if_due()
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+def _parse_time(value: str) -> float:
+    """
+    An ISO date/time, or a duration back from now such as 30m, 2h or 7d.
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Print the log lines of a time range, decrypting only the chunks that cover it.
+    """
+    parser = argparse.ArgumentParser(description="Read the encrypted ImaanGuard log")
+    parser.add_argument("--dir", default=DEFAULT_LOG_DIR, help="Log folder")
+    parser.add_argument("--key-file", default=DEFAULT_KEY_PATH, help="Key file (IMAANGUARD_LOG_KEY overrides it)")
+    parser.add_argument("--since", type=_parse_time, help="Start: ISO time or age like 30m, 2h, 7d")
+    parser.add_argument("--until", type=_parse_time, help="End: ISO time or age")
+    args = parser.parse_args(argv)
+    if not read_index(args.dir):
+        print(f"No encrypted log in {args.dir}", file=sys.stderr)
+        return 1
+    try:
+        key = load_key(args.key_file, create=False)
+    except FileNotFoundError:
+        print(f"No key at {args.key_file}; set {KEY_ENV} or pass --key-file", file=sys.stderr)
+        return 1
+    reader = EncryptedLogReader(args.dir, key)
+    for _, line in reader.read(args.since, args.until):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+import os
+import sys
+import time
+import struct
+import socket
+import getpass
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, NamedTuple, Optional, Tuple
+from logger import get_logger
+from event_queue import KeyEventRing
+import metrics
+
+logger = get_logger(__name__)
+
+PROTOCOL_VERSION = 1
+DEFAULT_ADDRESS = r"\\.\pipe\ImaanGuardEngine" if sys.platform == "win32" else os.path.join("data", "engine.sock")
+
+# Every frame starts with kind, protocol version and a 16-bit count. The Windows named pipe runs in
+# message mode and keeps frame boundaries itself, so a batch of keys costs 4 bytes on top of its
+# UTF-8 text; over the Unix socket multiprocessing.connection adds a 4-byte length prefix (8 bytes).
+HEADER = struct.Struct("<BBH")
+HELLO_BODY = struct.Struct("<II")  # Session id, agent pid; followed by the user name in UTF-8
+HELLO, WELCOME, KEYS, BYE = 1, 2, 3, 4
+
+# Keys are sent as text. Space, backspace and Enter are the only non-character keys the matcher uses.
+SPECIAL_KEYS = {'space': ' ', 'backspace': '\b', 'enter': '\n'}
+
+
+class WireKey(NamedTuple):
+    """
+    A decoded key, shaped like the pynput key objects KeyboardMonitor reads (char or name).
+    """
+    char: Optional[str]
+    name: Optional[str]
+
+
+DECODED_SPECIAL_KEYS = {text: WireKey(None, name) for name, text in SPECIAL_KEYS.items()}
+
+
+def encode_key(key) -> Optional[str]:
+    """
+    Turn a pynput key into its wire text. Keys the matcher ignores (modifiers,
+    arrows) and control characters produced by Ctrl combinations yield None.
+    """
+    char = getattr(key, 'char', None)
+    if char is not None:
+        return char if char >= ' ' else None
+    return SPECIAL_KEYS.get(getattr(key, 'name', None))
+
+
+def decode_keys(text: str):
+    """
+    Yield the WireKey for each character of a KEYS frame.
+    """
+    special = DECODED_SPECIAL_KEYS
+    for char in text:
+        yield special.get(char) or WireKey(char, None)
+
+
+def pack(kind: int, count: int = 0, body: bytes = b"") -> bytes:
+    return HEADER.pack(kind, PROTOCOL_VERSION, count) + body
+
+
+def unpack(frame: bytes) -> Tuple[int, int, bytes]:
+    """
+    Split a frame into kind, count and body.
+
+    Raises:
+        ValueError: If the frame is truncated or from another protocol version.
+    """
+    if len(frame) < HEADER.size:
+        raise ValueError(f"Truncated frame ({len(frame)} bytes)")
+    kind, version, count = HEADER.unpack_from(frame)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    return kind, count, frame[HEADER.size:]
+
+
+def session_id() -> int:
+    """
+    Id of the interactive session this process runs in (the Unix session id elsewhere).
+    """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        session = wintypes.DWORD()
+        if ctypes.windll.kernel32.ProcessIdToSessionId(os.getpid(), ctypes.byref(session)):
+            return session.value
+        return 0
+    return os.getsid(0)
+
+
+class _PipeListener:
+    """
+    Named pipe server for the service. A pipe created by LocalSystem only grants
+    other users read access by default, so the pipe is created with a DACL that
+    lets interactive users connect; multiprocessing's own listener takes no DACL.
+    """
+
+    SDDL = "D:(A;;GA;;;SY)(A;;GA;;;BA)(A;;GRGW;;;IU)"  # SYSTEM and admins full, interactive users read/write
+    BUFFER_SIZE = 8192
+
+    def __init__(self, address: str):
+        import win32security
+        self.address = address
+        self._attributes = win32security.SECURITY_ATTRIBUTES()
+        self._attributes.SECURITY_DESCRIPTOR = win32security.ConvertStringSecurityDescriptorToSecurityDescriptor(
+            self.SDDL, win32security.SDDL_REVISION_1)
+
+    def accept(self):
+        import pywintypes
+        import win32event
+        import win32file
+        import win32pipe
+        import winerror
+        from multiprocessing.connection import PipeConnection
+
+        handle = win32pipe.CreateNamedPipe(
+            self.address, win32pipe.PIPE_ACCESS_DUPLEX | win32file.FILE_FLAG_OVERLAPPED,
+            win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT,
+            win32pipe.PIPE_UNLIMITED_INSTANCES, self.BUFFER_SIZE, self.BUFFER_SIZE, 0, self._attributes)
+        overlapped = pywintypes.OVERLAPPED()
+        overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+        try:
+            if win32pipe.ConnectNamedPipe(handle, overlapped) == winerror.ERROR_IO_PENDING:
+                win32event.WaitForSingleObject(overlapped.hEvent, win32event.INFINITE)
+        except pywintypes.error as e:
+            if e.winerror != winerror.ERROR_PIPE_CONNECTED:  # The client connected before we waited
+                handle.Close()
+                raise OSError(e.strerror) from e
+        return PipeConnection(handle.Detach())
+
+    def close(self):
+        pass  # Pipe instances are owned by their connections
+
+
+def _listen(address: str):
+    if sys.platform == "win32":
+        return _PipeListener(address)
+    if os.path.exists(address):
+        os.remove(address)  # Left behind by an engine that did not shut down cleanly
+    os.makedirs(os.path.dirname(os.path.abspath(address)), exist_ok=True)
+    return Listener(address, family="AF_UNIX")
+
+
+def _interrupt(conn):
+    """
+    Unblock a thread waiting in conn.recv_bytes(). Closing a socket another thread
+    reads from does not wake it on Linux, so the socket is shut down instead.
+    """
+    if isinstance(conn, Connection) and hasattr(socket, "AF_UNIX"):
+        try:
+            with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    else:
+        conn.close()
+
+
+class EngineSession:
+    """
+    One connected agent: its connection and the KeyboardMonitor matching its keystrokes.
+    """
+
+    def __init__(self, conn, monitor, session: int, pid: int, user: str):
+        self.conn = conn
+        self.monitor = monitor
+        self.session = session
+        self.pid = pid
+        self.user = user
+        self.thread: Optional[threading.Thread] = None
+
+
+class EngineServer:
+    """
+    Detection engine hosted by the service, shared by every user session.
+
+    The engine owns the compiled keyword index, the lock state and enforcement.
+    Each agent connection gets a KeyboardMonitor of its own, so keystrokes from
+    two sessions never interleave, but all monitors share one automaton, fuzzy
+    index and normalizer and one Lockdown. A session therefore costs a key ring
+    and a short keystroke buffer, not a copy of the index.
+
+    Every connection has a reader thread that blocks in recv until a batch
+    arrives and pushes its keys into the session's ring; matching runs on the
+    runtime loop exactly as for the in-process keyboard hook.
+    """
+
+    def __init__(self, runtime, matcher, lockdown, skip_separators: bool = True, address: str = DEFAULT_ADDRESS):
+        """
+        Args:
+            runtime: runtime.Runtime whose loop runs the matchers.
+            matcher: config.Matcher shared by all sessions.
+            lockdown: The one lockdown manager every session triggers.
+            skip_separators: See KeyboardMonitor.
+            address: Named pipe on Windows, Unix socket path elsewhere.
+        """
+        self.runtime = runtime
+        self.matcher = matcher
+        self.lockdown = lockdown
+        self.skip_separators = skip_separators
+        self.address = address
+        self.sessions: Dict[int, EngineSession] = {}  # By connection number
+        self._listener = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._connections = 0
+        self._sessions_metric = metrics.gauge("engine.sessions")
+        self._batches_metric = metrics.counter("engine.batches")
+        self._keys_metric = metrics.counter("engine.keys")
+        self._dropped_metric = metrics.counter("engine.agent_dropped")
+
+    def start(self):
+        self._listener = _listen(self.address)
+        self._thread = threading.Thread(target=self._accept_loop, name="EngineAccept", daemon=True)
+        self._thread.start()
+        logger.info(f"Detection engine listening on {self.address}")
+
+    def swap_matcher(self, matcher):
+        """
+        Replace the matcher of every session (config reload).
+        """
+        with self._lock:
+            self.matcher = matcher
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.monitor.skip_separators = self.skip_separators
+            session.monitor.swap_matcher(matcher)
+
+    def stop(self):
+        """
+        Stop accepting agents and close every session. Runs on the loop during shutdown.
+        """
+        self._stopping = True
+        if self._listener is not None:
+            try:
+                Client(self.address).close()  # Wakes the accept loop
+            except OSError:
+                pass
+            self._listener.close()
+            self._thread.join(timeout=2)
+            self._listener = None
+        with self._lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+        for session in sessions:
+            _interrupt(session.conn)
+            session.thread.join(timeout=2)
+            session.conn.close()
+            session.monitor.stop()
+        self._sessions_metric.set(0)
+        logger.info(f"Detection engine stopped ({len(sessions)} sessions closed)")
+
+    def _accept_loop(self):
+        while not self._stopping:
+            try:
+                conn = self._listener.accept()
+            except OSError as e:
+                if not self._stopping:
+                    logger.error(f"Engine accept failed: {e}")
+                    time.sleep(1.0)
+                continue
+            if self._stopping:
+                conn.close()
+                return
+            self._connections += 1
+            threading.Thread(target=self._serve, args=(conn, self._connections),
+                             name=f"EngineSession-{self._connections}", daemon=True).start()
+
+    def _open(self, conn, number: int, body: bytes) -> EngineSession:
+        from keyboard_monitor import KeyboardMonitor
+
+        session, pid = HELLO_BODY.unpack_from(body)
+        user = body[HELLO_BODY.size:].decode("utf-8", errors="replace")
+        with self._lock:
+            matcher = self.matcher
+            monitor = KeyboardMonitor(automaton=matcher.automaton, normalizer=matcher.normalizer,
+                                      skip_separators=self.skip_separators, lockdown=self.lockdown)
+            monitor.swap_matcher(matcher)  # Brings in the fuzzy index; nothing is buffered yet
+            monitor.start_consumer(self.runtime)
+            engine_session = EngineSession(conn, monitor, session, pid, user)
+            engine_session.thread = threading.current_thread()
+            self.sessions[number] = engine_session
+            self._sessions_metric.set(len(self.sessions))
+        conn.send_bytes(pack(WELCOME, body=struct.pack("<I", os.getpid())))
+        logger.info(f"Agent connected: session {session}, user {user}, pid {pid}")
+        return engine_session
+
+    def _serve(self, conn, number: int):
+        """
+        Reader thread of one agent connection.
+        """
+        session = None
+        try:
+            kind, _, body = unpack(conn.recv_bytes())
+            if kind != HELLO:
+                raise ValueError(f"Expected HELLO, got frame kind {kind}")
+            session = self._open(conn, number, body)
+            push = session.monitor.on_press
+            while True:
+                kind, count, body = unpack(conn.recv_bytes())
+                if kind == KEYS:
+                    self._batches_metric.inc()
+                    self._keys_metric.inc(len(body))
+                    if count:
+                        self._dropped_metric.inc(count)
+                    for key in decode_keys(body.decode("utf-8", errors="ignore")):
+                        push(key)
+                elif kind == BYE:
+                    break
+        except (EOFError, OSError):
+            pass  # Agent exited or the engine is stopping
+        except ValueError as e:
+            logger.warning(f"Closing agent connection {number}: {e}")
+        finally:
+            if not self._stopping:
+                conn.close()
+                if session is not None:
+                    with self._lock:
+                        self.sessions.pop(number, None)
+                        self._sessions_metric.set(len(self.sessions))
+                    self.runtime.call_soon_threadsafe(session.monitor.stop)  # Matches what is still queued
+                    logger.info(f"Agent disconnected: session {session.session}, user {session.user}")
+
+
+class SessionAgent:
+    """
+    Thin keyboard agent running in one interactive session.
+
+    It installs the keyboard hook, turns keys into wire text and streams them to
+    the engine in batches. It loads no keyword index and no lockdown state; all
+    detection happens in the engine. Keys typed while the engine is unreachable
+    wait in the ring and are sent once the agent has reconnected.
+    """
+
+    BATCH_SIZE = 256  # Keys per frame at most
+    RECONNECT_INTERVAL = 0.5  # First retry delay in seconds, doubled up to MAX_RECONNECT_INTERVAL
+    MAX_RECONNECT_INTERVAL = 10.0
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, queue_size: int = 4096):
+        """
+        Args:
+            address: Engine address (see DEFAULT_ADDRESS).
+            queue_size: Keys buffered between the hook and the sender thread.
+        """
+        self.address = address
+        self.listener = None
+        self.connected = threading.Event()
+        self.sent_keys = 0
+        self.batches = 0
+        self._events = KeyEventRing(queue_size)
+        self._reported_drops = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._conn = None
+
+    def on_press(self, key):
+        """
+        pynput hook callback. Only enqueues; the sender thread does the IPC.
+        """
+        text = encode_key(key)
+        if text is not None:
+            self._events.push(text)
+
+    def start(self):
+        self.start_sender()
+        import pynput.keyboard  # Imported lazily so the agent can be driven headless
+        self.listener = pynput.keyboard.Listener(on_press=self.on_press)
+        self.listener.name = "KeyboardListener"
+        self.listener.start()
+        logger.info("Session agent started")
+
+    def start_sender(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AgentSender", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self._stop_event.set()
+        self._events.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _connect(self) -> bool:
+        delay = self.RECONNECT_INTERVAL
+        while not self._stop_event.is_set():
+            try:
+                conn = Client(self.address)
+                hello = HELLO_BODY.pack(session_id(), os.getpid()) + getpass.getuser().encode("utf-8")
+                conn.send_bytes(pack(HELLO, body=hello))
+                kind, _, _ = unpack(conn.recv_bytes())
+                if kind != WELCOME:
+                    raise ValueError(f"Expected WELCOME, got frame kind {kind}")
+                self._conn = conn
+                self.connected.set()
+                logger.info(f"Connected to the detection engine at {self.address}")
+                return True
+            except (OSError, EOFError, ValueError) as e:
+                logger.debug(f"Engine not reachable ({e}), retrying in {delay:.1f}s")
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, self.MAX_RECONNECT_INTERVAL)
+        return False
+
+    def _run(self):
+        pending = ""  # Drained but not yet delivered
+        while self._connect():
+            try:
+                while not self._stop_event.is_set():
+                    if not pending:
+                        batch = self._events.drain(self.BATCH_SIZE)
+                        if not batch:
+                            self._events.wait(None)  # No wakeups while nobody types
+                            continue
+                        pending = "".join(batch)
+                    dropped = self._events.dropped
+                    self._conn.send_bytes(pack(KEYS, min(dropped - self._reported_drops, 0xFFFF),
+                                               pending.encode("utf-8", errors="replace")))
+                    self._reported_drops = dropped
+                    self.sent_keys += len(pending)
+                    self.batches += 1
+                    pending = ""
+                self._conn.send_bytes(pack(BYE))
+            except OSError as e:
+                logger.warning(f"Lost the detection engine: {e}")
+            finally:
+                self.connected.clear()
+                self._conn.close()
+                self._conn = None
+            if self._stop_event.is_set():
+                return
+
+
+def run_agent(address: str = DEFAULT_ADDRESS):
+    """
+    Run the session agent until interrupted. Started at logon in each interactive session.
+    """
+    agent = SessionAgent(address)
+    agent.start()
+    try:
+        agent.listener.join()
+    except KeyboardInterrupt:
+        logger.info("Keyboard interrupt detected, stopping agent")
+    finally:
+        agent.stop()
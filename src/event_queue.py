@@ -0,0 +1,88 @@
+import threading
+from typing import Any, List
+
+
+class KeyEventRing:
+    """
+    Bounded single-producer, single-consumer ring buffer for keyboard events.
+
+    The producer (the pynput hook thread) only ever writes the tail index and
+    the consumer only ever writes the head index, so neither side takes a lock.
+    A full ring drops the new event and counts it instead of blocking the hook.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        Args:
+            capacity: Number of slots, rounded up to a power of two.
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._slots: List[Any] = [None] * size
+        self._head = 0  # Next slot to read, advanced by the consumer only
+        self._tail = 0  # Next slot to write, advanced by the producer only
+        self._ready = threading.Event()
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    @property
+    def depth(self) -> int:
+        return self._tail - self._head
+
+    def push(self, event: Any) -> bool:
+        """
+        Enqueue an event without blocking.
+
+        Returns:
+            bool: False if the ring was full and the event was dropped.
+        """
+        tail = self._tail
+        depth = tail - self._head
+        if depth >= self.capacity:
+            self.dropped += 1
+            return False
+        self._slots[tail & self._mask] = event
+        self._tail = tail + 1
+        if depth >= self.high_watermark:
+            self.high_watermark = depth + 1
+        if not self._ready.is_set():
+            self._ready.set()
+        return True
+
+    def drain(self, max_items: int = 256) -> List[Any]:
+        """
+        Dequeue up to max_items events in arrival order.
+        """
+        head = self._head
+        count = min(self._tail - head, max_items)
+        if count <= 0:
+            return []
+        slots, mask = self._slots, self._mask
+        batch = []
+        for position in range(head, head + count):
+            index = position & mask
+            batch.append(slots[index])
+            slots[index] = None
+        self._head = head + count
+        return batch
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block the consumer until the producer signals new events or timeout expires.
+        The signal is cleared before returning, so callers must drain afterwards.
+        """
+        signalled = self._ready.wait(timeout)
+        self._ready.clear()
+        return signalled
+
+    def wake(self):
+        """
+        Wake a waiting consumer, e.g. so it can notice a shutdown request.
+        """
+        self._ready.set()
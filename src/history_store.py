@@ -0,0 +1,282 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join("data", "history.db")
+SCHEMA_VERSION = 1
+
+# seq numbers the events of each kind 1, 2, 3, ... in time order, so the number of
+# events in a time range is the difference of two seq values found by index seeks.
+# run counts the consecutive events of a kind with no gap of a full window between
+# them: for violations, the escalation level, reset by a clean streak.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    run INTEGER NOT NULL,
+    duration REAL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts, seq);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+
+INSERT = "INSERT INTO events (ts, kind, seq, run, duration, detail) VALUES (?, ?, ?, ?, ?, ?)"
+LAST = "SELECT id, ts, kind, seq, run, duration, detail FROM events WHERE kind = ? ORDER BY ts DESC, seq DESC LIMIT 1"
+SEQ_UNTIL = "SELECT seq FROM events WHERE kind = ? AND ts <= ? ORDER BY ts DESC, seq DESC LIMIT 1"
+SEQ_BEFORE = "SELECT seq FROM events WHERE kind = ? AND ts < ? ORDER BY ts DESC, seq DESC LIMIT 1"
+NEXT_KIND = "SELECT kind FROM events WHERE kind > ? ORDER BY kind LIMIT 1"  # Skips through the index, one seek per kind
+
+
+class Event(NamedTuple):
+    id: Optional[int]  # None until flushed
+    ts: float
+    kind: str
+    seq: int
+    run: int
+    duration: Optional[float]
+    detail: Optional[str]
+
+
+class HistoryStore:
+    """
+    Embedded, indexed history of violations, locks, unlocks, bypass attempts and kills.
+
+    Events live in SQLite in WAL mode, so reports can read while the agent
+    writes. Writes are batched: record() only appends to a list, and pending
+    events are inserted in one transaction by flush(), when BATCH_SIZE events
+    are pending, or before any query. Every statement is a constant string, so
+    sqlite3's statement cache prepares each of them once per connection.
+
+    Rolling-window counts, the escalation level and the clean streak are each
+    answered with one or two seeks on the (kind, ts) index, independent of how
+    many events were recorded.
+
+    The database is opened on first use, so components that never record an
+    event (and the boot path before the first lock) do not pay for it.
+    """
+
+    BATCH_SIZE = 64
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, window: timedelta = timedelta(days=7)):
+        """
+        Args:
+            path: Database file.
+            window: A gap this long between two events of a kind ends their run (the
+                violation clean streak).
+        """
+        self.path = path
+        self.window = window.total_seconds()
+        self.flushes = 0
+        self._pending: List[Event] = []
+        self._last: Dict[str, Event] = {}  # Latest event per kind, including pending ones
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Connect and load the latest event of each kind. Called with the lock held.
+        """
+        if self._db is not None:
+            return self._db
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent on power loss; fsync at checkpoints
+        if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            db.executescript(SCHEMA)
+            db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        row = db.execute(NEXT_KIND, ("",)).fetchone()
+        while row is not None:
+            self._last[row[0]] = Event(*db.execute(LAST, row).fetchone())
+            row = db.execute(NEXT_KIND, row).fetchone()
+        self._db = db
+        return db
+
+    def record(self, kind: str, ts: Optional[float] = None, duration: Optional[float] = None,
+               detail: Optional[str] = None, run: Optional[int] = None, flush: bool = False) -> Event:
+        """
+        Queue an event.
+
+        Args:
+            kind: 'violation', 'lock', 'unlock', 'bypass', 'kill', ...
+            ts: Unix time (now if None). Clamped to the previous event of the kind, so a
+                clock set back cannot reorder history.
+            duration: Seconds, e.g. of a lock.
+            detail: Free text, e.g. the policy and process of a kill.
+            run: Override the computed run, e.g. a violation count carried over from the journal.
+            flush: Write this and every pending event before returning.
+
+        Returns:
+            Event: The queued event.
+        """
+        with self._lock:
+            self._open()
+            ts = time.time() if ts is None else ts
+            last = self._last.get(kind)
+            if last is not None:
+                ts = max(ts, last.ts)
+                if run is None:
+                    run = last.run + 1 if ts - last.ts < self.window else 1
+            event = Event(None, ts, kind, last.seq + 1 if last else 1, run or 1, duration, detail)
+            self._last[kind] = event
+            self._pending.append(event)
+            if flush or len(self._pending) >= self.BATCH_SIZE:
+                self._flush()
+        return event
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            db = self._open()
+            with db:  # One transaction per batch
+                db.execute("BEGIN")
+                db.executemany(INSERT, [event[1:] for event in pending])
+            self.flushes += 1
+        except sqlite3.Error as e:
+            logger.error(f"Could not write {len(pending)} history events: {e}")
+
+    def last(self, kind: str) -> Optional[Event]:
+        """
+        Latest event of a kind, pending or written.
+        """
+        with self._lock:
+            self._open()
+            return self._last.get(kind)
+
+    def count(self, kind: str, since: float, until: Optional[float] = None) -> int:
+        """
+        Events of a kind with since <= ts <= until, from two index seeks.
+        """
+        with self._lock:
+            self._flush()
+            db = self._open()
+            row = db.execute(SEQ_UNTIL, (kind, time.time() if until is None else until)).fetchone()
+            if row is None:
+                return 0
+            before = db.execute(SEQ_BEFORE, (kind, since)).fetchone()
+            return row[0] - (before[0] if before else 0)
+
+    def clean_streak(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds since the last violation, or None if there never was one.
+        """
+        last = self.last("violation")
+        return None if last is None else max(0.0, (time.time() if now is None else now) - last.ts)
+
+    def escalation_level(self, now: Optional[float] = None) -> Optional[int]:
+        """
+        Violations in the current run: 0 once a full window passed without one.
+
+        Returns:
+            int: The level, or None if no violation was ever recorded.
+        """
+        last = self.last("violation")
+        if last is None:
+            return None
+        return last.run if self.clean_streak(now) < self.window else 0
+
+    def events(self, since: float, until: Optional[float] = None, kinds: Optional[Sequence[str]] = None,
+               limit: Optional[int] = None) -> List[Event]:
+        """
+        Events in a time range, oldest first.
+
+        Args:
+            limit: Return only the most recent events of the range.
+        """
+        query = "SELECT id, ts, kind, seq, run, duration, detail FROM events WHERE ts >= ? AND ts <= ?"
+        params: list = [since, time.time() if until is None else until]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        query += " ORDER BY ts DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            self._flush()
+            rows = self._open().execute(query, params).fetchall()
+        return [Event(*row) for row in reversed(rows)]
+
+    def summary(self, days: float = 30, now: Optional[float] = None) -> dict:
+        """
+        Counts per kind over the last days, the escalation level and the clean streak.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._open()
+            kinds = sorted(self._last)
+        streak = self.clean_streak(now)
+        return {
+            'days': days,
+            'counts': {kind: self.count(kind, now - days * 86400, now) for kind in kinds},
+            'totals': {kind: self.last(kind).seq for kind in kinds},
+            'escalation_level': self.escalation_level(now) or 0,
+            'clean_streak_days': None if streak is None else round(streak / 86400, 2),
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _format(event: Event) -> str:
+    when = datetime.fromtimestamp(event.ts).strftime("%Y-%m-%d %H:%M:%S")
+    duration = f" {event.duration / 3600:.1f}h" if event.duration else ""
+    detail = f" {event.detail}" if event.detail else ""
+    return f"{when}  {event.kind:<10}#{event.seq}{duration}{detail}"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Print a report: counts per kind, escalation level, clean streak and recent events.
+    """
+    parser = argparse.ArgumentParser(description="ImaanGuard history report")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_PATH, help="History database")
+    parser.add_argument("--days", type=float, default=30, help="Report window in days")
+    parser.add_argument("--events", type=int, default=20, help="Recent events to list")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"No history at {args.db}", file=sys.stderr)
+        return 1
+    store = HistoryStore(args.db)
+    try:
+        summary = store.summary(args.days)
+        print(f"Last {args.days:g} days: " + (", ".join(f"{kind} {count}" for kind, count in summary['counts'].items())
+                                             or "no events"))
+        print("All time: " + ", ".join(f"{kind} {total}" for kind, total in summary['totals'].items()))
+        streak = summary['clean_streak_days']
+        print(f"Escalation level: {summary['escalation_level']}, clean streak: "
+              + ("no violations recorded" if streak is None else f"{streak} days"))
+        recent = store.events(time.time() - args.days * 86400, limit=args.events)
+        if recent:
+            print("Recent events:")
+            for event in recent:
+                print("  " + _format(event))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
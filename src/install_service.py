@@ -1,21 +1,54 @@
 import win32serviceutil
 import win32service
-import win32event
 import servicemanager
 import os
 import sys
-import logging
-import threading
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] [Service]: %(message)s",
-    handlers=[
-        logging.FileHandler(os.path.join(os.path.dirname(__file__), "..", "data", "service.log")),
-        logging.StreamHandler()
-    ]
-)
+import winreg
+from logger import configure as configure_logging, get_logger
+
+# Configure logging; encrypted like the interactive log (python encrypted_log.py --since 1h to read it)
+from encrypted_log import EncryptedLogHandler
+configure_logging(level="INFO", extra_handlers=[EncryptedLogHandler(os.path.join(os.path.dirname(__file__), "..", "data", "logs"))])
+logger = get_logger("service")
+
+# Starts the keyboard agent in every user session at logon; written by "install", removed by "remove"
+AGENT_RUN_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Run"
+AGENT_RUN_VALUE = "ImaanGuardAgent"
+
+
+def agent_command() -> str:
+    """
+    Command line of the session agent. Resolved at install time: the service itself
+    runs under pythonservice.exe, which cannot start main.py.
+    """
+    pythonw = os.path.join(os.path.dirname(sys.executable), "pythonw.exe")
+    interpreter = pythonw if os.path.exists(pythonw) else sys.executable  # No console window at logon
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    return f'"{interpreter}" "{main_path}" --agent'
+
+
+def register_agent_launcher():
+    with winreg.CreateKeyEx(winreg.HKEY_LOCAL_MACHINE, AGENT_RUN_KEY, 0, winreg.KEY_SET_VALUE) as key:
+        winreg.SetValueEx(key, AGENT_RUN_VALUE, 0, winreg.REG_SZ, agent_command())
+    logger.info("Session agent registered to start at logon")
+
+
+def unregister_agent_launcher():
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, AGENT_RUN_KEY, 0, winreg.KEY_SET_VALUE) as key:
+            winreg.DeleteValue(key, AGENT_RUN_VALUE)
+    except FileNotFoundError:
+        pass
+
+
+def agent_launcher_registered() -> bool:
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, AGENT_RUN_KEY) as key:
+            winreg.QueryValueEx(key, AGENT_RUN_VALUE)
+        return True
+    except FileNotFoundError:
+        return False
+
 
 class ImaanGuardService(win32serviceutil.ServiceFramework):
     _svc_name_ = "ImaanGuardService"
@@ -24,19 +57,20 @@ class ImaanGuardService(win32serviceutil.ServiceFramework):
 
     def __init__(self, args):
         win32serviceutil.ServiceFramework.__init__(self, args)
-        self.stop_event = win32event.CreateEvent(None, 0, 0, None)
+        from runtime import Runtime
+        self.runtime = Runtime()  # The agent's event loop runs on the service thread
         self.is_running = False
 
     def SvcStop(self):
         self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
         self.is_running = False
-        win32event.SetEvent(self.stop_event)
-        logging.info("ImaanGuard service stopping")
+        self.runtime.request_stop()  # Called on the control handler thread; the loop shuts down in order
+        logger.info("ImaanGuard service stopping")
 
     def SvcDoRun(self):
         self.is_running = True
         self.ReportServiceStatus(win32service.SERVICE_START_PENDING)  # Report pending status
-        logging.info("ImaanGuard service starting")
+        logger.info("ImaanGuard service starting")
 
         servicemanager.LogMsg(
             servicemanager.EVENTLOG_INFORMATION_TYPE,
@@ -44,25 +78,21 @@ class ImaanGuardService(win32serviceutil.ServiceFramework):
             (self._svc_name_, "")
         )
 
-        def run_main():
-            try:
-                main_script = os.path.join(os.path.dirname(__file__), "main.py")
-                os.chdir(os.path.dirname(__file__))
-                self.ReportServiceStatus(win32service.SERVICE_RUNNING)  # Report running status
-                import main
-                main.main()
-            except Exception as e:
-                logging.error(f"Service error: {e}")
-                servicemanager.LogErrorMsg(str(e))
-                self.SvcStop()
-
-        # Start the main logic in a separate thread
-        thread = threading.Thread(target=run_main)
-        thread.start()
-
-        # Wait for stop event
-        win32event.WaitForSingleObject(self.stop_event, win32event.INFINITE)
-        logging.info("ImaanGuard service stopped")
+        try:
+            os.chdir(os.path.dirname(__file__))
+            self.ReportServiceStatus(win32service.SERVICE_RUNNING)  # Report running status
+            import main
+            # Hooks only work inside a user session, so the service hosts the detection
+            # engine and each session runs a thin agent (main.py --agent) that streams keys to it.
+            # Without the logon launcher no agent would connect, so the service monitors in-process.
+            engine = agent_launcher_registered()
+            if not engine:
+                logger.warning("Session agent launcher not registered, monitoring in-process")
+            main.main(runtime=self.runtime, engine=engine)  # Returns once SvcStop has shut the runtime down
+        except Exception as e:
+            logger.error(f"Service error: {e}")
+            servicemanager.LogErrorMsg(str(e))
+        logger.info("ImaanGuard service stopped")
 
 if __name__ == "__main__":
     if len(sys.argv) == 1:
@@ -70,4 +100,8 @@ if __name__ == "__main__":
         servicemanager.PrepareToHostSingle(ImaanGuardService)
         servicemanager.StartServiceCtrlDispatcher()
     else:
-        win32serviceutil.HandleCommandLine(ImaanGuardService)
\ No newline at end of file
+        win32serviceutil.HandleCommandLine(ImaanGuardService)
+        if "install" in sys.argv or "update" in sys.argv:
+            register_agent_launcher()
+        elif "remove" in sys.argv:
+            unregister_agent_launcher()
\ No newline at end of file
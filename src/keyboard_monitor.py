@@ -1,160 +1,376 @@
-import pynput.keyboard
 import time
-from typing import List, Callable
-from Levenshtein import distance as levenshtein_distance
+import threading
+from typing import List, Callable, Optional
 from lockdown import Lockdown
+from matcher import FuzzyIndex, KeywordAutomaton
+from config import Matcher
+from event_queue import KeyEventRing
+from normalizer import Normalizer
+from keystroke_buffer import KeystrokeBuffer
+import metrics
+from logger import configure as configure_logging, get_logger
 
+logger = get_logger(__name__)
+
+# Characters (after normalization) used to split a keyword, as in "por-n" or "p o r n"
+DEFAULT_SEPARATORS = " -_.,*~+|/\\'`\"^:;"
 
 
 class KeyboardMonitor:
-    def __init__(self, keywords: List[str], buffer_size: int = 20, lock_callback: Callable = None):
+    BATCH_SIZE = 256  # Events handled per consumer wakeup
+    IDLE_TIMEOUT = 0.5  # Seconds the consumer sleeps before re-checking for shutdown
+    MATCH_SAMPLE_EVERY = 32  # Characters between matcher timing samples
+    SUPERVISE_INTERVAL = 10.0  # Seconds between keyboard hook liveness checks
+
+    def __init__(self, keywords: Optional[List[str]] = None, buffer_size: int = 64, lock_callback: Callable = None, fuzzy_distance: int = 0,
+                 automaton: Optional[KeywordAutomaton] = None, queue_size: int = 4096, normalizer: Optional[Normalizer] = None,
+                 separators: str = DEFAULT_SEPARATORS, skip_separators: bool = True, lockdown: Optional[Lockdown] = None):
         """
         Initialize the keyboard monitor.
+
+        Args:
+            keywords: Keywords that trigger a lockdown (ignored when automaton is given).
+            buffer_size: Number of characters remembered so backspace can rewind the matcher.
+            lock_callback: Called when a keyword is typed (defaults to trigger_lockdown).
+            fuzzy_distance: Maximum edit distance for fuzzy matching of a completed word (0 disables it).
+                Words are looked up once they end (space or Enter), never while a prefix is typed,
+                so "lingered" is not caught on its way past "lingere".
+            automaton: Precompiled automaton, e.g. a memory-mapped index from keyword_index.load_index().
+            queue_size: Capacity of the ring between the keyboard hook and the detection thread.
+            normalizer: Folds keywords and typed characters to one canonical form. A precompiled
+                automaton must have been built with an equivalent normalizer.
+            separators: Characters that may be inserted into a keyword to split it.
+            skip_separators: Also match with separators removed, so "por-n" and "p o r n" are caught.
+                Spaces are only skipped between single letters, so "top ornament" stays clean.
+            lockdown: Shared lockdown manager, e.g. the one that restored the lock on boot (a new one if None).
         """
-        print("[DEBUG] [KeyboardMonitor.__init__]: Initializing keyboard monitor")
-        print(f"[DEBUG] [KeyboardMonitor.__init__]: Keywords: {keywords}")
-        print(f"[DEBUG] [KeyboardMonitor.__init__]: Buffer size: {buffer_size}")
-        
-        self.keywords = [k.lower() for k in keywords]
+        logger.debug("Initializing keyboard monitor")
+        logger.debug(f"Buffer size: {buffer_size}")
+
+        self.normalizer = normalizer or Normalizer()
+        self._fold = self.normalizer.table
+        self.automaton = automaton if automaton is not None else KeywordAutomaton(self.normalizer.keywords(keywords))
+        self.keywords = self.automaton.keywords
         self.buffer_size = buffer_size
-        self.lockdown = Lockdown()
+        logger.debug(f"Keywords loaded: {len(self.keywords)}")
+        self.fuzzy_index = FuzzyIndex(self.keywords, max_distance=fuzzy_distance) if fuzzy_distance > 0 else None
+        self.lockdown = lockdown or Lockdown()
         self.violation_count = 0
-        self.keystroke_buffer = [] # List of lists, each containing chars of a word
-        self.current_word = [] # List for current word's characters
+        self.separators = frozenset(separators)
+        self.skip_separators = skip_separators
+        self._state = KeywordAutomaton.ROOT
+        self._joined_state = KeywordAutomaton.ROOT  # Same stream with separators skipped
+        self._buffer = KeystrokeBuffer(buffer_size)
         self.lock_callback = self.trigger_lockdown if lock_callback is None else lock_callback
         self.listener = None
-        print("[INFO] [KeyboardMonitor.__init__]: Keyboard monitor initialized successfully")
-    
-    # Placeholder for lockdown function (to be imported from lockdown.py later)
-    def trigger_lockdown(self):
-        print("[INFO] [trigger_lockdown]: Lockdown triggered")
-        print("Haram content detected! Triggering lockdown...") # Debugging, replace with actual lockdown call
-        
-        print("[INFO] [KeyboardMonitor.trigger_lockdown]: Lockdown triggered")
-        print("[INFO] [KeyboardMonitor.trigger_lockdown]: Haram content detected!")
-
+        self._events = KeyEventRing(queue_size)
+        self._consumer_thread = None
+        self._consumer_stop = threading.Event()
+        self._runtime = None  # runtime.Runtime draining the ring instead of the consumer thread
+        self._drain_scheduled = False
+        self.processed_events = 0
+        self.batches = 0
+        self._pending_matcher: Optional[Matcher] = None
+        self.last_detection = None  # time.perf_counter() of the last keyword match
+        self._sample_countdown = self.MATCH_SAMPLE_EVERY
+        self._handle_metric = metrics.histogram("keystroke.handle_us", metrics.MICROSECONDS)
+        self._match_metric = metrics.histogram("keystroke.match_us", metrics.MICROSECONDS)
+        self._depth_metric = metrics.histogram("keystroke.queue_depth", metrics.SIZES)
+        self._dropped_metric = metrics.gauge("keystroke.dropped")
+        self._detections_metric = metrics.counter("keystroke.detections")
+        logger.info("Keyboard monitor initialized successfully")
 
-        self.lockdown.lock_system(is_bypass=False)
+    def trigger_lockdown(self):
+        logger.info("Haram content detected! Triggering lockdown")
+        if self._runtime is None:
+            self.lockdown.lock_system(is_bypass=False, detected_at=self.last_detection)
+            return
+        # The history flush and journal fsync block, so only the state flip happens on the loop
+        self.lockdown.is_locked = True
+        self._runtime.executor.submit(self.lockdown.lock_system, is_bypass=False, detected_at=self.last_detection)
     
     def on_press(self, key):
         """
-        Handle each keypress, build words as char lists (including spaces), and check on Enter or buffer full.
+        pynput hook callback. Only enqueues the key: Windows drops low-level hooks
+        whose callback is slow, so all detection work happens on the consumer thread
+        or the runtime loop.
+        """
+        self._events.push(key)
+        if self._runtime is not None and not self._drain_scheduled:
+            # One loop wakeup per burst: the drain empties the ring, later keys ride along
+            self._drain_scheduled = True
+            self._runtime.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        self._drain_scheduled = False  # Cleared before draining, so a key pushed meanwhile schedules another drain
+        self.process_pending()
+
+    def process_pending(self) -> int:
+        """
+        Handle queued key events in batches until the queue is empty.
+
+        Returns:
+            int: Number of events handled.
+        """
+        handled = 0
+        if self._pending_matcher is not None:
+            self._apply_matcher()
+        perf = time.perf_counter_ns
+        while True:
+            depth = self._events.depth
+            batch = self._events.drain(self.BATCH_SIZE)
+            if not batch:
+                return handled
+            self.batches += 1
+            started = perf()
+            for key in batch:
+                self._handle_key(key)
+            self._handle_metric.observe((perf() - started) / 1000 / len(batch))  # Mean per key in the batch
+            self._depth_metric.observe(depth)
+            self._dropped_metric.set(self._events.dropped)
+            handled += len(batch)
+            self.processed_events += len(batch)
+
+    def _consume(self):
+        """
+        Consumer thread: wait for the hook to signal new events, then process them.
+        """
+        while not self._consumer_stop.is_set():
+            if not self.process_pending():
+                self._events.wait(self.IDLE_TIMEOUT)
+        self.process_pending()
+
+    def _handle_key(self, key):
+        """
+        Step the keyword automaton for one key.
+        Backspace rewinds to the previous state and Enter resets the stream.
         """
-        print(f"[DEBUG] [KeyboardMonitor.on_press]: Key pressed: {key}")
         try:
-            if hasattr(key, 'char') and key.char is not None:
-                char = key.char.lower()
-                # If current_word ends with a space, treat that as a word boundary
-                if self.current_word and self.current_word[-1] == ' ':
-                    self.keystroke_buffer.append(self.current_word[:-1])  # exclude the space
-                    print(f"[DEBUG] [KeyboardMonitor.on_press]: New word started, added word: {self.current_word[:-1]}")
-                    self.current_word = []
-                self.current_word.append(char)
-                print(f"[DEBUG] [KeyboardMonitor.on_press]: Added character to current word: {char}")
-
-            elif key == pynput.keyboard.Key.space:
-                self.current_word.append(' ')
-                print("[DEBUG] [KeyboardMonitor.on_press]: Space key added as character")
-
-            elif key == pynput.keyboard.Key.backspace:
-                if self.current_word:
-                    removed_char = self.current_word.pop()
-                    print(f"[DEBUG] [KeyboardMonitor.on_press]: Backspace removed char: {removed_char}")
-                elif self.keystroke_buffer:
-                    # Pop last word from buffer and move to current_word
-                    popped_word = self.keystroke_buffer.pop()
-                    self.current_word = popped_word
-                    print(f"[DEBUG] [KeyboardMonitor.on_press]: Backspace retrieved word from buffer: {popped_word}")
-                else:
-                    print("[DEBUG] [KeyboardMonitor.on_press]: Backspace ignored (empty buffer and current word)")
-
-            elif key == pynput.keyboard.Key.enter:
-                if self.current_word:
-                    # If current word ends in space, strip it before saving
-                    if self.current_word[-1] == ' ':
-                        self.keystroke_buffer.append(self.current_word[:-1])
-                        print(f"[DEBUG] [KeyboardMonitor.on_press]: Enter key detected, added word: {self.current_word[:-1]}")
-                    else:
-                        self.keystroke_buffer.append(self.current_word)
-                        print(f"[DEBUG] [KeyboardMonitor.on_press]: Enter key detected, added word: {self.current_word}")
-                    self.current_word = []
-                print("[DEBUG] [KeyboardMonitor.on_press]: Checking buffer for keywords")
-                self.check_buffer()
-
-            # Final buffer check if limit exceeded
-            if len(self.keystroke_buffer) > self.buffer_size:
-                print("[DEBUG] [KeyboardMonitor.on_press]: Buffer full, checking keywords")
-                self.check_buffer()
+            char = getattr(key, 'char', None)
+            if char is not None:
+                folded = self._fold[char]
+                if len(folded) == 1:
+                    self._advance(folded)
+                else:  # Ligatures expand to several characters, combining marks to none
+                    for c in folded:
+                        self._advance(c)
+                return
+
+            name = getattr(key, 'name', None)
+            if name == 'space':
+                self._advance(' ')
+            elif name == 'backspace':
+                self._rewind()
+            elif name == 'enter':
+                keyword = self._fuzzy_word()
+                self.reset()
+                if keyword is not None:
+                    self._detected(keyword)
 
         except Exception as e:
-            print(f"[ERROR] [KeyboardMonitor.on_press]: Error processing key press: {e}")
-            print(f"[ERROR] [KeyboardMonitor.on_press]: Current buffer: {self.keystroke_buffer}, Current word: {self.current_word}")
+            logger.error(f"Error processing key press: {e}")
+            logger.error(f"Current state: {self._state}, Buffered characters: {len(self._buffer)}")
 
-    
-    def check_buffer(self):
-        """
-        Check buffer for blocked keywords by substring matching.
-        """
-        print("[DEBUG] [KeyboardMonitor.check_buffer]: Checking buffer for keywords")
-        print(f"[DEBUG] [KeyboardMonitor.check_buffer]: Current buffer: {self.keystroke_buffer}")
-        for word_chars in self.keystroke_buffer:
-            if not word_chars:  # Skip empty words
-                continue
-            word = ''.join(word_chars).lower()
-            print(f"[DEBUG] [KeyboardMonitor.check_buffer]: Checking word: {word}")
-            for keyword in self.keywords:
-                # Check if keyword is substring of the word
-                if keyword in word:
-                    print(f"[INFO] [KeyboardMonitor.check_buffer]: Keyword detected: {keyword} (found inside: {word})")
-                    self.lock_callback()
-                    self.keystroke_buffer.clear()
-                    self.current_word = []
-                    print("[INFO] [KeyboardMonitor.check_buffer]: Buffer and current word cleared after keyword detection")
-                    return
-        # If buffer is full and no match, clear buffer
-        if len(self.keystroke_buffer) >= self.buffer_size:
-            print("[INFO] [KeyboardMonitor.check_buffer]: Buffer full, no keywords detected, clearing buffer")
-            self.keystroke_buffer.clear()
-            self.current_word = []
+    def swap_matcher(self, matcher: Matcher):
+        """
+        Replace the keyword matcher without stopping the listener.
 
-    
-    def start(self):
+        The swap happens on the consumer thread between batches, so a keystroke is
+        always matched entirely by the old or the new matcher. Buffered characters
+        are replayed through the new matcher, so a keyword typed across the swap is
+        still caught.
+        """
+        self._pending_matcher = matcher
+        if self._runtime is not None:
+            self._runtime.call_soon_threadsafe(self._drain)
+        elif self._consumer_thread is None or not self._consumer_thread.is_alive():
+            self.process_pending()
+        else:
+            self._events.wake()
+
+    def _apply_matcher(self):
+        matcher, self._pending_matcher = self._pending_matcher, None
+        text = self._buffer.text()
+        self.automaton = matcher.automaton
+        self.keywords = matcher.automaton.keywords
+        self.fuzzy_index = matcher.fuzzy_index
+        self.normalizer = matcher.normalizer
+        self._fold = matcher.normalizer.table
+        self.reset()
+        for char in text:
+            self._feed(char)  # Rebuild matcher state only; text typed before the swap does not trigger
+        logger.info(f"Keyword matcher swapped in ({len(self.keywords)} keywords, {len(text)} characters replayed)")
+
+    def start_consumer(self, runtime=None):
+        """
+        Start draining the key event ring: on the given runtime.Runtime loop, or on
+        a dedicated detection thread if None.
         """
-        Start the keyboard listener.
+        if runtime is not None:
+            self._runtime = runtime
+            runtime.call_soon_threadsafe(self._drain)  # Keys that arrived before the runtime was attached
+            return
+        self._consumer_stop.clear()
+        self._consumer_thread = threading.Thread(target=self._consume, name="KeystrokeConsumer", daemon=True)
+        self._consumer_thread.start()
+
+    def stats(self) -> dict:
+        """
+        Return pipeline counters: queue depth, dropped events and throughput.
+        """
+        return {
+            'queue_depth': self._events.depth,
+            'queue_high_watermark': self._events.high_watermark,
+            'queue_capacity': self._events.capacity,
+            'dropped_events': self._events.dropped,
+            'processed_events': self.processed_events,
+            'batches': self.batches,
+        }
+
+    def _advance(self, char: str):
         """
-        print("[INFO] [KeyboardMonitor.start]: Starting keyboard listener")
+        Feed one character to the automaton and fire the lock callback as soon as a keyword completes.
+        """
+        self._sample_countdown -= 1
+        if self._sample_countdown:
+            keyword = self._feed(char)
+        else:
+            self._sample_countdown = self.MATCH_SAMPLE_EVERY
+            started = time.perf_counter_ns()
+            keyword = self._feed(char)
+            self._match_metric.observe((time.perf_counter_ns() - started) / 1000)
+        if keyword is not None:
+            self.reset()
+            self._detected(keyword)
+
+    def _detected(self, keyword: str):
+        self.last_detection = time.perf_counter()
+        self._detections_metric.inc()
+        logger.info(f"Keyword detected: {keyword}")
+        self.lock_callback()
+
+    def _feed(self, char: str) -> Optional[str]:
+        """
+        Step the matchers over one character and buffer it.
+
+        Returns:
+            str: The keyword completed by this character, if any.
+        """
+        automaton = self.automaton
+        state, joined_state = self._state, self._joined_state
+        fuzzy = self._fuzzy_word() if char == ' ' else None  # The word this space completes
+        self._state = automaton.step(state, char)
+        keyword = automaton.match(self._state)
+
+        if self.skip_separators and not self._is_skipped_separator(char):
+            self._joined_state = automaton.step(joined_state, char)
+            if keyword is None:
+                keyword = automaton.match(self._joined_state)
+        self._buffer.push(char, state, joined_state)
+        return keyword if keyword is not None else fuzzy
+
+    def _fuzzy_word(self) -> Optional[str]:
+        """
+        Fuzzy-match the word typed since the last space, without trailing punctuation.
+        """
+        if self.fuzzy_index is None:
+            return None
+        word = self._buffer.word(' ').rstrip(''.join(self.separators))
+        return self.fuzzy_index.lookup(word) if word else None
+
+    def _is_skipped_separator(self, char: str) -> bool:
+        """
+        Whether the separator-free stream should ignore char. Spaces only count as
+        separators around single letters ("p o r n"), never between real words.
+        """
+        if char not in self.separators:
+            return False
+        if char != ' ':
+            return True
+        previous = self._buffer.last(1)
+        before = self._buffer.last(2)
+        return previous in self.separators or before in self.separators or not before
+
+    def _rewind(self):
+        """
+        Undo the last character. Once the buffer is exhausted the stream restarts from the root.
+        """
+        entry = self._buffer.pop()
+        if entry is None:
+            self._state = self._joined_state = KeywordAutomaton.ROOT
+        else:
+            _, self._state, self._joined_state = entry
+
+    def reset(self):
+        """
+        Forget all typed characters and restart matching from the root state.
+        """
+        self._state = self._joined_state = KeywordAutomaton.ROOT
+        self._buffer.clear()
+
+    def start(self, runtime=None):
+        """
+        Start the detection consumer and the keyboard listener.
+
+        Args:
+            runtime: runtime.Runtime whose loop processes the keys (a consumer thread if None).
+        """
+        logger.info("Starting keyboard listener")
+        self.start_consumer(runtime)
+        self._start_listener()
+        logger.info("Keyboard listener started successfully")
+
+    def _start_listener(self):
+        import pynput.keyboard  # Imported lazily so the monitor can be driven headless
         self.listener = pynput.keyboard.Listener(on_press=self.on_press)
+        self.listener.name = "KeyboardListener"  # Named so diagnostics can profile it
         self.listener.start()
-        print("[INFO] [KeyboardMonitor.start]: Keyboard listener started successfully")
+
+    def supervise(self) -> float:
+        """
+        Restart the keyboard hook if its thread died (e.g. the hook was removed by
+        the OS). Scheduled periodically by boot.
+
+        Returns:
+            float: Seconds until the next check.
+        """
+        if self.listener is not None and not self.listener.is_alive():
+            logger.warning("Keyboard listener stopped unexpectedly, restarting it")
+            metrics.counter("keystroke.listener_restarts").inc()
+            self._start_listener()
+        return self.SUPERVISE_INTERVAL
     
     def stop(self):
         """
-        Stop the keyboard listener.
+        Stop the keyboard listener, then let the consumer drain what was queued.
         """
-        print("[INFO] [KeyboardMonitor.stop]: Stopping keyboard listener")
+        logger.info("Stopping keyboard listener")
         if self.listener:
             self.listener.stop()
             self.listener = None
-            print("[INFO] [KeyboardMonitor.stop]: Keyboard listener stopped successfully")
-        else:
-            print("[WARNING] [KeyboardMonitor.stop]: No active listener to stop")
+            logger.info("Keyboard listener stopped successfully")
+        elif self._runtime is None:
+            logger.warning("No active listener to stop")
+        if self._runtime is not None:
+            self._runtime = None
+            self.process_pending()  # Called on the loop during shutdown
+        if self._consumer_thread:
+            self._consumer_stop.set()
+            self._events.wake()
+            self._consumer_thread.join(timeout=5)
+            self._consumer_thread = None
+            logger.info(f"Consumer stopped, stats: {self.stats()}")
 
 def main():
-    print("[INFO] [main]: Starting main function")
-    blocked_keywords = ["porn", "adult", "nsfw", "xxx", "sex", "nude", "hentai", "erotic", "fetish", "kink", "mature", "spicy", "fitgirl", "dodi", "pussy", "anal", "boobs", "sexy", "naked", "bikini", "lingerie", "striptease"]
-    print(f"[DEBUG] [main]: Blocked keywords loaded: {len(blocked_keywords)}")
-    monitor = KeyboardMonitor(keywords=blocked_keywords, buffer_size=10)
-    monitor.start()
-    print("[INFO] [main]: Keyboard monitor running")
-    try:
-        while True:
-            time.sleep(1) # Keep main thread alive
-    except KeyboardInterrupt:
-        print("[INFO] [main]: Keyboard interrupt detected, stopping monitor")
-        monitor.stop()
-        print("[INFO] [main]: Keyboard monitor terminated")
+    """
+    Run the monitor with the staged startup in boot.py (restore lock, matcher, listener, services).
+    """
+    logger.info("Starting main function")
+    from boot import run
+    run()
 
 if __name__ == "__main__":
-    print("[INFO] [__main__]: Starting keyboard monitor application")
+    configure_logging()
+    logger.info("Starting keyboard monitor application")
     main()
-    print("[INFO] [__main__]: Application terminated")
\ No newline at end of file
+    logger.info("Application terminated")
\ No newline at end of file
@@ -0,0 +1,74 @@
+from array import array
+from typing import Optional, Tuple
+
+
+class KeystrokeBuffer:
+    """
+    Fixed-size ring of the last N normalized characters.
+
+    Next to each character it stores the matcher states from before that
+    character was typed, so backspace restores the matcher in O(1). All storage
+    is allocated up front; once full, the oldest character is overwritten.
+    """
+
+    def __init__(self, capacity: int = 64):
+        """
+        Args:
+            capacity: Characters kept. Backspacing further than this restarts matching.
+        """
+        self.capacity = capacity
+        self._chars = [''] * capacity
+        self._states = array('q', [0]) * capacity  # 64-bit: LayeredAutomaton states are products
+        self._joined_states = array('q', [0]) * capacity
+        self._start = 0  # Absolute index of the oldest kept character
+        self._end = 0  # Absolute index one past the newest character
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def push(self, char: str, state: int, joined_state: int):
+        """
+        Append a character with the matcher states from before it was typed.
+        """
+        slot = self._end % self.capacity
+        self._chars[slot] = char
+        self._states[slot] = state
+        self._joined_states[slot] = joined_state
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def pop(self) -> Optional[Tuple[str, int, int]]:
+        """
+        Remove the newest character.
+
+        Returns:
+            tuple: (char, state, joined_state) as pushed, or None if the buffer is empty.
+        """
+        if self._end == self._start:
+            return None
+        self._end -= 1
+        slot = self._end % self.capacity
+        return self._chars[slot], self._states[slot], self._joined_states[slot]
+
+    def last(self, offset: int = 1) -> str:
+        """
+        The character offset positions back from the newest one, or '' if it is not kept.
+        """
+        index = self._end - offset
+        return self._chars[index % self.capacity] if index >= self._start else ''
+
+    def word(self, separator: str = ' ') -> str:
+        """
+        Characters typed since the last separator.
+        """
+        index = self._end
+        while index > self._start and self._chars[(index - 1) % self.capacity] != separator:
+            index -= 1
+        return ''.join(self._chars[i % self.capacity] for i in range(index, self._end))
+
+    def text(self) -> str:
+        return ''.join(self._chars[i % self.capacity] for i in range(self._start, self._end))
+
+    def clear(self):
+        self._start = self._end
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+from array import array
+from typing import Iterable, List, Optional
+
+from matcher import KeywordAutomaton
+from normalizer import Normalizer
+from logger import configure as configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+# Binary layout, every section 4-byte aligned and stored in the byte order of the build machine:
+#   header | edge_start[n_states + 1] | edge_label[n_edges] | edge_target[n_edges]
+#          | fail[n_states] | output[n_states] | keyword_offsets[n_keywords + 1] | keyword_blob
+MAGIC = b"IGKI"
+VERSION = 2
+# magic, version, byte order, n_states, n_edges, n_keywords, blob_len, Normalizer.fingerprint()
+HEADER = struct.Struct("<4sHHIIII8s")
+HEADER_V1 = struct.Struct("<4sHHIIII")  # Before the fingerprint; same sections after the header
+NATIVE_BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+
+# index_path names a small pointer file holding the file name of the current build,
+# index_path.<generation> next to it. A build never touches a file another process may
+# have mapped: Windows refuses to replace or delete a mapped file.
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "keywords.idx")
+DEFAULT_SOURCE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "keywords.json")
+
+
+class _KeywordTable:
+    """
+    Read-only sequence of keywords decoded on demand from the mapped string table.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def compile_index(keywords: Iterable[str], index_path: str = DEFAULT_INDEX_PATH,
+                  normalizer: Optional[Normalizer] = None) -> KeywordAutomaton:
+    """
+    Compile keywords into a binary index file.
+
+    The automaton is built in memory first, so compiling needs memory
+    proportional to the keyword set; only loading the result is flat.
+
+    Each build is written to a new generation file, then the pointer at
+    index_path is switched to it. Processes that mapped an earlier generation
+    keep using it until they reload; generations still mapped are deleted by a
+    later build.
+
+    Args:
+        keywords: Keywords to compile.
+        index_path: Pointer file; the build goes to index_path.<generation>.
+        normalizer: Folds the keywords; must match the one KeyboardMonitor folds keystrokes with.
+
+    Returns:
+        KeywordAutomaton: The in-memory automaton that was written.
+    """
+    normalizer = normalizer or Normalizer()
+    automaton = KeywordAutomaton(normalizer.keywords(keywords))
+    edge_start, edge_label, edge_target, fail, output = automaton.tables()
+
+    offsets = array('I', [0])
+    blob = bytearray()
+    for keyword in automaton.keywords:
+        blob += keyword.encode("utf-8")
+        offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 4)
+
+    header = HEADER.pack(MAGIC, VERSION, NATIVE_BYTE_ORDER, len(fail), len(edge_label), len(automaton.keywords),
+                         len(blob), normalizer.fingerprint())
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    generations = _generations(index_path)
+    build_path = f"{index_path}.{(generations[-1] if generations else 0) + 1}"
+    with open(build_path, "wb") as f:
+        f.write(header)
+        for table in (edge_start, edge_label, edge_target, fail, output, offsets):
+            f.write(table.tobytes())
+        f.write(blob)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(build_path))
+    _replace(tmp_path, index_path)
+    for generation in generations:
+        try:
+            os.remove(f"{index_path}.{generation}")
+        except OSError:  # Still mapped by a running process
+            pass
+    logger.info(f"Compiled {len(automaton)} keywords into {build_path} ({automaton.state_count} states)")
+    return automaton
+
+
+def _generations(index_path: str) -> List[int]:
+    directory, name = os.path.split(os.path.abspath(index_path))
+    generations = []
+    for entry in os.listdir(directory):
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(name + ".") and suffix.isdigit():
+            generations.append(int(suffix))
+    return sorted(generations)
+
+
+def _replace(source: str, destination: str, attempts: int = 20):
+    """
+    os.replace, retried while a reader briefly holds the pointer file open (Windows).
+    """
+    for attempt in range(attempts):
+        try:
+            os.replace(source, destination)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+
+def resolve_index(index_path: str = DEFAULT_INDEX_PATH) -> str:
+    """
+    The index file the pointer at index_path names. An index compiled before
+    pointers were used sits at index_path itself and is returned as is.
+    """
+    with open(index_path, "rb") as f:
+        head = f.read(256)
+    if head.startswith(MAGIC):
+        return index_path
+    return os.path.join(os.path.dirname(index_path), head.decode("utf-8").strip())
+
+
+def load_index(index_path: str = DEFAULT_INDEX_PATH, normalizer: Optional[Normalizer] = None) -> KeywordAutomaton:
+    """
+    Memory-map a compiled index and wrap it as a KeywordAutomaton.
+
+    Nothing is copied: the automaton steps directly over the mapped pages, so
+    load time and RSS stay flat as the keyword list grows, and every process
+    mapping the same file shares the pages through the OS page cache.
+
+    Args:
+        index_path: The pointer file written by compile_index (or an index file).
+        normalizer: The Normalizer keystrokes will be folded with; the index must
+            have been compiled with the same tables. A version 1 index records no
+            tables and is loaded without this check.
+
+    Raises:
+        ValueError: If the file is not a compatible keyword index, or was folded differently.
+    """
+    index_path = resolve_index(index_path)
+    with open(index_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version = HEADER_V1.unpack_from(buffer, 0)[:2]
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"{index_path} is not a version 1 or {VERSION} keyword index")
+    header = HEADER if version == VERSION else HEADER_V1
+    _, _, byte_order, n_states, n_edges, n_keywords, blob_len, *fingerprint = header.unpack_from(buffer, 0)
+    if byte_order != NATIVE_BYTE_ORDER:
+        raise ValueError(f"{index_path} was compiled for a different byte order, rebuild it")
+    if normalizer is not None and fingerprint and fingerprint[0] != normalizer.fingerprint():
+        raise ValueError(f"{index_path} was compiled with other leet or homoglyph tables, rebuild it")
+    if not fingerprint:
+        logger.warning(f"{index_path} is a version 1 index; rebuild it so its leet tables can be checked")
+
+    view = memoryview(buffer)
+    offset = header.size
+    sections = []
+    for typecode, count in (('I', n_states + 1), ('I', n_edges), ('I', n_edges), ('I', n_states), ('i', n_states), ('I', n_keywords + 1)):
+        sections.append(view[offset:offset + count * 4].cast(typecode))
+        offset += count * 4
+    blob = view[offset:offset + blob_len]
+
+    edge_start, edge_label, edge_target, fail, output, keyword_offsets = sections
+    automaton = KeywordAutomaton.from_tables(edge_start, edge_label, edge_target, fail, output,
+                                             _KeywordTable(keyword_offsets, blob), mapping=buffer)
+    logger.info(f"Mapped keyword index {index_path} ({n_keywords} keywords, {n_states} states)")
+    return automaton
+
+
+def read_keyword_source(source_path: str) -> List[str]:
+    """
+    Read keywords from a JSON list or a plain text file with one keyword per line.
+    """
+    with open(source_path, "r", encoding="utf-8") as f:
+        if source_path.endswith(".json"):
+            return json.load(f)
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main():
+    """
+    Build step: compile a keyword source file into the binary index, folded with
+    the leet table of data/config.json like the keystrokes.
+
+    Usage: python keyword_index.py [source.json|source.txt] [output.idx]
+    """
+    from config import DEFAULT_CONFIG_PATH, load_config
+
+    source_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE_PATH
+    index_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_INDEX_PATH
+    normalizer = Normalizer(leet=load_config(DEFAULT_CONFIG_PATH)["leet"])
+    automaton = compile_index(read_keyword_source(source_path), index_path, normalizer=normalizer)
+    print(f"Compiled {len(automaton)} keywords into {index_path}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -1,177 +1,366 @@
 import os
+import threading
 import time
-import json
 import psutil
-import threading
-import logging
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
-import shutil
+from logger import configure as configure_logging, get_logger
+from session_manager import SessionJournal
+from process_snapshot import ProcessSnapshot, process_key
+from process_events import ProcessEventSource, create_process_event_source
+from command_runner import CommandRunner, create_command_runner
+from cache_purge import CachePurger
+from network_state import NetworkReconciler
+from history_store import HistoryStore
+from scheduler import ScheduledTask, Scheduler
+from config import DEFAULT_CONFIG
+import metrics
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] [Lockdown.%(funcName)s]: %(message)s",
-    handlers=[logging.StreamHandler()]
-)
+logger = get_logger(__name__)
 
 class Lockdown:
-    def __init__(self, lock_file: str = "data/lockdown.json"):
+    PUSH_SWEEP_INTERVAL = 5  # Seconds between safety sweeps when process starts are pushed to us
+    FAST_TICK = 0.25  # Seconds between enforcement ticks right after a lock starts or a process is caught
+    QUIET_TICK = 1.0  # Slowest tick when polling is the only way to see new processes
+    DECAY_WINDOW = timedelta(days=7)
+    DECAY_CHECK_INTERVAL = 86400  # Longest gap between decay checks
+    NETWORK_ADAPTERS = ["Wi-Fi", "Ethernet"]  # Disabled by name before adapters were enumerated; re-enabled once
+    FIREWALL_RULE = "LockdownBlockAll"
+
+    def __init__(self, lock_file: str = "data/lockdown.json", process_events: Optional[ProcessEventSource] = None,
+                 command_runner: Optional[CommandRunner] = None, scheduler: Optional[Scheduler] = None,
+                 config: Optional[dict] = None, cache_purger: Optional[CachePurger] = None,
+                 executor: Optional[Executor] = None, history: Optional[HistoryStore] = None):
         """
         Initialize the lockdown manager.
         
         Args:
-            lock_file: Path to session state file.
-        """
-        logging.debug("Initializing lockdown manager")
+            lock_file: Path to the session state snapshot. Updates go to an append-only journal next to it.
+            process_events: Source of process-start notifications (defaults to the best one for this OS).
+            command_runner: Executes netsh/explorer/shutdown (defaults to a dry run outside Windows).
+            scheduler: Runs lock expiry, enforcement ticks and decay checks (a private one is started if None).
+                A runtime.Runtime can be passed to share its event loop.
+            config: Policies and lock durations (see config.DEFAULT_CONFIG); can be replaced with apply_config.
+            cache_purger: Deletes browser caches in the background when ENABLE_CACHE_NUKE is set.
+            executor: Runs process scans, kills and netsh transitions (a private pool if None).
+            history: Event history deciding escalation and decay (history.db next to lock_file if None).
+        """
+        logger.debug("Initializing lockdown manager")
         self.lock_file = lock_file
+        self.journal = SessionJournal(lock_file)
+        self._history = history or HistoryStore(os.path.join(os.path.dirname(lock_file), "history.db"),
+                                                window=self.DECAY_WINDOW)
         self.is_locked = False
         self.lock_end_time = 0
         self.lock_duration = 0
         self.violation_count = 1  # Start with first violation
         self.last_violation_time = None  # Track last violation timestamp
         self.ENABLE_CACHE_NUKE = False  # Set to True in production
+        self._cache_purger = cache_purger or CachePurger()
         self.is_bypass = False
-        self._lock_thread = None
-        self._stop_event = threading.Event()
-        self._killed_pids = set()  # Track killed PIDs to avoid redundant kills
-        logging.info("Lockdown manager initialized")
-        
-        # Start daily violation decay check
-        self._start_daily_decay_check()
+        self.ENABLE_EXPLORER_KILL = False
+        self._killed_pids = set()  # (pid, create_time) of killed processes, evicted once they leave the snapshot
+        self._snapshot = ProcessSnapshot()
+        # Blocking work never runs on the scheduler, so timers and keystrokes sharing it are not delayed
+        self._executor = executor or ThreadPoolExecutor(max_workers=3, thread_name_prefix="Enforcement")
+        self._process_events = process_events or create_process_event_source()
+        self.kills_by_policy = {}
+        self.apply_config(config or DEFAULT_CONFIG)
+        self.last_tick_duration = 0.0
+        self._commands = command_runner or create_command_runner()
+        self._network = NetworkReconciler(self._commands, os.path.join(os.path.dirname(lock_file), "network_state.json"),
+                                          firewall_rule=self.FIREWALL_RULE, legacy_adapters=self.NETWORK_ADAPTERS)
+        self.transition_durations = {}  # Seconds taken by the last 'disable_internet' and 'unlock' transitions
+        self._scheduler = scheduler or Scheduler()
+        self._scheduler.start()
+        self._expiry_task: Optional[ScheduledTask] = None
+        # Lock and unlock transitions are serialized; each lock bumps the generation an expiry belongs to
+        self._transition_lock = threading.RLock()
+        self._generation = 0
+        self.unlocked = threading.Event()  # Set once an unlock has finished, cleared by the next lock
+        self._enforcement_task: Optional[ScheduledTask] = None
+        self._tick_interval = self.FAST_TICK
+        self._detected_at = None  # perf_counter() of the detection that started the current lock
+        self._tick_metric = metrics.histogram("enforcement.tick_ms")
+        self._scan_metric = metrics.gauge("enforcement.scan_size")
+        logger.info("Lockdown manager initialized")
+
+        # Violation decay runs when it is due instead of once a day
+        self._decay_task = self._scheduler.call_later(0, self._decay_tick, "violation_decay")
 
-    def _start_daily_decay_check(self):
+    def apply_config(self, config: dict):
+        """
+        Swap in new process policies and lock durations. Takes effect on the next
+        dispatch or lock; an active lock keeps its end time.
+        """
+        policies = {policy: [name.lower() for name in names] for policy, names in config['policies'].items()}
+        policy_by_name = {name: policy for policy, names in policies.items() for name in names}
+        for policy in policies:
+            self.kills_by_policy.setdefault(policy, 0)
+        self.lock_durations = list(config['lock_durations'])
+        self.max_lock_duration = config['max_lock_duration']
+        self.bypass_duration = config['bypass_duration']
+        # Swapped by reference, so a concurrent _dispatch sees either the old or the new table
+        self.policies, self._policy_by_name = policies, policy_by_name
+        logger.info(f"Policies applied: { {policy: len(names) for policy, names in policies.items()} }")
+
+    def _seconds_until_decay(self) -> float:
         """
-        Start a thread to run check_violation_decay daily.
+        Seconds until the 7-day clean streak completes, capped at DECAY_CHECK_INTERVAL.
         """
-        def run_daily_check():
-            while not self._stop_event.is_set():
-                self.check_violation_decay()
-                time.sleep(86400)  # Wait 24 hours
-        decay_thread = threading.Thread(target=run_daily_check, daemon=True)
-        decay_thread.start()
-        logging.debug("Daily violation decay check thread started")
+        if self.violation_count > 1 and self.last_violation_time:
+            due = self.last_violation_time + self.DECAY_WINDOW - datetime.now()
+            return min(self.DECAY_CHECK_INTERVAL, max(1.0, due.total_seconds()))
+        return self.DECAY_CHECK_INTERVAL
+
+    def _decay_tick(self) -> float:
+        self.check_violation_decay()
+        return self._seconds_until_decay()
 
-    def lock_system(self, duration: Optional[int] = None, is_bypass: bool = False):
+    def lock_system(self, duration: Optional[int] = None, is_bypass: bool = False, detected_at: Optional[float] = None,
+                    is_restore: bool = False):
         """
-        Enforce lockdown in a background thread.
+        Start enforcing a lock, or move the expiry of the active one.
         
         Args:
             duration: Lock duration in seconds (optional, calculated if None).
             is_bypass: True if triggered by bypass attempt (2-day lock).
-        """
-        logging.info(f"Locking system (Bypass: {is_bypass}, Violation count: {self.violation_count})")
+            detected_at: time.perf_counter() of the detection, for the detection-to-offline metric.
+            is_restore: Reapplying a persisted lock on boot, which is not a new violation.
+        """
+        with self._transition_lock:
+            is_violation = not is_bypass and not is_restore
+            if is_violation:
+                level = self._history.escalation_level()  # None before the first violation was recorded
+                if level is not None:
+                    self.violation_count = level + 1
+            logger.info(f"Locking system (Bypass: {is_bypass}, Violation count: {self.violation_count})")
         
-        # Calculate duration if not provided
-        if is_bypass:
-            duration = 300  # 2 days for bypass
-        elif duration is None:
-            durations = [30, 60, 120, 240]  # 2h, 4h, 8h, 16h
-            duration = durations[min(self.violation_count - 1, len(durations) - 1)] if self.violation_count <= 4 else 500  # Cap at 24h = 86400sec
+            # Calculate duration if not provided
+            if is_bypass:
+                duration = self.bypass_duration
+            elif duration is None:
+                durations = self.lock_durations
+                duration = durations[max(0, self.violation_count - 1)] if self.violation_count <= len(durations) else self.max_lock_duration
         
-        self.is_locked = True
-        self.lock_duration = duration
-        self.lock_end_time = time.time() + duration
-        self.is_bypass = is_bypass
-        self._killed_pids = set()
-        self._stop_event.clear()
+            self.is_locked = True
+            self._generation += 1
+            self.unlocked.clear()
+            self.lock_duration = duration
+            self.lock_end_time = time.time() + duration
+            self.is_bypass = is_bypass
+            self._killed_pids = set()
+            self._snapshot.reset()  # Evaluate every running process on the first tick
         
-        # Increment violation count and reset 7-day clock (not for bypass)
-        if not is_bypass:
-            self.violation_count += 1
-            self.last_violation_time = datetime.now()  # Reset 7-day clock
-            logging.info("Violation detected, 7-day clean streak reset")
+            # Increment violation count and reset 7-day clock (not for bypass)
+            if is_violation:
+                self.violation_count += 1
+                self.last_violation_time = datetime.now()  # Reset 7-day clock
+                # The run carries a count restored from the journal into the history
+                self._history.record("violation", self.last_violation_time.timestamp(), run=self.violation_count - 1)
+                logger.info("Violation detected, 7-day clean streak reset")
+            if is_bypass and not is_restore:
+                self._history.record("bypass")
+            if not is_restore:
+                self._history.record("lock", duration=duration, detail="bypass" if is_bypass else None, flush=True)
         
-        # Save lock state
-        logging.info(f"------------------------------------------[DEBUG] [KeyboardMonitor.trigger_lockdown]: Triggering lockdown for {duration} seconds")
-        self._save_lock_state()
+            # Save lock state
+            logger.info(f"Locking for {duration} seconds")
+            self._save_lock_state(durable=True)
         
-        # Log event
-        logging.debug("Logging lockdown event (TODO: logger.py)")
-        
-        # Check if lockdown thread is already running and alive
-        if self._lock_thread is not None and self._lock_thread.is_alive():
-            logging.info("Lockdown thread already running, not starting a new one")
+            if self._expiry_task is not None and self._expiry_task.active:
+                self._scheduler.reschedule(self._expiry_task, duration)
+                logger.info(f"Lock already active, expiry moved to {duration} seconds from now")
+            else:
+                self._detected_at = detected_at or time.perf_counter()
+                self._expiry_task = self._scheduler.call_later(duration, self._expire, "lock_expiry")
+                self._tick_interval = self.FAST_TICK
+                self._enforcement_task = self._scheduler.call_later(0, self._enforcement_tick, "enforcement")
+                self._executor.submit(self._begin_enforcement)
+                logger.info("Lock enforcement scheduled")
+            self._scheduler.reschedule(self._decay_task, self._seconds_until_decay())
+
+    def _begin_enforcement(self):
+        """
+        Cut the network and subscribe to process starts. Runs on the worker pool so
+        slow netsh calls never delay the scheduler.
+        """
+        with self._transition_lock:
+            if not self.is_locked:
+                return  # Unlocked before the pool got to it
+            self._disable_internet()
+            if self._detected_at is not None:
+                metrics.histogram("lock.detection_to_offline_ms").observe((time.perf_counter() - self._detected_at) * 1000)
+            # Newly started processes are pushed to us as they spawn; the tick becomes a slow safety sweep
+            if self._process_events.push_based:
+                self._process_events.start(self._dispatch)
+
+    def _expire(self):
+        """
+        Lock expiry timer. The unlock runs netsh, so it is handed to the worker pool.
+        """
+        self._executor.submit(self._expire_lock, self._generation)
+
+    def _expire_lock(self, generation: int):
+        """
+        Unlock on expiry unless a violation re-armed the lock after the timer fired.
+        """
+        with self._transition_lock:
+            if not self.is_locked:
+                return
+            if generation != self._generation:
+                logger.info("Lock was re-armed after it expired, keeping it")
+                return
+            self.unlock_system()
+
+    def _enforcement_tick(self) -> None:
+        """
+        Scheduled enforcement tick. The process scan runs on the worker pool, which
+        schedules the next tick once the scan has finished.
+        """
+        if self.is_locked:
+            self._executor.submit(self._enforcement_scan)
+
+    def _enforcement_scan(self):
+        """
+        One enforcement pass. Runs fast right after a lock starts or a process is
+        caught and halves its rate every quiet tick down to the sweep interval.
+        """
+        if not self.is_locked:
+            return
+        quiet_tick = self.PUSH_SWEEP_INTERVAL if self._process_events.push_based else self.QUIET_TICK
+        self._network.check()  # Adapters that appeared or were re-enabled; no commands without drift
+        if self._enforce_restrictions():
+            self._tick_interval = self.FAST_TICK
         else:
-            # Start lockdown in background thread
-            self._lock_thread = threading.Thread(target=self._lock_loop, daemon=True)
-            self._lock_thread.start()
-            logging.info("Lockdown thread started")
+            self._tick_interval = min(self._tick_interval * 2, quiet_tick)
+        self._history.flush()  # Kills since the previous tick, in one transaction
+        if self.is_locked and self._enforcement_task is not None:
+            self._scheduler.reschedule(self._enforcement_task, self._tick_interval)
 
-    def _lock_loop(self):
+    def _enforce_restrictions(self) -> int:
         """
-        Background loop to enforce lockdown restrictions.
+        Enforce explorer.exe, tools, and network process restrictions.
+
+        Processes are enumerated once per tick; only processes that appeared since
+        the previous tick are matched against the policies and dispatched to the
+        handlers on the persistent worker pool.
+
+        Returns:
+            int: Number of processes handed to a policy handler.
         """
-        logging.debug("Starting lockdown loop")
-        self._disable_internet()
+        started = time.perf_counter()
+        dispatched = 0
         try:
-            while time.time() < self.lock_end_time and self.is_locked and not self._stop_event.is_set():
-                self._enforce_restrictions()
-                time.sleep(1)  # Check every 1 second
+            for proc in self._snapshot.refresh():
+                dispatched += self._dispatch(proc)
+            self._killed_pids &= self._snapshot.keys  # Evict processes that are gone
         except Exception as e:
-            logging.error(f"Error in lockdown loop: {e}")
+            logger.error(f"Error enforcing restrictions: {e}")
         finally:
-            if time.time() >= self.lock_end_time or self._stop_event.is_set():
-                self.unlock_system()
+            self.last_tick_duration = time.perf_counter() - started
+            self._tick_metric.observe(self.last_tick_duration * 1000)
+            self._scan_metric.set(self._snapshot.size)
+        return dispatched
 
-    def _enforce_restrictions(self):
+    def _dispatch(self, proc: psutil.Process) -> bool:
         """
-        Enforce explorer.exe, tools, and network process restrictions.
+        Match one process against the policies and hand it to the policy handler.
+        Called from the enforcement tick and from the process event source.
+
+        Returns:
+            bool: True if a handler was scheduled for the process.
+        """
+        proc_name = proc.info['name']
+        if not proc_name or process_key(proc) in self._killed_pids:
+            return False  # Skip system or inaccessible processes
+        handlers = {
+            'tools': self._block_tools,
+            'network': self._kill_network_processes,
+            'explorer': self._kill_explorer if self.ENABLE_EXPLORER_KILL else None,
+        }
+        policy = self._policy_by_name.get(proc_name.lower())
+        if policy is None:
+            return False
+        if policy not in handlers:  # Policies added through the config just kill
+            self._executor.submit(self._kill, proc, policy)
+            return True
+        handler = handlers[policy]
+        if handler is None:
+            return False
+        self._executor.submit(handler, proc)
+        return True
+
+    def _kill(self, proc: psutil.Process, policy: str) -> bool:
+        """
+        Kill a process matched by a policy. Failed kills are retried on the next tick.
         """
+        key = process_key(proc)
         try:
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                # executor.submit(self._kill_explorer)
-                executor.submit(self._block_tools)
-                executor.submit(self._kill_network_processes)
-                executor.submit(self._clear_browser_cache)
-                # executor.submit(self.shutdown_system)
-        except Exception as e:
-            logging.error(f"Error enforcing restrictions: {e}")
+            proc.kill()
+            self._killed_pids.add(key)
+            self.kills_by_policy[policy] += 1
+            metrics.counter(f"kills.{policy}").inc()
+            self._history.record("kill", detail=f"{policy}:{proc.info['name']}")
+            return True
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.Error as e:
+            logger.warning(f"Failed to kill {proc.info['name']} (PID: {proc.pid}): {e}")
+            self._snapshot.retry(key)
+            return False
 
     def check_and_reapply_lock(self):
         """
         Check lock state on boot and reapply if lockdown is still active.
         """
-        logging.info("Checking lock state on boot")
+        logger.info("Checking lock state on boot")
         try:
-            with open(self.lock_file, 'r') as f:
-                state = json.load(f)
+            state = self.journal.recover()
+            if state is None:
+                logger.debug("No lock state found, assuming fresh start")
+                self.violation_count = 1  # Reset only for fresh start
+                self.last_violation_time = None
+                return
+
+            self.violation_count = state.get('violation_count', 1)  # Restore or default to 1
+            self.last_violation_time = datetime.fromisoformat(state['last_violation_time']) if state.get('last_violation_time') else None
             if state.get('is_locked', False) and time.time() < state.get('lock_end_time', 0):
-                self.violation_count = state.get('violation_count', 1)  # Restore or default to 1
-                self.last_violation_time = datetime.fromisoformat(state.get('last_violation_time', None)) if state.get('last_violation_time') else None
                 remaining_duration = state['lock_end_time'] - time.time()
-                logging.info(f"Reapplying lock for {remaining_duration} seconds, violation count: {self.violation_count}")
-                self.lock_system(max(0, int(remaining_duration)), is_bypass=state.get('is_bypass', False))
+                logger.info(f"Reapplying lock for {remaining_duration} seconds, violation count: {self.violation_count}")
+                self.lock_system(max(0, int(remaining_duration)), is_bypass=state.get('is_bypass', False), is_restore=True)
             else:
-                logging.info("No active lock or lock expired")
-                self._clear_lock_state()  # Clear lock file but preserve violation_count
+                logger.info("No active lock or lock expired")
+                self._clear_lock_state()  # Clear lock fields but preserve violation_count
                 self.check_violation_decay()  # Check for decay after lock expires
-        except FileNotFoundError:
-            logging.debug("No lock file found, assuming fresh start")
-            self.violation_count = 1  # Reset only for fresh start
-            self.last_violation_time = None
         except Exception as e:
-            logging.error(f"Error checking lock state: {e}")
+            logger.error(f"Error checking lock state: {e}")
 
     def check_violation_decay(self):
         """
         Decrease violation count to 1 if no violations for 7 days.
         """
         if self.violation_count > 1 and self.last_violation_time:
-            now = datetime.now()
-            days_since_violation = (now - self.last_violation_time).days
-            if days_since_violation >= 7:
-                logging.info("7 clean days! Decreasing violation count to 1")
+            level = self._history.escalation_level()
+            if level is None:  # Violations from before the history was kept
+                clean = (datetime.now() - self.last_violation_time).days >= 7
+            else:
+                clean = level == 0
+            if clean:
+                logger.info("7 clean days! Decreasing violation count to 1")
                 self.violation_count = 1
                 self.last_violation_time = None  # Reset violation time
                 self._save_lock_state()
 
-    def _save_lock_state(self):
+    def _save_lock_state(self, durable: bool = False):
         """
-        Save lock state to lockdown.json.
+        Append the lock state to the session journal.
+
+        Args:
+            durable: fsync before returning (used when a lock starts or ends).
         """
-        logging.debug("Saving lock state")
+        logger.debug("Saving lock state")
         try:
             state = {
                 'is_locked': self.is_locked,
@@ -182,195 +371,143 @@ class Lockdown:
                 'violation_count': self.violation_count,
                 'last_violation_time': self.last_violation_time.isoformat() if self.last_violation_time else None
             }
-            os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
-            with open(self.lock_file, 'w') as f:
-                json.dump(state, f)
-            logging.info("Lock state saved")
+            self.journal.append(state, durable=durable)
+            logger.info("Lock state saved")
         except Exception as e:
-            logging.error(f"Error saving lock state: {e}")
+            logger.error(f"Error saving lock state: {e}")
 
     def _clear_lock_state(self):
         """
-        Clear lock state from lockdown.json.
+        Record that no lock is active. Violation history is kept.
         """
-        logging.debug("Clearing lock state")
+        logger.debug("Clearing lock state")
         try:
-            if os.path.exists(self.lock_file):
-                os.remove(self.lock_file)
-                logging.info("Lock state cleared")
+            self.journal.append({'is_locked': False, 'lock_end_time': 0, 'lock_duration': 0, 'is_bypass': False}, durable=True)
+            logger.info("Lock state cleared")
         except Exception as e:
-            logging.error(f"Error clearing lock state: {e}")
+            logger.error(f"Error clearing lock state: {e}")
     
     def shutdown_system(self):
         """
         Shutdown the system immediately.
         """
-        logging.info("Initiating system shutdown")
-        try:
-            os.system("shutdown /s /t 0")
-        except Exception as e:
-            logging.error(f"Failed to shutdown system: {e}")
+        logger.info("Initiating system shutdown")
+        result = self._commands.run(["shutdown", "/s", "/t", "0"])
+        if not result.ok:
+            logger.error(f"Failed to shutdown system: {result.error}")
 
-    def _kill_explorer(self):
+    def _kill_explorer(self, proc: psutil.Process):
         """
-        Kill explorer.exe if running and not already killed.
+        Kill explorer.exe.
         """
-        logging.debug("Checking for explorer.exe")
-        try:
-            for proc in psutil.process_iter(['name', 'pid']):
-                proc_name = proc.info['name']
-                if proc_name and proc_name.lower() == 'explorer.exe':
-                    if proc.pid not in self._killed_pids:
-                        logging.info(f"Killing explorer.exe (PID: {proc.pid})")
-                        proc.kill()
-                        self._killed_pids.add(proc.pid)
-                    else:
-                        logging.debug("explorer.exe already killed, skipping")
-                    break  # No need to scan further
-        except psutil.Error as e:
-            logging.error(f"Error killing explorer.exe: {e}")
+        logger.info(f"Killing explorer.exe (PID: {proc.pid})")
+        self._kill(proc, 'explorer')
 
-    def _block_tools(self):
+    def _block_tools(self, proc: psutil.Process):
         """
-        Block Task Manager and shell processes if newly spawned.
+        Block a newly spawned Task Manager or shell process.
         """
-        logging.debug("Checking for Task Manager and shells")
-        try:
-            for proc in psutil.process_iter(['name', 'pid']):
-                proc_name = proc.info['name'].lower()
-                if proc_name in ['taskmgr.exe', 'cmd.exe', 'powershell.exe'] and proc.pid not in self._killed_pids:
-                    logging.info(f"Killing {proc_name}")
-                    proc.kill()
-                    self._killed_pids.add(proc.pid)
-        except psutil.Error as e:
-            logging.error(f"Error blocking tools: {e}")
+        logger.info(f"Killing {proc.info['name'].lower()}")
+        self._kill(proc, 'tools')
 
     def _disable_internet(self):
         """
-        Disable all network adapters and block internet with firewall.
-        """
-        logging.debug("Disabling internet")
-        try:
-            # Disable network adapters
-            os.system('netsh interface set interface "Wi-Fi" admin=disable')
-            os.system('netsh interface set interface "Ethernet" admin=disable')
-            logging.info("Network adapters disabled")
-
-            # Add firewall rule
-            os.system('netsh advfirewall firewall add rule name="LockdownBlockAll" dir=in action=block enable=yes')
-            os.system('netsh advfirewall firewall add rule name="LockdownBlockAll" dir=out action=block enable=yes')
-            logging.info("Firewall rules added")
-        except Exception as e:
-            logging.error(f"Error disabling internet: {e}")
-
-    def _clear_browser_cache(self, browser_name):
-        """
-        Clear cache folders for supported browsers.
+        Disable all network adapters and block internet with firewall. Only adapters
+        that are up and a missing firewall rule cause commands, so a re-lock repeats nothing.
         """
+        logger.debug("Disabling internet")
+        started = time.perf_counter()
         try:
-            user_profile = os.getenv('USERPROFILE')
-            if browser_name == 'chrome.exe':
-                cache_path = os.path.join(user_profile, r'AppData\\Local\\Google\\Chrome\\User Data\\Default\\Cache')
-            elif browser_name == 'firefox.exe':
-                cache_path = os.path.join(user_profile, r'AppData\\Local\\Mozilla\\Firefox\\Profiles')
-                # Firefox profiles folder contains many profiles, clear Cache subfolder inside each
-                if os.path.exists(cache_path):
-                    for profile in os.listdir(cache_path):
-                        profile_cache = os.path.join(cache_path, profile, 'cache2')
-                        if os.path.exists(profile_cache):
-                            shutil.rmtree(profile_cache, ignore_errors=True)
-                    return
-            else:
-                return  # Add more browsers if needed
-
-            if os.path.exists(cache_path):
-                shutil.rmtree(cache_path, ignore_errors=True)
-                logging.info(f"Cleared cache for {browser_name}")
+            self._network.set_blocked(True)
         except Exception as e:
-            logging.error(f"Failed to clear cache for {browser_name}: {e}")
+            logger.error(f"Error disabling internet: {e}")
+        finally:
+            self.transition_durations['disable_internet'] = time.perf_counter() - started
+            metrics.histogram("lock.disable_internet_ms").observe(self.transition_durations['disable_internet'] * 1000)
 
-    def _kill_network_processes(self):
+    def _kill_network_processes(self, proc: psutil.Process):
         """
-        Kill browser processes using network resources and clear cache before killing.
+        Kill a browser process using network resources, then queue a purge of its cache.
         """
-        logging.debug("Checking for network-using processes")
+        proc_name = proc.info['name'].lower()
         try:
-            browsers = ['chrome.exe', 'msedge.exe', 'firefox.exe', 'opera.exe', 'brave.exe']
-            for proc in psutil.process_iter(['name', 'pid']):
-                proc_name = proc.info['name']
-                if not proc_name:
-                    continue  # Skip system or inaccessible processes
-
-                proc_name = proc_name.lower()
-                if proc_name in browsers and proc.pid not in self._killed_pids:
-                    # Clear cache first
-                    if self.ENABLE_CACHE_NUKE:
-                        self._clear_browser_cache(proc_name)
-
-                    try:
-                        logging.info(f"Killing {proc_name} (PID: {proc.pid})")
-                        proc.kill()
-                        self._killed_pids.add(proc.pid)
-                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                        logging.warning(f"Failed to kill {proc_name} (PID: {proc.pid})")
+            logger.info(f"Killing {proc_name} (PID: {proc.pid})")
+            self._kill(proc, 'network')
+            # Purged on the cache worker, after the browser stopped holding its files open
+            if self.ENABLE_CACHE_NUKE:
+                self._cache_purger.request(proc_name)
         except Exception as e:
-            logging.error(f"Error during browser process scan: {e}")
+            logger.error(f"Error killing browser process: {e}")
 
     def unlock_system(self):
         """
         Stop lockdown and restore system state.
         """
-        logging.info("Unlocking system")
-        self.is_locked = False
-        self._stop_event.set()
-        try:
-            # Restore explorer.exe
-            os.system("start explorer.exe")
-            logging.info("Explorer.exe restored")
-
-            # Remove firewall rule
-            os.system('netsh advfirewall firewall delete rule name="LockdownBlockAll"')
-            logging.info("Firewall rules removed")
+        with self._transition_lock:
+            logger.info("Unlocking system")
+            self.is_locked = False
+            self._scheduler.cancel(self._expiry_task)
+            self._scheduler.cancel(self._enforcement_task)
+            self._process_events.stop()
+            started = time.perf_counter()
+            try:
+                # Restore explorer.exe; it keeps running, so it is launched rather than waited for
+                self._commands.spawn(["explorer.exe"])
+                logger.info("Explorer.exe restored")
 
-            # Re-enable network adapters
-            os.system('netsh interface set interface "Wi-Fi" admin=enable')
-            os.system('netsh interface set interface "Ethernet" admin=enable')
-            logging.info("Network adapters enabled")
+                # Remove the firewall rule and re-enable the adapters the lock disabled, in parallel
+                self._network.set_blocked(False)
+                self.transition_durations['unlock'] = time.perf_counter() - started
+                metrics.histogram("lock.unlock_ms").observe(self.transition_durations['unlock'] * 1000)
+                self._history.record("unlock", duration=self.lock_duration, flush=True)
 
-            # Clear lock state
-            self._clear_lock_state()
+                # Clear lock state
+                self._clear_lock_state()
 
-            # Check for violation decay after unlock
-            self.check_violation_decay()
+                # Check for violation decay after unlock
+                self.check_violation_decay()
+                logger.info(f"System unlocked after a {self.lock_duration} second lock")
+            except Exception as e:
+                logger.error(f"Error unlocking system: {e}")
+            finally:
+                self._killed_pids.clear()
+                self.unlocked.set()
 
-            # Log unlock event
-            logging.debug("Logging unlock event (TODO: logger.py)")
-        except Exception as e:
-            logging.error(f"Error unlocking system: {e}")
-        finally:
-            self._killed_pids.clear()
+    def close(self):
+        """
+        Release threads and files on shutdown. A running lock stays persisted and is restored on the next boot.
+        """
+        self._scheduler.cancel(self._expiry_task)
+        self._scheduler.cancel(self._enforcement_task)
+        self._scheduler.cancel(self._decay_task)
+        self._process_events.stop()
+        self._cache_purger.stop()
+        self._commands.shutdown()
+        self.journal.close()
+        self._history.close()
 
     def reset_violation_count(self):
         """
         Reset violation count to 1 after a period of no violations (e.g., 7 days).
         """
-        logging.debug("Resetting violation count")
+        logger.debug("Resetting violation count")
         self.violation_count = 1
         self.last_violation_time = None
         self._save_lock_state()
-        logging.info("Violation count reset to 1")
+        logger.info("Violation count reset to 1")
 
 def main():
     """
     Test the lockdown module.
     """
-    logging.info("Starting lockdown test")
+    logger.info("Starting lockdown test")
     lockdown = Lockdown()
     lockdown.check_and_reapply_lock()  # Check for existing lock
     lockdown.lock_system()  # Test with dynamic duration
     time.sleep(2)  # Allow thread to start
-    logging.info("Lockdown test completed")
+    logger.info("Lockdown test completed")
 
 if __name__ == "__main__":
+    configure_logging(level="DEBUG")
     main()
-    logging.info("Program exited")
\ No newline at end of file
+    logger.info("Program exited")
\ No newline at end of file
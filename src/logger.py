@@ -0,0 +1,215 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from typing import Dict, List, Optional
+
+DEFAULT_FORMAT = "%(asctime)s [%(levelname)s] [%(name)s.%(funcName)s]: %(message)s"
+
+# Environment overrides, e.g. IMAANGUARD_LOG_LEVEL=DEBUG IMAANGUARD_LOG_MODULES="lockdown=DEBUG,keyboard_monitor=WARNING"
+LEVEL_ENV = "IMAANGUARD_LOG_LEVEL"
+MODULES_ENV = "IMAANGUARD_LOG_MODULES"
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+class _DeferredFlushMixin:
+    """
+    Write records without flushing; the listener flushes once per batch.
+    """
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchedFileHandler(_DeferredFlushMixin, logging.FileHandler):
+    pass
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records as they are. The stock QueueHandler formats and copies every
+    record on the calling thread; here all formatting is left to the writer.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class BatchingQueueListener:
+    """
+    QueueListener-style background writer that drains records in batches.
+
+    The calling thread only pays for QueueHandler.enqueue. This thread blocks
+    for the first record, then takes whatever else is already queued (up to
+    batch_size), hands the batch to the handlers and flushes each handler once
+    per batch instead of once per record.
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.SimpleQueue, handlers: List[logging.Handler], batch_size: int = 256,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            log_queue: Queue fed by a QueueHandler.
+            handlers: Handlers that format and write the records.
+            batch_size: Maximum records written between flushes.
+            flush_interval: Upper bound in seconds on how long a record stays unflushed.
+        """
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self.records = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Write everything queued so far, flush and stop the writer thread.
+        """
+        if self._thread:
+            self.queue.put(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()  # Handlers that buffer across batches (encrypted log chunks) seal when due
+                continue
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                    continue
+                self._handle(record)
+            for handler in self.handlers:
+                handler.flush()
+            self.batches += 1
+            if stopping:
+                return
+
+    def _handle(self, record: logging.LogRecord):
+        self.records += 1
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def _parse_module_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level: str = "INFO", log_file: Optional[str] = None, console: bool = True,
+              module_levels: Optional[Dict[str, str]] = None, fmt: str = DEFAULT_FORMAT,
+              batch_size: int = 256, flush_interval: float = 1.0, extra_handlers: Optional[List[logging.Handler]] = None):
+    """
+    Route all logging through a queue to a single background writer.
+
+    Safe to call more than once: a later call replaces the previous setup.
+
+    Args:
+        level: Root level. IMAANGUARD_LOG_LEVEL overrides it.
+        log_file: File to append to (e.g. data/lockdown.log). None logs to console only.
+        console: Also write to stderr.
+        module_levels: Per-module levels such as {"keyboard_monitor": "DEBUG"}.
+            IMAANGUARD_LOG_MODULES entries take precedence.
+        fmt: Record format.
+        batch_size: Maximum records written between flushes.
+        flush_interval: Upper bound in seconds on how long a record stays unflushed.
+        extra_handlers: Additional handlers served by the background writer. Those without a
+            formatter get fmt.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        shutdown()
+
+        level = os.environ.get(LEVEL_ENV, level).upper()
+        levels = dict(module_levels or {})
+        levels.update(_parse_module_levels(os.environ.get(MODULES_ENV, "")))
+
+        formatter = logging.Formatter(fmt)
+        handlers: List[logging.Handler] = []
+        if console and sys.stderr is not None:  # No stderr in --noconsole builds
+            handlers.append(BatchedStreamHandler(sys.stderr))
+        if log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            handlers.append(BatchedFileHandler(log_file, encoding="utf-8", delay=True))
+        handlers.extend(extra_handlers or [])
+        for handler in handlers:
+            if handler.formatter is None:  # Extra handlers keep a formatter of their own
+                handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _RecordQueueHandler(log_queue)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = BatchingQueueListener(log_queue, handlers, batch_size=batch_size, flush_interval=flush_interval)
+        _listener.start()
+
+
+def shutdown():
+    """
+    Drain and flush pending records, then close the handlers.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Return the logger for a module. Use the module's __name__.
+    """
+    return logging.getLogger(name)
+
+
+atexit.register(shutdown)
+
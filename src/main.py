@@ -1,26 +1,50 @@
-import logging
+import time
+BOOT_STARTED = time.perf_counter()  # Before any other import, so module loading shows up in the boot phases
+
 import os
-from keyboard_monitor import main
+import sys
+from logger import configure as configure_logging, get_logger
 
 # Ensure the data directory exists
 data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
 os.makedirs(data_dir, exist_ok=True)  # Create data directory if it doesn't exist
 
-# Configure logging with absolute path
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] [Main]: %(message)s",
-    handlers=[
-        logging.FileHandler(os.path.join(data_dir, "lockdown.log")),
-        logging.StreamHandler()
-    ]
-)
+logger = get_logger("main")
+
+
+def main(exit_after_boot: bool = False, runtime=None, engine: bool = False):
+    """
+    Boot in stages: a persisted lock is restored before the matcher and keyboard
+    listener are loaded (see boot.run). Heavy modules are imported inside run().
+    Blocks on the runtime event loop until it is stopped.
+
+    Args:
+        exit_after_boot: Print the boot phase timings as JSON and exit (used by benchmarks/bench_startup.py).
+        runtime: runtime.Runtime to run on (a new one if None).
+        engine: Host the shared detection engine for session agents (the Windows service).
+    """
+    from boot import BootTimer, run
+    report = run(timer=BootTimer(BOOT_STARTED), exit_after_boot=exit_after_boot, runtime=runtime, engine=engine)
+    if exit_after_boot:
+        import json
+        print(json.dumps(report))
+
 
 if __name__ == "__main__":
+    if "--agent" in sys.argv:
+        # Per-session keyboard agent for the service's engine; loads no matcher or lock state
+        configure_logging(level="INFO", log_file=os.path.join(data_dir, "agent.log"))
+        from engine_ipc import run_agent
+        run_agent()
+        sys.exit(0)
+    # Single background writer for every module; set IMAANGUARD_LOG_LEVEL=DEBUG for verbose logs.
+    # The log names detected keywords, so it is written encrypted (read it with encrypted_log.py)
+    from encrypted_log import EncryptedLogHandler
+    configure_logging(level="INFO", extra_handlers=[EncryptedLogHandler(os.path.join(data_dir, "logs"))])
     try:
-        logging.info("Starting main.py")
-        main()  # Call keyboard_monitor.main()
-        logging.info("keyboard_monitor.main() completed")
+        logger.info("Starting main.py")
+        main(exit_after_boot="--exit-after-boot" in sys.argv)
+        logger.info("main() completed")
     except Exception as e:
-        logging.error(f"Error in keyboard_monitor.main(): {e}", exc_info=True)
-        raise
\ No newline at end of file
+        logger.error(f"Error in main(): {e}", exc_info=True)
+        raise
@@ -0,0 +1,326 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a keyword set.
+
+    The automaton is stepped one character at a time, so callers can feed it
+    keystrokes as they arrive and keep the returned state. A step costs one dict
+    lookup when the transition is cached. On a miss it follows failure links,
+    at most as many as the current match depth (bounded by the longest keyword),
+    with a bisection over the outgoing edges of each state visited. The work per
+    keystroke is therefore amortized constant, not worst-case O(1).
+
+    The compiled automaton lives in flat integer tables (a CSR edge list sorted
+    by character, failure links and output ids), so it can be written to disk
+    and memory-mapped back by keyword_index without rebuilding Python objects.
+    """
+
+    ROOT = 0
+    NO_OUTPUT = -1
+    CACHE_LIMIT = 65536  # Resolved transitions remembered; the cache is emptied when full and refills on misses
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Compile the keyword set into edge, failure and output tables.
+
+        Args:
+            keywords: Keywords to detect. Matching is case-sensitive, so callers
+                should pass keywords that are already normalized.
+        """
+        # One flat dict of edges keyed like the transition cache, (state << 21) | code point.
+        # Far smaller than a dict per trie node, and its sorted keys are already in CSR order.
+        children: Dict[int, int] = {}
+        output = array('i', [self.NO_OUTPUT])
+        keyword_list: List[str] = []
+
+        for keyword in keywords:
+            if not keyword:
+                continue
+            state = self.ROOT
+            for char in keyword:
+                key = (state << 21) | ord(char)
+                next_state = children.get(key)
+                if next_state is None:
+                    next_state = len(output)
+                    children[key] = next_state
+                    output.append(self.NO_OUTPUT)
+                state = next_state
+            if output[state] == self.NO_OUTPUT:
+                output[state] = len(keyword_list)
+                keyword_list.append(keyword)
+
+        state_count = len(output)
+        keys = sorted(children)
+        edge_label = array('I', [key & 0x1FFFFF for key in keys])
+        edge_target = array('I', [children[key] for key in keys])
+        edge_start = array('I', [0]) * (state_count + 1)
+        for key in keys:
+            edge_start[(key >> 21) + 1] += 1
+        del keys
+        for state in range(state_count):
+            edge_start[state + 1] += edge_start[state]
+
+        # Breadth-first pass that fills the failure links and propagates outputs,
+        # so every state reports a keyword ending at it
+        fail = array('I', [self.ROOT]) * state_count
+        queue = deque(edge_target[edge_start[self.ROOT]:edge_start[self.ROOT + 1]])
+        while queue:
+            state = queue.popleft()
+            for i in range(edge_start[state], edge_start[state + 1]):
+                code, child = edge_label[i], edge_target[i]
+                queue.append(child)
+                fallback = fail[state]
+                while fallback != self.ROOT and (fallback << 21) | code not in children:
+                    fallback = fail[fallback]
+                fail[child] = children.get((fallback << 21) | code, self.ROOT)
+                if output[child] == self.NO_OUTPUT:
+                    output[child] = output[fail[child]]
+
+        self._set_tables(edge_start, edge_label, edge_target, fail, output, keyword_list)
+        self._mapping = None
+
+    @classmethod
+    def from_tables(cls, edge_start: Sequence[int], edge_label: Sequence[int], edge_target: Sequence[int],
+                    fail: Sequence[int], output: Sequence[int], keywords: Sequence[str], mapping=None) -> 'KeywordAutomaton':
+        """
+        Wrap already compiled tables, e.g. memoryviews over a mapped index file.
+
+        Args:
+            mapping: Object backing the tables (an mmap), kept alive with the automaton.
+        """
+        automaton = cls.__new__(cls)
+        automaton._set_tables(edge_start, edge_label, edge_target, fail, output, keywords)
+        automaton._mapping = mapping
+        return automaton
+
+    def _set_tables(self, edge_start, edge_label, edge_target, fail, output, keywords):
+        self._edge_start = edge_start
+        self._edge_label = edge_label
+        self._edge_target = edge_target
+        self._fail = fail
+        self._output = output
+        self.keywords = keywords
+        self._transitions: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    @property
+    def state_count(self) -> int:
+        return len(self._fail)
+
+    def tables(self):
+        """
+        Return the raw (edge_start, edge_label, edge_target, fail, output) tables.
+        """
+        return self._edge_start, self._edge_label, self._edge_target, self._fail, self._output
+
+    def step(self, state: int, char: str) -> int:
+        """
+        Advance the automaton by one character.
+
+        Args:
+            state: Current state (ROOT for a fresh stream).
+            char: Next input character.
+
+        Returns:
+            int: The new state.
+        """
+        code = ord(char)
+        key = (state << 21) | code
+        next_state = self._transitions.get(key)
+        if next_state is not None:
+            return next_state
+
+        edge_start, labels = self._edge_start, self._edge_label
+        current = state
+        while True:
+            lo, hi = edge_start[current], edge_start[current + 1]
+            if lo != hi:
+                i = bisect_left(labels, code, lo, hi)
+                if i != hi and labels[i] == code:
+                    next_state = self._edge_target[i]
+                    break
+            if current == self.ROOT:
+                next_state = self.ROOT
+                break
+            current = self._fail[current]
+
+        if len(self._transitions) >= self.CACHE_LIMIT:
+            self._transitions.clear()
+        self._transitions[key] = next_state
+        return next_state
+
+    def match(self, state: int) -> Optional[str]:
+        """
+        Return the keyword that ends at the given state, if any.
+        """
+        keyword_id = self._output[state]
+        return None if keyword_id == self.NO_OUTPUT else self.keywords[keyword_id]
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        Return the first keyword found in text, or None.
+        """
+        state = self.ROOT
+        for char in text:
+            state = self.step(state, char)
+            if self._output[state] != self.NO_OUTPUT:
+                return self.match(state)
+        return None
+
+
+class _ChainedKeywords:
+    """
+    Read-only sequence of the keywords of two automatons, without copying either.
+    """
+
+    def __init__(self, first: Sequence[str], second: Sequence[str]):
+        self._first = first
+        self._second = second
+
+    def __len__(self) -> int:
+        return len(self._first) + len(self._second)
+
+    def __getitem__(self, index: int) -> str:
+        if index < len(self._first):
+            return self._first[index]
+        return self._second[index - len(self._first)]
+
+    def __iter__(self):
+        yield from self._first
+        yield from self._second
+
+
+class LayeredAutomaton:
+    """
+    A large base automaton (usually a memory-mapped index) and a small extra one
+    stepped together as one automaton.
+
+    Lets keywords from the config be matched next to a compiled index without
+    recompiling it. The state packs both states into one int, base_state *
+    extra.state_count + extra_state, so callers keep storing plain ints and
+    ROOT stays 0.
+    """
+
+    ROOT = KeywordAutomaton.ROOT
+
+    def __init__(self, base: KeywordAutomaton, extra: KeywordAutomaton):
+        self.base = base
+        self.extra = extra
+        self._width = extra.state_count
+        self.keywords = _ChainedKeywords(base.keywords, extra.keywords)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    @property
+    def state_count(self) -> int:
+        return self.base.state_count * self._width
+
+    def step(self, state: int, char: str) -> int:
+        base_state, extra_state = divmod(state, self._width)
+        return self.base.step(base_state, char) * self._width + self.extra.step(extra_state, char)
+
+    def match(self, state: int) -> Optional[str]:
+        base_state, extra_state = divmod(state, self._width)
+        keyword = self.base.match(base_state)
+        return keyword if keyword is not None else self.extra.match(extra_state)
+
+    def search(self, text: str) -> Optional[str]:
+        state = self.ROOT
+        for char in text:
+            state = self.step(state, char)
+            keyword = self.match(state)
+            if keyword is not None:
+                return keyword
+        return None
+
+
+def _deletions(word: str, max_deletions: int) -> Set[str]:
+    """
+    Return every string obtainable from word by deleting up to max_deletions characters.
+    """
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_deletions):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """
+    Symmetric-deletion index for finding keywords within a bounded edit distance.
+
+    Every keyword is indexed under all of its deletion variants. Two strings are
+    within edit distance k only if they share a variant reachable by at most k
+    deletions from each side, so a lookup only generates the deletions of the
+    typed word and verifies the few candidates it hits with a real Levenshtein
+    distance. Lookup cost depends on the word length, not the keyword count.
+    """
+
+    def __init__(self, keywords: Iterable[str], max_distance: int = 2, min_length: int = 7, chars_per_edit: int = 5):
+        """
+        Build the deletion index.
+
+        Args:
+            keywords: Normalized keywords to index.
+            max_distance: Upper bound on the edit distance tolerated for any keyword.
+            min_length: Keywords shorter than this only match exactly, since a
+                single edit turns short words into ordinary ones ("mature" -> "nature").
+            chars_per_edit: One edit is tolerated per this many keyword characters.
+        """
+        from Levenshtein import distance  # Imported here so exact-only matching and boot skip loading it
+        self._distance = distance
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.chars_per_edit = chars_per_edit
+        self._allowed: Dict[str, int] = {}
+        self._variants: Dict[str, List[str]] = {}
+
+        for keyword in keywords:
+            allowed = self.allowed_distance(keyword)
+            if allowed == 0 or keyword in self._allowed:
+                continue
+            self._allowed[keyword] = allowed
+            for variant in _deletions(keyword, allowed):
+                self._variants.setdefault(variant, []).append(keyword)
+
+        lengths = [len(keyword) for keyword in self._allowed]
+        self.min_word_length = min(lengths) - max_distance if lengths else 0
+        self.max_word_length = max(lengths) + max_distance if lengths else -1
+
+    def __len__(self) -> int:
+        return len(self._allowed)
+
+    def allowed_distance(self, keyword: str) -> int:
+        """
+        Return how many edits are tolerated for keyword.
+        """
+        if len(keyword) < self.min_length:
+            return 0
+        return min(self.max_distance, len(keyword) // self.chars_per_edit)
+
+    def lookup(self, word: str) -> Optional[str]:
+        """
+        Return a keyword within its allowed edit distance of word, or None.
+        """
+        if not self.min_word_length <= len(word) <= self.max_word_length:
+            return None
+        variants = self._variants
+        levenshtein_distance = self._distance
+        for variant in _deletions(word, self.max_distance):
+            candidates = variants.get(variant)
+            if candidates is None:
+                continue
+            for keyword in candidates:
+                allowed = self._allowed[keyword]
+                if levenshtein_distance(word, keyword, score_cutoff=allowed) <= allowed:
+                    return keyword
+        return None
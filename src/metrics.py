@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+from logger import get_logger
+from scheduler import Scheduler
+
+logger = get_logger(__name__)
+
+DEFAULT_STATS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "stats.json")
+
+# Bucket upper bounds shared by the built-in histograms
+MICROSECONDS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 20000)
+MILLISECONDS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+class Counter:
+    """
+    Monotonic count. Increments are plain integer adds, so concurrent writers may
+    rarely lose an increment; that is the price of not taking a lock on the hot path.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """
+    Last observed value, e.g. the current process table size.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is one bisect over the bucket bounds and
+    three adds, with no allocation, so it can stay on in production.
+    """
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float]):
+        """
+        Args:
+            bounds: Sorted bucket upper bounds; larger values land in an overflow bucket.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the given fraction of observations.
+        """
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def snapshot(self) -> dict:
+        counts = list(self.counts)
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+            "buckets": {label: count for label, count in zip(labels, counts) if count},
+        }
+
+
+class MetricsRegistry:
+    """
+    Named metrics, created on first use. Instrumented code holds on to the
+    metric object, so recording never touches the registry.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _get(self, name: str, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, factory())
+        return metric
+
+    def counter(self, name: str) -> Counter:
+        return self._get(name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get(name, Gauge)
+
+    def histogram(self, name: str, bounds: Sequence[float] = MILLISECONDS) -> Histogram:
+        return self._get(name, lambda: Histogram(bounds))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "metrics": {name: metric.snapshot() for name, metric in sorted(metrics.items())},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class StatsWriter:
+    """
+    Writes a registry snapshot to a JSON file every interval seconds via
+    write-then-rename, so readers never see a partial file. Runs on a scheduler
+    thread; nothing listens on the network.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATS_PATH, interval: float = 10.0,
+                 registry: MetricsRegistry = REGISTRY, scheduler: Optional[Scheduler] = None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.writes = 0
+        self._scheduler = scheduler or Scheduler("StatsWriter")
+        self._task = None
+
+    def start(self):
+        self._scheduler.start()
+        self._task = self._scheduler.call_later(self.interval, self._tick, "stats_writer")
+        logger.info(f"Writing stats to {self.path} every {self.interval:g}s")
+
+    def stop(self):
+        self._scheduler.cancel(self._task)
+        self._task = None
+        self.write()
+
+    def _tick(self) -> float:
+        self.write()
+        return self.interval
+
+    def write(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.registry.snapshot(), f, indent=1)
+            os.replace(tmp_path, self.path)
+            self.writes += 1
+        except OSError as e:
+            logger.warning(f"Could not write stats to {self.path}: {e}")
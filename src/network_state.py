@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+import psutil
+from logger import get_logger
+from command_runner import CommandResult, CommandRunner
+import metrics
+
+logger = get_logger(__name__)
+
+DEFAULT_STATE_PATH = os.path.join("data", "network_state.json")
+# Pseudo-interfaces that carry no internet traffic of their own
+IGNORED_ADAPTER_PREFIXES = ("Loopback", "isatap", "Teredo", "6to4")
+
+
+class NetworkReconciler:
+    """
+    Keeps the network adapters and the firewall block rule in a desired state,
+    issuing netsh commands only where the observed state differs.
+
+    Adapters are enumerated from psutil.net_if_stats(), which is an in-process
+    call, and the names disabled by us are remembered in a small state file. So
+    an adapter that disappears once disabled (as on Windows) is still re-enabled
+    on unlock, even after a restart, and adapters disabled by the user stay
+    disabled. Adapters that are renamed or plugged in during a lock show up in
+    the next check and are disabled too.
+
+    The firewall rule's presence is tracked from our own commands. On a real
+    system it is re-read with "netsh ... show rule" at most every
+    FIREWALL_CHECK_INTERVAL seconds, so the rule is never added twice and a
+    deleted rule comes back. Once in the desired state, a check costs one
+    net_if_stats() call and issues no commands.
+    """
+
+    ADAPTER_CHECK_INTERVAL = 1.0  # Seconds between adapter drift checks on the enforcement tick
+    FIREWALL_CHECK_INTERVAL = 30.0  # Seconds between firewall rule probes (a netsh process each)
+
+    def __init__(self, command_runner: CommandRunner, state_path: str = DEFAULT_STATE_PATH,
+                 firewall_rule: str = "LockdownBlockAll", legacy_adapters: Iterable[str] = (),
+                 stats: Callable[[], Dict[str, object]] = psutil.net_if_stats):
+        """
+        Args:
+            command_runner: Executes netsh.
+            state_path: Where disabled adapters and the rule state are remembered across restarts.
+            firewall_rule: Name of the block rule (one rule per direction).
+            legacy_adapters: Adapters disabled by name by older versions; re-enabled on the
+                first unlock if no state file exists yet.
+            stats: Adapter table provider, psutil.net_if_stats by default.
+        """
+        self._commands = command_runner
+        self.state_path = state_path
+        self.firewall_rule = firewall_rule
+        self.stats = stats
+        self.blocked = False  # Desired state
+        self.disabled: set = set()  # Adapters we disabled and must enable again
+        self._legacy: set = set()  # Possibly disabled by an older version; enabled on the next unlock
+        self.firewall_rule_present: Optional[bool] = None  # Observed; None if unknown
+        self.commands_issued = 0
+        self.checks = 0
+        self._dry_run = getattr(command_runner, "dry_run", False)  # Recorded commands change nothing to read back
+        self._last_adapter_check = float("-inf")
+        self._last_firewall_check = float("-inf")
+        self._lock = threading.Lock()
+        self._load(legacy_adapters)
+
+    def _load(self, legacy_adapters: Iterable[str]):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.disabled = set(state.get("disabled", []))
+            self.firewall_rule_present = state.get("firewall_rule")
+        except FileNotFoundError:
+            self._legacy = set(legacy_adapters)
+        except (OSError, ValueError) as e:
+            logger.error(f"Network state {self.state_path} unreadable, starting from scratch: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"disabled": sorted(self.disabled), "firewall_rule": self.firewall_rule_present}, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"Could not save network state: {e}")
+
+    @staticmethod
+    def _ignored(name: str, stat) -> bool:
+        return name == "lo" or name.startswith(IGNORED_ADAPTER_PREFIXES) or "loopback" in getattr(stat, "flags", "")
+
+    def observe(self) -> Dict[str, bool]:
+        """
+        Current adapters and whether each is up. Adapters we disabled that are no
+        longer listed (or, in a dry run, still listed) count as down.
+        """
+        observed = {name: stat.isup for name, stat in self.stats().items() if not self._ignored(name, stat)}
+        for name in self.disabled:
+            if self._dry_run or name not in observed:
+                observed[name] = False
+        if not self.blocked:
+            for name in self._legacy:
+                observed.setdefault(name, False)
+        return observed
+
+    def set_blocked(self, blocked: bool) -> List[CommandResult]:
+        """
+        Change the desired state and converge to it now (lock and unlock transitions).
+        """
+        self.blocked = blocked
+        return self.reconcile(force=True)
+
+    def check(self) -> List[CommandResult]:
+        """
+        Drift check for the enforcement tick. Rate limited, so it can be called every tick.
+        """
+        if time.monotonic() - self._last_adapter_check < self.ADAPTER_CHECK_INTERVAL:
+            return []
+        return self.reconcile()
+
+    def reconcile(self, force: bool = False) -> List[CommandResult]:
+        """
+        Compare desired and observed state and issue only the commands that differ.
+
+        Args:
+            force: Re-read the firewall rule now instead of waiting for its check interval.
+
+        Returns:
+            list: Results of the commands issued (empty when nothing drifted).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._last_adapter_check = now
+            self.checks += 1
+            before = (frozenset(self.disabled), self.firewall_rule_present, frozenset(self._legacy))
+            if not self.blocked and self._legacy:
+                logger.info(f"Re-enabling adapters disabled by name by an older version: {sorted(self._legacy)}")
+
+            adapter_commands, targets = [], []
+            for name, up in sorted(self.observe().items()):
+                if self.blocked and up:  # Down adapters are left alone until they come up
+                    adapter_commands.append(["netsh", "interface", "set", "interface", name, "admin=disable"])
+                    targets.append((name, True))
+                elif not self.blocked and (name in self.disabled or name in self._legacy):
+                    adapter_commands.append(["netsh", "interface", "set", "interface", name, "admin=enable"])
+                    targets.append((name, False))
+
+            if not self._dry_run and (force or now - self._last_firewall_check >= self.FIREWALL_CHECK_INTERVAL):
+                self._last_firewall_check = now
+                self.firewall_rule_present = self._rule_exists()
+            rule_commands = []
+            if self.blocked and not self.firewall_rule_present:
+                if self.firewall_rule_present is None and not self._dry_run:
+                    self._delete_rule()  # Probe failed: clear any leftover so the rule is not duplicated
+                rule_commands = [["netsh", "advfirewall", "firewall", "add", "rule", f"name={self.firewall_rule}",
+                                  f"dir={direction}", "action=block", "enable=yes"] for direction in ("in", "out")]
+            elif not self.blocked and self.firewall_rule_present is not False:
+                rule_commands = [["netsh", "advfirewall", "firewall", "delete", "rule", f"name={self.firewall_rule}"]]
+
+            # Adapters and the rule are independent, so all remaining steps run at once
+            results = self._run(adapter_commands + rule_commands) if adapter_commands or rule_commands else []
+            for (name, disabled), result in zip(targets, results):
+                if disabled and result.ok:
+                    self.disabled.add(name)
+                elif not disabled:
+                    self.disabled.discard(name)  # A failed enable is not retried forever; it is logged by the runner
+                    self._legacy.discard(name)
+            if rule_commands:
+                rule_results = results[len(adapter_commands):]
+                if all(result.ok for result in rule_results):
+                    self.firewall_rule_present = self.blocked
+                elif not self.blocked:
+                    self.firewall_rule_present = False  # Deleting a missing rule fails too
+            if (frozenset(self.disabled), self.firewall_rule_present, frozenset(self._legacy)) != before:
+                self._save()  # Also the first time, so legacy names are only enabled once
+            if results:
+                logger.info(f"Network reconciled to {'blocked' if self.blocked else 'open'}: "
+                            f"{sum(r.ok for r in results)}/{len(results)} commands succeeded")
+            return results
+
+    def _run(self, commands: List[List[str]]) -> List[CommandResult]:
+        self.commands_issued += len(commands)
+        metrics.counter("network.commands").inc(len(commands))
+        return self._commands.run_parallel(commands)
+
+    def _rule_exists(self) -> Optional[bool]:
+        result = self._commands.run(["netsh", "advfirewall", "firewall", "show", "rule", f"name={self.firewall_rule}"])
+        if result.returncode is None:
+            return None  # netsh missing or hung
+        return result.ok  # netsh exits with 1 when no rule matches
+
+    def _delete_rule(self):
+        self.commands_issued += 1
+        self._commands.run(["netsh", "advfirewall", "firewall", "delete", "rule", f"name={self.firewall_rule}"])
@@ -0,0 +1,102 @@
+import json
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+# Digits and symbols commonly typed in place of letters, e.g. "s3x", "nud3", "p0rn"
+DEFAULT_LEET = {
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's', '!': 'i',
+}
+
+# Non-Latin letters that render like Latin ones (lowercase forms, applied after casefolding)
+DEFAULT_HOMOGLYPHS = {
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'і': 'i', 'ї': 'i', 'ј': 'j', 'к': 'k', 'м': 'm',
+    'н': 'h', 'о': 'o', 'п': 'n', 'р': 'p', 'г': 'r', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's', 'ԁ': 'd', 'һ': 'h',
+    'ӏ': 'l', 'ԛ': 'q', 'ԝ': 'w', 'ь': 'b',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't',
+    'υ': 'u', 'χ': 'x', 'ϲ': 'c', 'ω': 'w',
+}
+
+# Code points folded up front; anything else is folded on first sight and cached
+PRECOMPUTED_RANGES = (
+    (0x0000, 0x0250),  # ASCII, Latin-1, Latin Extended-A/B
+    (0x0370, 0x0530),  # Greek, Cyrillic
+    (0x1E00, 0x1F00),  # Latin Extended Additional
+    (0xFF00, 0xFF70),  # Fullwidth ASCII
+)
+
+
+class NormalizationTable(dict):
+    """
+    char -> folded string. Missing characters are folded once and remembered,
+    so every keystroke costs a single dict lookup.
+    """
+
+    def __init__(self, normalizer: "Normalizer"):
+        super().__init__()
+        self._normalizer = normalizer
+
+    def __missing__(self, char: str) -> str:
+        folded = self._normalizer.fold(char)
+        self[char] = folded
+        return folded
+
+
+class Normalizer:
+    """
+    Folds text so visually or phonetically equivalent spellings match the same keyword.
+
+    Each character goes through compatibility decomposition (fullwidth letters,
+    ligatures, circled letters), accent stripping, casefolding, homoglyph mapping
+    and leetspeak substitution. Keywords and keystrokes must be folded by the
+    same Normalizer, so the matcher only ever sees the canonical form.
+    """
+
+    def __init__(self, leet: Optional[Dict[str, str]] = None, homoglyphs: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            leet: Character substitutions applied last (DEFAULT_LEET if None, {} disables).
+            homoglyphs: Look-alike letters mapped to Latin (DEFAULT_HOMOGLYPHS if None, {} disables).
+        """
+        self.leet = DEFAULT_LEET if leet is None else dict(leet)
+        self.homoglyphs = DEFAULT_HOMOGLYPHS if homoglyphs is None else dict(homoglyphs)
+        self.table = NormalizationTable(self)
+        for start, end in PRECOMPUTED_RANGES:
+            for code_point in range(start, end):
+                self.table[chr(code_point)]  # noqa: B018 - fills the cache
+        self._ascii = {code_point: self.table[chr(code_point)] for code_point in range(128)}
+
+    def fold(self, char: str) -> str:
+        """
+        Fold one character without the cache. May return '' (combining marks) or several characters (ligatures).
+        """
+        decomposed = unicodedata.normalize("NFKD", char)
+        stripped = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+        homoglyphs, leet = self.homoglyphs, self.leet
+        return "".join(leet.get(c, c) for c in (homoglyphs.get(c, c) for c in stripped))
+
+    def text(self, text: str) -> str:
+        """
+        Fold a whole string, e.g. a keyword.
+        """
+        if text.isascii():
+            return text.translate(self._ascii)  # Bulk imports are mostly ASCII
+        table = self.table
+        return "".join(table[c] for c in text)
+
+    def fingerprint(self) -> bytes:
+        """
+        8-byte digest of the leet and homoglyph tables, stored in compiled indexes
+        so one folded with other tables is detected.
+        """
+        tables = json.dumps([sorted(self.leet.items()), sorted(self.homoglyphs.items())], ensure_ascii=False)
+        return hashlib.sha256(tables.encode("utf-8")).digest()[:8]
+
+    def keywords(self, keywords: Iterable[str]) -> list:
+        """
+        Fold keywords, dropping duplicates and ones that fold to nothing.
+        """
+        return sorted({folded for folded in (self.text(k) for k in keywords if k) if folded})
@@ -0,0 +1,252 @@
+import os
+import sys
+import socket
+import struct
+import threading
+from typing import Callable, Optional
+
+import psutil
+from logger import get_logger
+from process_snapshot import ProcessSnapshot
+
+logger = get_logger(__name__)
+
+ProcessCallback = Callable[[psutil.Process], None]
+
+
+def describe_process(pid: int, name: Optional[str] = None) -> Optional[psutil.Process]:
+    """
+    Build a psutil.Process with the same info dict process_iter(['name', 'create_time']) fills in.
+
+    Returns:
+        psutil.Process or None if the process already exited.
+    """
+    try:
+        proc = psutil.Process(pid)
+        proc.info = {'name': name or proc.name(), 'create_time': proc.create_time()}
+        return proc
+    except psutil.Error:
+        return None
+
+
+class ProcessEventSource:
+    """
+    Reports newly started processes to a callback.
+
+    Push-based sources get notified by the OS as processes start, so reaction
+    latency is in milliseconds and they cost nothing while the system is idle.
+    The polling source is the portable fallback.
+    """
+
+    name = "base"
+    push_based = False
+
+    def __init__(self):
+        self._callback: Optional[ProcessCallback] = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.events = 0
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, callback: ProcessCallback):
+        """
+        Start delivering new processes to callback on a background thread.
+        """
+        if self.running:
+            self._callback = callback
+            return
+        self._callback = callback
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_safely, name=f"ProcessEvents-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Process event source '{self.name}' started")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+            logger.info(f"Process event source '{self.name}' stopped")
+
+    def _emit(self, proc: Optional[psutil.Process]):
+        if proc is None or self._callback is None:
+            return
+        self.events += 1
+        try:
+            self._callback(proc)
+        except Exception as e:
+            logger.error(f"Process event callback failed: {e}")
+
+    def _run_safely(self):
+        try:
+            self._run()
+        except Exception as e:
+            logger.error(f"Process event source '{self.name}' failed: {e}")
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class PollingProcessEventSource(ProcessEventSource):
+    """
+    Fallback: diff the process table every interval seconds.
+    """
+
+    name = "polling"
+
+    def __init__(self, interval: float = 1.0):
+        super().__init__()
+        self.interval = interval
+        self._snapshot = ProcessSnapshot()
+
+    def _run(self):
+        self._snapshot.refresh()  # Baseline; only processes started afterwards are reported
+        while not self._stop_event.wait(self.interval):
+            for proc in self._snapshot.refresh():
+                self._emit(proc)
+
+
+class NetlinkProcessEventSource(ProcessEventSource):
+    """
+    Linux: subscribe to exec events from the kernel proc connector.
+
+    Needs CAP_NET_ADMIN (root). Used for local development and tests; the
+    service itself runs on Windows.
+    """
+
+    name = "netlink"
+    push_based = True
+
+    NETLINK_CONNECTOR = 11
+    CN_IDX_PROC = 1
+    CN_VAL_PROC = 1
+    NLMSG_DONE = 3
+    PROC_CN_MCAST_LISTEN = 1
+    PROC_CN_MCAST_IGNORE = 2
+    PROC_EVENT_EXEC = 0x00000002
+    NLMSG_HEADER = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+    CN_MSG_HEADER = struct.Struct("=IIIIHH")  # idx, val, seq, ack, len, flags
+    EVENT_HEADER = struct.Struct("=IIQ")  # what, cpu, timestamp_ns
+    EXEC_EVENT = struct.Struct("=II")  # process_pid, process_tgid
+
+    @classmethod
+    def available(cls) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            sock = cls._open_socket()
+            sock.close()
+            return True
+        except OSError:
+            return False
+
+    @classmethod
+    def _open_socket(cls) -> socket.socket:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, cls.NETLINK_CONNECTOR)
+        try:
+            sock.bind((0, cls.CN_IDX_PROC))
+            cls._send_op(sock, cls.PROC_CN_MCAST_LISTEN)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @classmethod
+    def _send_op(cls, sock: socket.socket, op: int):
+        payload = struct.pack("=I", op)
+        cn_msg = cls.CN_MSG_HEADER.pack(cls.CN_IDX_PROC, cls.CN_VAL_PROC, 0, 0, len(payload), 0)
+        length = cls.NLMSG_HEADER.size + len(cn_msg) + len(payload)
+        sock.send(cls.NLMSG_HEADER.pack(length, cls.NLMSG_DONE, 0, 0, os.getpid()) + cn_msg + payload)
+
+    def _run(self):
+        sock = self._open_socket()
+        sock.settimeout(0.5)  # Only so stop() is noticed; no work happens on timeout
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                for pid in self._parse_exec_pids(data):
+                    self._emit(describe_process(pid))
+        finally:
+            try:
+                self._send_op(sock, self.PROC_CN_MCAST_IGNORE)
+            except OSError:
+                pass
+            sock.close()
+
+    @classmethod
+    def _parse_exec_pids(cls, data: bytes):
+        offset = 0
+        while offset + cls.NLMSG_HEADER.size <= len(data):
+            length = cls.NLMSG_HEADER.unpack_from(data, offset)[0]
+            if length < cls.NLMSG_HEADER.size:
+                return
+            event_offset = offset + cls.NLMSG_HEADER.size + cls.CN_MSG_HEADER.size
+            if event_offset + cls.EVENT_HEADER.size + cls.EXEC_EVENT.size <= offset + length:
+                what = cls.EVENT_HEADER.unpack_from(data, event_offset)[0]
+                if what == cls.PROC_EVENT_EXEC:
+                    _, tgid = cls.EXEC_EVENT.unpack_from(data, event_offset + cls.EVENT_HEADER.size)
+                    yield tgid
+            offset += (length + 3) & ~3
+
+
+class WmiProcessEventSource(ProcessEventSource):
+    """
+    Windows: block on WMI Win32_ProcessStartTrace notifications (kernel ETW process start events).
+
+    Requires pywin32 and administrator rights, both of which the service has.
+    """
+
+    name = "wmi"
+    push_based = True
+    WBEM_TIMED_OUT = -2147209215  # 0x80043001, NextEvent timed out
+
+    @classmethod
+    def available(cls) -> bool:
+        if sys.platform != "win32":
+            return False
+        try:
+            import pythoncom  # noqa: F401
+            import win32com.client  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _run(self):
+        import pythoncom
+        import pywintypes
+        import win32com.client
+
+        pythoncom.CoInitialize()
+        try:
+            service = win32com.client.GetObject("winmgmts:{impersonationLevel=impersonate}!\\\\.\\root\\cimv2")
+            watcher = service.ExecNotificationQuery("SELECT ProcessID, ProcessName FROM Win32_ProcessStartTrace")
+            while not self._stop_event.is_set():
+                try:
+                    event = watcher.NextEvent(500)  # Milliseconds; only so stop() is noticed
+                except pywintypes.com_error as e:
+                    if e.excepinfo and e.excepinfo[5] == self.WBEM_TIMED_OUT:
+                        continue
+                    raise
+                self._emit(describe_process(int(event.ProcessID), event.ProcessName))
+        finally:
+            pythoncom.CoUninitialize()
+
+
+def create_process_event_source(poll_interval: float = 1.0) -> ProcessEventSource:
+    """
+    Pick the best available source: WMI on Windows, netlink on Linux, polling otherwise.
+    """
+    for source_class in (WmiProcessEventSource, NetlinkProcessEventSource):
+        if source_class.available():
+            return source_class()
+    return PollingProcessEventSource(poll_interval)
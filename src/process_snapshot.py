@@ -0,0 +1,65 @@
+import psutil
+from collections import deque
+from typing import Dict, List, Set, Tuple
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+ProcessKey = Tuple[int, float]  # (pid, create_time), stable across PID reuse
+
+
+def process_key(proc: psutil.Process) -> ProcessKey:
+    return proc.pid, proc.info.get('create_time') or 0.0
+
+
+class ProcessSnapshot:
+    """
+    One process enumeration per enforcement tick, diffed against the previous tick.
+
+    refresh() walks the process table once and returns only processes that were
+    not present on the previous tick, so policy handlers never re-evaluate the
+    hundreds of long-lived processes on a typical machine. Processes are keyed
+    on (pid, create_time), so a reused PID counts as a new process.
+    """
+
+    ATTRS = ['name', 'create_time']
+
+    def __init__(self):
+        self._seen: Set[ProcessKey] = set()
+        self._retry = deque()  # Keys to evaluate again on the next tick, appended from worker threads
+        self.size = 0
+
+    @property
+    def keys(self) -> Set[ProcessKey]:
+        return self._seen
+
+    def refresh(self) -> List[psutil.Process]:
+        """
+        Enumerate processes once and return those not seen on the previous tick.
+        """
+        seen = self._seen
+        while self._retry:
+            seen.discard(self._retry.popleft())
+
+        current: Dict[ProcessKey, psutil.Process] = {}
+        for proc in psutil.process_iter(self.ATTRS):
+            current[process_key(proc)] = proc
+
+        new_processes = [proc for key, proc in current.items() if key not in seen]
+        self._seen = set(current)
+        self.size = len(current)
+        return new_processes
+
+    def retry(self, key: ProcessKey):
+        """
+        Have the process evaluated again on the next tick, e.g. after a failed kill.
+        Safe to call from any thread.
+        """
+        self._retry.append(key)
+
+    def reset(self):
+        """
+        Forget every process so the next refresh evaluates the whole table.
+        """
+        self._retry.clear()
+        self._seen = set()
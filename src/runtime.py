@@ -0,0 +1,253 @@
+import time
+import signal
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from logger import get_logger
+from scheduler import ScheduledTask, TaskCallback
+
+logger = get_logger(__name__)
+
+
+class Runtime:
+    """
+    One asyncio event loop for all timed and event-driven work.
+
+    The runtime implements the Scheduler interface (call_later, cancel,
+    reschedule), so lock expiry, enforcement ticks, violation decay, config
+    watching and stats writing are timers on the loop instead of each owning a
+    thread. Keystrokes are bridged in from the hook thread with
+    call_soon_threadsafe, and blocking psutil/subprocess work goes to one
+    bounded executor. Between events the loop sleeps in the OS selector until
+    the next timer is due, so an idle agent does not wake up on a fixed beat.
+
+    Shutdown is structured: shutdown callbacks run in reverse registration
+    order, then pending timers and tasks are cancelled and the executor is
+    drained before the loop closes.
+    """
+
+    def __init__(self, max_workers: int = 4, name: str = "Runtime"):
+        """
+        Args:
+            max_workers: Threads for blocking work (process scans, netsh, matcher builds).
+            name: Name of the loop thread when started in the background.
+        """
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Blocking")
+        self.loop.set_default_executor(self.executor)
+        self.runs = 0
+        self._counter = itertools.count(1)
+        self._handles: Dict[ScheduledTask, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._shutdown_callbacks: List[Tuple[str, Callable[[], Any]]] = []
+        self._loop_thread_id = None
+        self._thread = None
+        self._stopping = False
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.loop.is_running() or (self._thread is not None and self._thread.is_alive())
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for task in self._handles if task.active)
+
+    def in_loop(self) -> bool:
+        return threading.get_ident() == self._loop_thread_id
+
+    # Lifecycle
+
+    def run(self, main: Optional[Awaitable] = None):
+        """
+        Run the loop on the calling thread until request_stop() or Ctrl+C.
+
+        Args:
+            main: Coroutine started once the loop runs, e.g. the staged boot.
+
+        Returns:
+            The result of main, if it finished.
+
+        Raises:
+            Exception: Whatever main raised, after the runtime has shut down.
+        """
+        asyncio.set_event_loop(self.loop)
+        self._loop_thread_id = threading.get_ident()
+        main_task = self.spawn(main, "main") if main is not None else None
+        self._install_signal_handlers()
+        try:
+            self.loop.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Keyboard interrupt detected, shutting down")
+            self.loop.run_until_complete(self._shutdown())
+        finally:
+            self.loop.close()
+            self._stopped.set()
+        if main_task is None or not main_task.done() or main_task.cancelled():
+            return None
+        return main_task.result()
+
+    def start(self):
+        """
+        Run the loop on a background thread. Does nothing if it is already running,
+        so components written against Scheduler can call it unconditionally.
+        """
+        if self.running or self._stopped.is_set():
+            return
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+        while self._loop_thread_id is None and self._thread.is_alive():
+            time.sleep(0.001)
+
+    def stop(self):
+        """
+        Shut down and, for a background loop, wait for it to finish.
+        """
+        self.request_stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+
+    def request_stop(self):
+        """
+        Begin a structured shutdown. Safe to call from any thread, e.g. a service stop handler.
+        """
+        self._call(self._begin_shutdown)
+
+    def wait_stopped(self, timeout: Optional[float] = None) -> bool:
+        return self._stopped.wait(timeout)
+
+    def on_shutdown(self, callback: Callable[[], Any], name: Optional[str] = None):
+        """
+        Register a cleanup step. Steps run on the loop in reverse registration order.
+        """
+        self._shutdown_callbacks.append((name or getattr(callback, "__name__", "callback"), callback))
+
+    def _install_signal_handlers(self):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(signum, self.request_stop)
+            except (NotImplementedError, RuntimeError, ValueError, AttributeError):
+                pass  # Windows and non-main threads; Ctrl+C still raises KeyboardInterrupt in run()
+
+    def _begin_shutdown(self):
+        if not self._stopping:
+            self._stopping = True
+            self.spawn(self._shutdown(), "shutdown")
+
+    async def _shutdown(self):
+        self._stopping = True
+        for name, callback in reversed(self._shutdown_callbacks):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Shutdown step '{name}' failed: {e}")
+        for task in list(self._handles):
+            self.cancel(task)
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_default_executor()
+        logger.info("Runtime stopped")
+        self.loop.stop()
+
+    # Threads and blocking work
+
+    def _call(self, callback: Callable, *args):
+        if self.in_loop():
+            callback(*args)
+        elif not self.loop.is_closed():  # After shutdown, late timers from other threads are dropped
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_soon_threadsafe(self, callback: Callable, *args):
+        """
+        Run callback on the loop. The bridge for events from other threads (keyboard hook, process events).
+        """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def run_blocking(self, function: Callable, *args) -> Awaitable:
+        """
+        Run a blocking function on the bounded executor; await the result from the loop.
+        """
+        return self.loop.run_in_executor(self.executor, function, *args)
+
+    def spawn(self, coroutine: Awaitable, name: Optional[str] = None) -> asyncio.Task:
+        """
+        Start a coroutine as a task owned by the runtime. Failures are logged and
+        the task is cancelled on shutdown. Must be called on the loop thread.
+        """
+        task = self.loop.create_task(coroutine, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Task '{task.get_name()}' failed: {task.exception()!r}")
+            if task.get_name() == "main":
+                self._begin_shutdown()
+
+    # Scheduler interface
+
+    def call_later(self, delay: float, callback: TaskCallback, name: Optional[str] = None) -> ScheduledTask:
+        """
+        Run callback on the loop after delay seconds. Like Scheduler.call_later, a
+        callback returning a number is run again after that many seconds.
+        """
+        task = ScheduledTask(name or getattr(callback, "__name__", "task"), callback, time.monotonic() + max(0.0, delay))
+        task._seq = next(self._counter)
+        self._call(self._arm, task, task._seq)
+        return task
+
+    def cancel(self, task: Optional[ScheduledTask]):
+        """
+        Stop a task from running. Safe to call from any thread, with None, or twice.
+        """
+        if task is None:
+            return
+        task.cancelled = True
+        task._seq = 0
+        self._call(self._disarm, task)
+
+    def reschedule(self, task: ScheduledTask, delay: float) -> ScheduledTask:
+        """
+        Move a task to a new deadline. A cancelled task is revived.
+        """
+        task.cancelled = False
+        task.deadline = time.monotonic() + max(0.0, delay)
+        task._seq = next(self._counter)
+        self._call(self._arm, task, task._seq)
+        return task
+
+    def _disarm(self, task: ScheduledTask):
+        handle = self._handles.pop(task, None)
+        if handle is not None:
+            handle.cancel()
+
+    def _arm(self, task: ScheduledTask, seq: int):
+        if task._seq != seq:
+            return  # Cancelled or rescheduled again before this reached the loop
+        self._disarm(task)
+        # The loop clock is time.monotonic(), the same clock as ScheduledTask deadlines
+        self._handles[task] = self.loop.call_at(task.deadline, self._fire, task, seq)
+
+    def _fire(self, task: ScheduledTask, seq: int):
+        if task._seq != seq:
+            return
+        self._handles.pop(task, None)
+        task._seq = 0
+        self.runs += 1
+        try:
+            delay = task.callback()
+        except Exception as e:
+            logger.error(f"Scheduled task '{task.name}' failed: {e}")
+            return
+        if delay is not None and not task.cancelled and not task.active:  # Not cancelled or rescheduled by the callback
+            task.deadline = time.monotonic() + max(0.0, delay)
+            task._seq = next(self._counter)
+            self._arm(task, task._seq)
@@ -0,0 +1,153 @@
+import time
+import heapq
+import itertools
+import threading
+from typing import Callable, List, Optional
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# A task callback may return the delay in seconds until it should run again, or None to finish
+TaskCallback = Callable[[], Optional[float]]
+
+
+class ScheduledTask:
+    """
+    Handle for a scheduled callback. Pass it to Scheduler.cancel or Scheduler.reschedule.
+    """
+    __slots__ = ("name", "callback", "deadline", "cancelled", "_seq")
+
+    def __init__(self, name: str, callback: TaskCallback, deadline: float):
+        self.name = name
+        self.callback = callback
+        self.deadline = deadline  # time.monotonic() value
+        self.cancelled = False
+        self._seq = 0
+
+    @property
+    def active(self) -> bool:
+        return not self.cancelled and self._seq != 0
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class Scheduler:
+    """
+    One thread running every timed job: lock expiry, enforcement ticks, violation decay.
+
+    Jobs sit in a heap ordered by monotonic deadline and the thread sleeps until
+    the earliest one is due, so it wakes only when there is work and wall-clock
+    changes cannot make a lock end early or late. A callback that returns a
+    number is run again after that many seconds, which lets periodic jobs pick
+    their own rate. Cancelled jobs are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, name: str = "Scheduler"):
+        self.name = name
+        self._heap: List[tuple] = []
+        self._counter = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.wakeups = 0
+        self.runs = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return sum(1 for _, _, task in self._heap if task.active)
+
+    def start(self):
+        with self._condition:
+            if self.running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        logger.debug(f"{self.name} thread started")
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def call_later(self, delay: float, callback: TaskCallback, name: Optional[str] = None) -> ScheduledTask:
+        """
+        Run callback on the scheduler thread after delay seconds.
+
+        Returns:
+            ScheduledTask: Handle for cancel/reschedule.
+        """
+        task = ScheduledTask(name or getattr(callback, "__name__", "task"), callback, time.monotonic() + max(0.0, delay))
+        with self._condition:
+            self._push(task)
+        return task
+
+    def cancel(self, task: Optional[ScheduledTask]):
+        """
+        Stop a task from running. Safe to call from callbacks, with None, or twice.
+        """
+        if task is None:
+            return
+        with self._condition:
+            task.cancelled = True
+            task._seq = 0
+
+    def reschedule(self, task: ScheduledTask, delay: float) -> ScheduledTask:
+        """
+        Move a task to a new deadline, e.g. when a lock is extended. A cancelled task is revived.
+        """
+        with self._condition:
+            task.cancelled = False
+            task.deadline = time.monotonic() + max(0.0, delay)
+            self._push(task)
+        return task
+
+    def _push(self, task: ScheduledTask):
+        # A new sequence number invalidates any older heap entry of the same task
+        task._seq = next(self._counter)
+        heapq.heappush(self._heap, (task.deadline, task._seq, task))
+        if self._heap[0][2] is task:
+            self._condition.notify()  # New earliest deadline
+
+    def _next_due(self) -> Optional[ScheduledTask]:
+        """
+        Wait until the earliest task is due and pop it. Returns None when stopping.
+        """
+        with self._condition:
+            while self._running:
+                while self._heap and self._heap[0][1] != self._heap[0][2]._seq:
+                    heapq.heappop(self._heap)  # Cancelled or rescheduled
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                if timeout is not None and timeout <= 0:
+                    _, _, task = heapq.heappop(self._heap)
+                    task._seq = 0
+                    return task
+                self._condition.wait(timeout)
+                self.wakeups += 1
+            return None
+
+    def _run(self):
+        while True:
+            task = self._next_due()
+            if task is None:
+                return
+            self.runs += 1
+            try:
+                delay = task.callback()
+            except Exception as e:
+                logger.error(f"Scheduled task '{task.name}' failed: {e}")
+                continue
+            if delay is not None:
+                with self._condition:
+                    if not task.cancelled and not task.active:  # Not cancelled or rescheduled by the callback
+                        task.deadline = time.monotonic() + max(0.0, delay)
+                        self._push(task)
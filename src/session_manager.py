@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import threading
+from typing import Optional
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SessionJournal:
+    """
+    Crash-safe store for the lock state.
+
+    Updates are appended to a journal as one JSON line holding only the fields
+    that changed. Every compact_every entries the merged state is written to the
+    snapshot file via write-then-rename and the journal is truncated, so a crash
+    can never leave a half-written snapshot and recovery reads at most one
+    snapshot plus a bounded journal tail.
+
+    Appends are fsynced in groups: a background thread syncs pending lines at most
+    fsync_interval seconds after they were written, unless the caller asks for a
+    durable append (e.g. when a lock starts) which is synced before returning.
+    """
+
+    def __init__(self, snapshot_path: str = "data/lockdown.json", journal_path: Optional[str] = None,
+                 compact_every: int = 64, fsync_interval: float = 1.0):
+        """
+        Args:
+            snapshot_path: Compacted state file (the former lockdown.json).
+            journal_path: Append-only journal (defaults to the snapshot path with a .journal extension).
+            compact_every: Journal entries written before the state is compacted into the snapshot.
+            fsync_interval: Maximum seconds a non-durable append waits for its fsync.
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.fsync_interval = fsync_interval
+        self._state = {}
+        self._entries = 0
+        self._recovered = False  # append() diffs against, and compaction writes, the recovered state
+        self._journal = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self._sync_thread = None
+        self.fsyncs = 0
+        self.appends = 0
+
+    @property
+    def state(self) -> dict:
+        return dict(self._state)
+
+    def recover(self) -> Optional[dict]:
+        """
+        Rebuild the state from the snapshot plus the journal tail.
+
+        A torn or corrupt trailing journal line (crash mid-append) is ignored.
+        Called by append() and compact() if nobody called it first.
+
+        Returns:
+            dict: The recovered state, or None if nothing was ever saved.
+        """
+        with self._lock:
+            return self._recover()
+
+    def _recover(self) -> Optional[dict]:
+        found = False
+        state = {}
+        try:
+            with open(self.snapshot_path, "r") as f:
+                state = json.load(f)
+            found = True
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.error(f"Snapshot {self.snapshot_path} unreadable, relying on journal: {e}")
+
+        entries = 0
+        damaged = False
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        if not line.endswith("\n"):
+                            raise ValueError("torn entry")
+                        state.update(json.loads(line))
+                    except ValueError as e:
+                        logger.warning(f"Ignoring damaged journal tail: {e}")
+                        damaged = True
+                        break
+                    entries += 1
+                    found = True
+        except FileNotFoundError:
+            pass
+
+        self._state = state
+        self._entries = entries
+        self._recovered = True
+        if damaged:
+            self._compact()  # Never append after a damaged line
+        logger.debug(f"Recovered session state from snapshot and {entries} journal entries")
+        return dict(state) if found else None
+
+    def append(self, state: dict, durable: bool = False):
+        """
+        Record a new state. Only fields that differ from the current state are written.
+
+        Args:
+            state: Full or partial state.
+            durable: fsync before returning instead of waiting for the group sync.
+        """
+        with self._lock:
+            if not self._recovered:
+                self._recover()
+            changes = {key: value for key, value in state.items() if self._state.get(key, object()) != value}
+            if not changes:
+                return
+            self._state.update(changes)
+            journal = self._open_journal()
+            journal.write(json.dumps(changes, separators=(",", ":")) + "\n")
+            journal.flush()
+            self._entries += 1
+            self.appends += 1
+
+            if self._entries >= self.compact_every:
+                self._compact()
+            elif durable:
+                self._fsync()
+            else:
+                self._dirty.set()
+
+    def compact(self):
+        """
+        Write the merged state to the snapshot and truncate the journal.
+        """
+        with self._lock:
+            if not self._recovered:
+                self._recover()
+            self._compact()
+
+    def sync(self):
+        """
+        fsync any appended entries now.
+        """
+        with self._lock:
+            self._fsync()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._fsync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        self._dirty.set()
+
+    def _open_journal(self):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+            self._start_sync_thread()
+        return self._journal
+
+    def _start_sync_thread(self):
+        if self._sync_thread is None:
+            self._sync_thread = threading.Thread(target=self._group_sync, name="JournalSync", daemon=True)
+            self._sync_thread.start()
+
+    def _fsync(self):
+        self._dirty.clear()
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self.fsyncs += 1
+
+    def _group_sync(self):
+        """
+        Background thread: one fsync covers every append made during the interval.
+        """
+        while not self._closed:
+            self._dirty.wait()
+            if self._closed:
+                return
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._dirty.is_set():
+                    self._fsync()
+
+    def _compact(self):
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        if hasattr(os, "O_DIRECTORY"):  # Persist the rename itself on POSIX
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        os.fsync(self._journal.fileno())
+        self._start_sync_thread()
+        self._entries = 0
+        self._dirty.clear()
+        logger.debug("Session journal compacted into snapshot")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules in src/ import each other by bare name, mirror that for the tests
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
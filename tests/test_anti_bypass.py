@@ -0,0 +1,50 @@
+import threading
+import time
+
+from anti_bypass import Watchdog
+
+
+class CountingWatchdog(Watchdog):
+    STABLE_AFTER = 0.0  # Every exit counts as isolated, so no backoff applies
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scans = 0
+        self.delays = []
+
+    def _is_target_running(self):
+        self.scans += 1
+        return super()._is_target_running()
+
+    def _backoff(self, quick_exits):
+        delay = super()._backoff(quick_exits)
+        self.delays.append(delay)
+        return delay
+
+
+def test_watchdog_restarts_target_as_soon_as_it_exits(tmp_path):
+    script = tmp_path / "target.py"
+    script.write_text("import time\ntime.sleep(0.3)\n")
+    watchdog = CountingWatchdog(target_process="not-running.exe", target_script=str(script))
+    thread = threading.Thread(target=watchdog.start, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while watchdog.restarts < 3 and time.time() < deadline:
+        time.sleep(0.05)
+    watchdog.stop()
+    thread.join(timeout=5)
+
+    assert watchdog.restarts >= 3
+    # Exits are noticed by waiting on the child's handle: the process table is scanned
+    # only once, before the first launch, and relaunches are not delayed
+    assert watchdog.scans == 1
+    assert watchdog.delays and set(watchdog.delays) == {0.0}
+    assert watchdog.last_restart_latency is not None
+    assert not thread.is_alive()
+
+
+def test_backoff_grows_only_for_repeated_quick_exits():
+    watchdog = Watchdog()
+    assert [watchdog._backoff(n) for n in range(1, 5)] == [0.0, 0.5, 1.0, 2.0]
+    assert watchdog._backoff(50) == Watchdog.MAX_BACKOFF
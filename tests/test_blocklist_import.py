@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from blocklist_import import BlocklistImporter, _external_sort, detect_format, domain_token
+
+
+@pytest.mark.parametrize("domain, token", [
+    ("pornhub.com", "pornhub"),
+    ("cdn.example-site.co.uk", "example-site"),
+    ("www.xvideos.com.br", "xvideos"),
+    ("abc.net", None),  # Too short to match safely
+    ("live.com", None),
+    ("cdn.video.xxx", None),  # Everyday words would lock on ordinary typing
+    ("photos.example.net", "example"),
+    ("p.o.r.n", None),
+    ("localhost", None),
+    ("10.0.0.1", None),
+])
+def test_domain_token(domain, token):
+    assert domain_token(domain) == token
+
+
+def test_detects_list_formats(tmp_path):
+    samples = {"hosts": "# comment\n0.0.0.0 ads.example.com\n", "domains": "||example.com^\n",
+               "terms": "! header\nnacktbilder\n", "dotted": "p.o.r.n\ns.e.x\n"}
+    for fmt, content in samples.items():
+        path = tmp_path / f"{fmt}.txt"
+        path.write_text(content, encoding="utf-8")
+        assert detect_format(str(path)) == ("terms" if fmt == "dotted" else fmt)
+
+
+@pytest.fixture
+def importer(tmp_path):
+    return BlocklistImporter(str(tmp_path / "store"))
+
+
+def test_reimport_only_processes_changes(tmp_path, importer):
+    hosts = tmp_path / "hosts"
+    hosts.write_text("127.0.0.1 localhost\n0.0.0.0 www.pornsite.com\n0.0.0.0 cdn.pornsite.com\n"
+                     "0.0.0.0 hentaiworld.net # trailing comment\n", encoding="utf-8")
+    first = importer.import_source(str(hosts))
+    assert (first.changed, first.tokens, first.added) == (True, 2, 2)
+
+    assert importer.import_source(str(hosts)).changed is False
+    os.utime(hosts, ns=(1, 1))  # Touched but identical content
+    assert importer.import_source(str(hosts)).changed is False
+
+    hosts.write_text("0.0.0.0 pornsite.com\n0.0.0.0 nudeclips.org\n", encoding="utf-8")
+    update = importer.import_source(str(hosts))
+    assert (update.changed, update.added, update.removed) == (True, 1, 1)
+    assert list(importer.tokens()) == ["nudeclips", "pornsite"]
+
+
+def test_index_merges_keywords_and_lists(tmp_path, importer):
+    from keyword_index import load_index
+
+    terms = tmp_path / "terms.txt"
+    terms.write_text("Nacktbilder\nporno\nab\n", encoding="utf-8")
+    domains = tmp_path / "domains.txt"
+    domains.write_text("||pornsite.com^\nporno.xxx\n", encoding="utf-8")
+    importer.sync([str(terms), str(domains)])
+
+    index_path = str(tmp_path / "keywords.idx")
+    assert importer.build_index(["Striptease"], index_path) is not None
+    assert importer.build_index(["Striptease"], index_path) is None  # Nothing changed
+    automaton = load_index(index_path)
+    assert sorted(automaton.keywords) == ["nacktbilder", "porno", "pornsite", "striptease"]
+
+    importer.sync([str(terms)])
+    assert list(importer.tokens()) == ["nacktbilder", "porno"]
+
+
+def test_leet_change_reimports_and_recompiles(tmp_path, importer):
+    from keyword_index import load_index
+    from normalizer import Normalizer
+
+    terms = tmp_path / "terms.txt"
+    terms.write_text("b1gb00bs\n", encoding="utf-8")
+    index_path = str(tmp_path / "keywords.idx")
+    importer.sync([str(terms)])
+    importer.build_index([], index_path)
+
+    plain = BlocklistImporter(importer.store_dir, normalizer=Normalizer(leet={}))
+    assert plain.import_source(str(terms)).changed is True
+    assert plain.build_index([], index_path) is not None
+    assert list(plain.tokens()) == ["b1gb00bs"]
+    assert list(load_index(index_path, plain.normalizer).keywords) == ["b1gb00bs"]
+
+    # Compiling alone also refolds sources imported with the old table
+    assert importer.build_index([], index_path) is not None
+    assert list(importer.tokens()) == ["bigboobs"]
+
+
+def test_external_sort_merges_spilled_runs(tmp_path):
+    tokens = [f"token{i % 37:03d}" for i in range(500)]
+    assert list(_external_sort(tokens, str(tmp_path), run_size=10)) == sorted(set(tokens))
+    assert os.listdir(tmp_path) == []  # Runs removed
+
+
+def test_everyday_site_names_do_not_become_keywords(tmp_path, importer):
+    from keyword_index import load_index
+
+    domains = tmp_path / "domains.txt"
+    domains.write_text("video.xxx\nlive.com\nphotos.net\nwww.youtube.com\nnudeclips.org\n", encoding="utf-8")
+    importer.import_source(str(domains))
+    assert list(importer.tokens()) == ["nudeclips"]
+
+    index_path = str(tmp_path / "keywords.idx")
+    importer.build_index([], index_path)
+    automaton = load_index(index_path)
+    assert automaton.search("watch a live video of my photos on youtube") is None
@@ -0,0 +1,40 @@
+import time
+
+import boot
+import metrics
+from session_manager import SessionJournal
+
+
+def test_persisted_lock_is_restored_before_the_listener_starts(tmp_path, monkeypatch):
+    import lockdown as lockdown_module
+    from command_runner import RecordingCommandRunner
+    from keyboard_monitor import KeyboardMonitor
+
+    monkeypatch.chdir(tmp_path)  # Lockdown keeps its state in data/ under the working directory
+    (tmp_path / "data").mkdir()
+    journal = SessionJournal(str(tmp_path / "data" / "lockdown.json"))
+    journal.append({'is_locked': True, 'lock_end_time': time.time() + 600, 'violation_count': 2}, durable=True)
+    journal.close()
+
+    monkeypatch.setattr(lockdown_module, "create_command_runner", RecordingCommandRunner)
+    monkeypatch.setattr(lockdown_module.Lockdown, "_enforce_restrictions", lambda self: 0)
+    monkeypatch.setattr(lockdown_module.Lockdown, "_begin_enforcement", lambda self: None)
+    locked_at_listener_start = []
+
+    def start(monitor, runtime=None):
+        locked_at_listener_start.append(monitor.lockdown.is_locked)
+        monitor.start_consumer(runtime)  # No keyboard hook in tests
+
+    monkeypatch.setattr(KeyboardMonitor, "start", start)
+    stats_writer = metrics.StatsWriter
+    monkeypatch.setattr(metrics, "StatsWriter", lambda **kwargs: stats_writer(str(tmp_path / "stats.json"), **kwargs))
+    config_path = tmp_path / "config.json"
+    config_path.write_text('{"keyword_index": null, "fuzzy_distance": 0}')
+
+    report = boot.run(str(config_path), exit_after_boot=True)
+
+    assert locked_at_listener_start == [True]
+    assert list(report["phases"]) == ["config", "restore", "matcher", "listener", "services"]
+    assert report["ready"]["restore"] < report["ready"]["listener"]
+    assert metrics.REGISTRY.snapshot()["metrics"]["boot.restore_ms"] >= 0
+    assert (tmp_path / "stats.json").exists()  # Written by the stats writer's shutdown step
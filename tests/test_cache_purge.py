@@ -0,0 +1,61 @@
+import os
+import time
+
+from cache_purge import CachePurger
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def _fake_appdata(root):
+    chrome = os.path.join(root, "Google", "Chrome", "User Data")
+    for profile in ("Default", "Profile 1"):
+        for index in range(5):
+            _write(os.path.join(chrome, profile, "Cache", "Cache_Data", f"f_{index}"), 100)
+        _write(os.path.join(chrome, profile, "Code Cache", "js", "index"), 50)
+        _write(os.path.join(chrome, profile, "Bookmarks"), 10)  # Not a cache, must survive
+    _write(os.path.join(root, "Microsoft", "Edge", "User Data", "Default", "GPUCache", "data_0"), 10)
+    _write(os.path.join(root, "Mozilla", "Firefox", "Profiles", "abcd.default-release", "cache2", "entries", "E1"), 20)
+    return chrome
+
+
+def test_discovers_every_profile_once(tmp_path):
+    _fake_appdata(str(tmp_path))
+    purger = CachePurger(local_appdata=str(tmp_path))
+    found = purger.discover()
+
+    assert len(found["chrome.exe"]) == 4
+    assert [os.path.basename(p) for p in found["msedge.exe"]] == ["GPUCache"]
+    assert [os.path.basename(p) for p in found["firefox.exe"]] == ["cache2"]
+    assert found["brave.exe"] == [] and found["opera.exe"] == []
+    assert purger.discover() is found
+
+
+def test_purge_runs_in_background_and_reports_reclaimed_space(tmp_path):
+    chrome = _fake_appdata(str(tmp_path))
+    purger = CachePurger(local_appdata=str(tmp_path))
+
+    assert purger.request("Chrome.exe") is True
+    assert purger.request("unknown.exe") is False
+    purger.join()
+
+    assert purger.files == 12 and purger.bytes == 2 * (5 * 100 + 50)
+    assert not os.path.exists(os.path.join(chrome, "Default", "Cache"))
+    assert os.path.exists(os.path.join(chrome, "Default", "Bookmarks"))
+    assert os.path.exists(os.path.join(str(tmp_path), "Microsoft", "Edge", "User Data", "Default", "GPUCache"))
+    purger.stop()
+
+
+def test_deletion_rate_is_throttled(tmp_path):
+    cache = os.path.join(str(tmp_path), "Google", "Chrome", "User Data", "Default", "Cache")
+    for index in range(64):
+        _write(os.path.join(cache, f"f_{index}"), 1)
+    purger = CachePurger(local_appdata=str(tmp_path), max_files_per_second=200)
+
+    started = time.perf_counter()
+    result = purger.purge_tree("chrome.exe", cache)
+    assert result.files == 64 and result.errors == 0
+    assert time.perf_counter() - started >= 0.3  # 64 files at 200/s
@@ -0,0 +1,57 @@
+import sys
+import time
+from types import SimpleNamespace
+
+from command_runner import CommandRunner, RecordingCommandRunner
+from lockdown import Lockdown
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_records_exit_code_and_duration():
+    runner = CommandRunner()
+    ok = runner.run(python("pass"))
+    failed = runner.run(python("import sys; sys.stderr.write('boom'); sys.exit(3)"))
+
+    assert ok.ok and ok.duration > 0
+    assert failed.returncode == 3 and failed.error == "boom"
+    assert list(runner.history) == [ok, failed]
+
+
+def test_timeout_and_missing_program_do_not_raise():
+    runner = CommandRunner(timeout=0.5)
+    hung = runner.run(python("import time; time.sleep(30)"))
+    missing = runner.run(["imaanguard-no-such-program"])
+
+    assert hung.returncode is None and "timed out" in hung.error
+    assert hung.duration < 5
+    assert missing.returncode is None and not missing.ok
+
+
+def test_parallel_steps_take_as_long_as_the_slowest():
+    runner = RecordingCommandRunner(latency=0.2)
+    started = time.perf_counter()
+    results = runner.run_parallel([["a"], ["b"], ["c"], ["d"]])
+
+    assert time.perf_counter() - started < 0.6
+    assert [r.args for r in results] == [("a",), ("b",), ("c",), ("d",)]
+    assert all(r.ok for r in results)
+
+
+def test_lock_and_unlock_issue_netsh_steps(tmp_path):
+    runner = RecordingCommandRunner()
+    lockdown = Lockdown(lock_file=str(tmp_path / "lockdown.json"), command_runner=runner)
+    lockdown._network.stats = lambda: {"Wi-Fi": SimpleNamespace(isup=True), "Ethernet": SimpleNamespace(isup=False)}
+    lockdown._disable_internet()
+    locked = set(runner.commands)
+    runner.commands.clear()
+    lockdown.unlock_system()
+
+    assert ("netsh", "interface", "set", "interface", "Wi-Fi", "admin=disable") in locked
+    assert ("netsh", "advfirewall", "firewall", "add", "rule", "name=LockdownBlockAll", "dir=out", "action=block", "enable=yes") in locked
+    assert len(locked) == 3  # Ethernet is down already
+    assert ("explorer.exe",) in runner.commands
+    assert ("netsh", "advfirewall", "firewall", "delete", "rule", "name=LockdownBlockAll") in runner.commands
+    assert set(lockdown.transition_durations) == {"disable_internet", "unlock"}
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import ConfigWatcher, build_matcher, load_config
+from keyboard_monitor import KeyboardMonitor
+from matcher import LayeredAutomaton
+
+
+def write_config(path, **values):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(values, f)
+
+
+def type_text(monitor, text):
+    for char in text:
+        monitor.on_press(SimpleNamespace(char=None, name='space') if char == ' ' else SimpleNamespace(char=char))
+    monitor.process_pending()
+
+
+def test_missing_file_yields_defaults_and_file_overrides_them(tmp_path):
+    path = str(tmp_path / "config.json")
+    assert load_config(path)["lock_durations"] == [30, 60, 120, 240]
+
+    write_config(path, lock_durations=[5], bogus=1)
+    config = load_config(path)
+    assert config["lock_durations"] == [5]
+    assert "bogus" not in config and config["bypass_duration"] == 300
+
+
+def test_swap_keeps_buffered_keystrokes():
+    hits = []
+    monitor = KeyboardMonitor(keywords=["xxx"], lock_callback=lambda: hits.append(True))
+    type_text(monitor, "por")
+    monitor.swap_matcher(build_matcher({"keywords": ["porn"], "keyword_files": [], "keyword_index": None,
+                                        "fuzzy_distance": 0, "leet": None}))
+    assert hits == []
+    type_text(monitor, "n")
+    assert hits == [True]
+
+
+def test_watcher_reloads_changed_file(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_config(path, keywords=["one"])
+    reloaded = threading.Event()
+    seen = []
+    watcher = ConfigWatcher(lambda config: seen.append(config["keywords"]) or reloaded.set(), path, interval=0.05)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        assert seen == []
+        write_config(path, keywords=["two", "three"])
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert reloaded.wait(2)
+        assert seen == [["two", "three"]] and watcher.reloads == 1
+    finally:
+        watcher.stop()
+
+
+def test_broken_config_keeps_running_one(tmp_path):
+    path = str(tmp_path / "config.json")
+    with open(path, "w") as f:
+        f.write("{not json")
+    seen = []
+    watcher = ConfigWatcher(seen.append, path)
+    watcher.reload()
+    assert seen == [] and watcher.reloads == 0
+
+
+@pytest.mark.parametrize("name", ["Game.exe", "game.exe"])
+def test_lockdown_applies_new_policies(tmp_path, name):
+    from lockdown import Lockdown
+    from config import DEFAULT_CONFIG
+
+    class InlineExecutor:
+        def submit(self, fn, *args):
+            fn(*args)
+
+    killed = []
+    lockdown = Lockdown(lock_file=str(tmp_path / "lockdown.json"))
+    lockdown._executor = InlineExecutor()
+    lockdown._kill = lambda proc, policy: killed.append(policy)
+    proc = SimpleNamespace(pid=5, info={'name': name, 'create_time': 1.0})
+    assert lockdown._dispatch(proc) is False
+
+    lockdown.apply_config(dict(DEFAULT_CONFIG, policies={"games": [name], "tools": []}, lock_durations=[7]))
+    assert lockdown._dispatch(proc) is True
+    assert killed == ["games"]
+    assert lockdown.lock_durations == [7] and lockdown.kills_by_policy["games"] == 0
+
+
+def test_index_folded_with_other_leet_table_is_rejected(tmp_path):
+    from keyword_index import compile_index, load_index
+    from normalizer import Normalizer
+
+    index_path = str(tmp_path / "keywords.idx")
+    leet = {"9": "g"}
+    compile_index(["bigboy"], index_path, normalizer=Normalizer(leet=leet))
+    assert load_index(index_path, Normalizer(leet=leet)).search("a bigboy") == "bigboy"
+    with pytest.raises(ValueError):
+        load_index(index_path, Normalizer())
+
+    config = {"keywords": ["xxx"], "keyword_files": [], "keyword_index": index_path, "fuzzy_distance": 0}
+    assert sorted(build_matcher(dict(config, leet=leet)).automaton.keywords) == ["bigboy", "xxx"]
+    assert list(build_matcher(dict(config, leet=None)).automaton.keywords) == ["xxx"]
+
+
+def test_version_1_index_loads_without_the_fingerprint_check(tmp_path):
+    from keyword_index import HEADER, HEADER_V1, compile_index, load_index, resolve_index
+    from normalizer import Normalizer
+
+    index_path = str(tmp_path / "keywords.idx")
+    compile_index(["bigboy"], index_path)
+    with open(resolve_index(index_path), "rb") as f:
+        data = f.read()
+    fields = list(HEADER.unpack_from(data)[:-1])
+    fields[1] = 1
+    legacy_path = str(tmp_path / "legacy.idx")
+    with open(legacy_path, "wb") as f:
+        f.write(HEADER_V1.pack(*fields) + data[HEADER.size:])
+
+    assert load_index(legacy_path, Normalizer(leet={})).search("a bigboy") == "bigboy"
+
+
+def test_config_keywords_are_matched_next_to_the_index(tmp_path):
+    from keyword_index import compile_index
+
+    index_path = str(tmp_path / "keywords.idx")
+    compile_index(["porn", "nude"], index_path)
+    config = {"keywords": ["porn", "nudes", "haram"], "keyword_files": [], "keyword_index": index_path,
+              "fuzzy_distance": 0, "leet": None}
+    matcher = build_matcher(config)
+    assert sorted(matcher.automaton.keywords) == ["haram", "nude", "porn"]
+
+    hits = []
+    monitor = KeyboardMonitor(automaton=matcher.automaton, lock_callback=lambda: hits.append(True))
+    for text in ("watch haram", "harporn", "nud"):
+        type_text(monitor, text)
+        monitor.reset()
+    assert hits == [True, True]
+
+    assert not isinstance(build_matcher(dict(config, keywords=["porn"])).automaton, LayeredAutomaton)
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import diagnostics
+from diagnostics import Diagnostics, SamplingProfiler, diagnostics_enabled, load_profiles, summarize_profiles
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(200))
+
+
+def test_enabled_by_env_or_config(monkeypatch):
+    monkeypatch.delenv(diagnostics.DIAGNOSTICS_ENV, raising=False)
+    assert not diagnostics_enabled({"diagnostics": False})
+    assert diagnostics_enabled({"diagnostics": True})
+    monkeypatch.setenv(diagnostics.DIAGNOSTICS_ENV, "1")
+    assert diagnostics_enabled({"diagnostics": False})
+    monkeypatch.setenv(diagnostics.DIAGNOSTICS_ENV, "0")
+    assert not diagnostics_enabled({"diagnostics": True})
+
+
+def test_profiler_samples_only_named_threads():
+    stop = threading.Event()
+    watched = threading.Thread(target=_busy_loop, args=(stop,), name="KeystrokeConsumer", daemon=True)
+    ignored = threading.Thread(target=_busy_loop, args=(stop,), name="Unrelated", daemon=True)
+    profiler = SamplingProfiler(interval=0.002, threads=("KeystrokeConsumer",))
+    watched.start()
+    ignored.start()
+    profiler.start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+
+    stacks = profiler.take()
+    assert stacks and profiler.samples > 0
+    assert all(stack.startswith("KeystrokeConsumer;") for stack in stacks)
+    assert any("_busy_loop" in stack for stack in stacks)
+    assert not profiler.take()
+
+
+def test_profiles_rotate_and_summarize(tmp_path):
+    diag = Diagnostics(str(tmp_path), keep=2, snapshot_interval=0)
+    for i in range(4):
+        diag.profiler._stacks["Scheduler;_run (scheduler.py:1);_tick (metrics.py:2)"] += i + 1
+        assert diag.write_profile()
+    assert len(list(tmp_path.glob("profile-*.txt"))) == 2
+
+    stacks = load_profiles(str(tmp_path))
+    assert sum(stacks.values()) == 3 + 4
+    lines = summarize_profiles(stacks)
+    assert lines[0] == "7 samples"
+    assert any("_tick (metrics.py:2)" in line for line in lines)
+
+
+def test_allocation_growth_between_snapshots(tmp_path, capsys):
+    diag = Diagnostics(str(tmp_path), sample_interval=0.05, profile_interval=3600, snapshot_interval=3600)
+    diag.start()
+    time.sleep(0.1)  # First snapshot is taken right away on the scheduler thread
+    retained = [bytearray(1024) for _ in range(500)]
+    diag.stop()
+
+    assert len(list(tmp_path.glob("alloc-*.snap"))) == 2
+    diagnostics.main(["summarize", "--dir", str(tmp_path), "--top", "5"])
+    output = capsys.readouterr().out
+    assert "Allocation growth" in output and "test_diagnostics.py" in output
+    del retained
+
+
+def test_runtime_ticks_hand_writes_to_the_executor(tmp_path):
+    from runtime import Runtime
+
+    runtime = Runtime()
+    runtime.start()
+    diag = Diagnostics(str(tmp_path), sample_interval=0.05, profile_interval=3600, snapshot_interval=3600,
+                       scheduler=runtime, executor=runtime.executor)
+    writers = []
+    write_snapshot = diag.write_snapshot
+    diag.write_snapshot = lambda: writers.append(threading.current_thread().name) or write_snapshot()
+    try:
+        diag.start()
+        deadline = time.monotonic() + 5
+        while not writers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        diag.stop()
+    finally:
+        runtime.stop()
+    assert writers and writers[0].startswith("Blocking")
+    assert len(list(tmp_path.glob("alloc-*.snap"))) == 2
@@ -0,0 +1,113 @@
+import os
+import logging
+
+import logger
+from encrypted_log import (EncryptedLogHandler, EncryptedLogReader, EncryptedLogWriter, SEGMENT_PATTERN, load_key,
+                           main, read_index)
+
+KEY = bytes(range(32))
+
+
+def test_range_reads_decrypt_only_covering_chunks(tmp_path):
+    writer = EncryptedLogWriter(str(tmp_path), KEY, segment_size=4096, chunk_size=1024, keep=100)
+    for second in range(1000):
+        writer.write(1000.0 + second, f"line {second} Keyword detected: secret")
+    writer.close()
+
+    entries = read_index(str(tmp_path))
+    assert len(entries) == writer.chunks and writer.records == 1000
+    assert len({entry.segment for entry in entries}) > 1
+    for name in os.listdir(tmp_path):
+        with open(tmp_path / name, "rb") as f:
+            assert b"secret" not in f.read()
+
+    reader = EncryptedLogReader(str(tmp_path), KEY)
+    lines = [line for _, line in reader.read(1500.0, 1509.0)]
+    assert lines == [f"line {second} Keyword detected: secret" for second in range(500, 510)]
+    assert reader.chunks_read <= 2
+    assert len(list(EncryptedLogReader(str(tmp_path), KEY).read())) == 1000
+
+
+def test_tampering_and_rotation(tmp_path):
+    writer = EncryptedLogWriter(str(tmp_path), KEY, segment_size=2048, chunk_size=512, keep=2)
+    for second in range(400):
+        writer.write(float(second), f"record {second:04d} " + "x" * 40)
+    writer.close()
+
+    segments = sorted(name for name in os.listdir(tmp_path) if name.endswith(".igl"))
+    assert len(segments) == 2
+    assert {entry.segment for entry in read_index(str(tmp_path))} == {int(name[8:-4]) for name in segments}
+
+    entry = read_index(str(tmp_path))[-1]
+    with open(tmp_path / SEGMENT_PATTERN.format(entry.segment), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 1]))
+    lines = [line for _, line in EncryptedLogReader(str(tmp_path), KEY).read()]
+    assert lines[-1].endswith("failed authentication]")
+    assert lines[-2].startswith("record ")
+
+
+def test_handler_batches_records_into_chunks(tmp_path, capsys):
+    key_path = str(tmp_path / "log.key")
+    key = load_key(key_path)
+    assert load_key(key_path) == key and len(key) == 32
+
+    handler = EncryptedLogHandler(str(tmp_path / "logs"), key, max_chunk_age=3600)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    log = logging.getLogger("test_encrypted_log")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        for i in range(50):
+            log.warning(f"event {i}")
+        handler.flush()  # Not due yet: still one open chunk
+        assert handler.writer.chunks == 0
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+    assert handler.writer.chunks == 1
+
+    assert main(["--dir", str(tmp_path / "logs"), "--key-file", key_path, "--since", "1h"]) == 0
+    assert capsys.readouterr().out.splitlines() == [f"WARNING event {i}" for i in range(50)]
+
+
+def test_configured_handler_gets_the_record_format(tmp_path):
+    handler = EncryptedLogHandler(str(tmp_path / "logs"), KEY)
+    logger.configure(level="INFO", console=False, extra_handlers=[handler])
+    try:
+        logger.get_logger("keyboard_monitor").warning("Keyword detected: haram")
+    finally:
+        logger.shutdown()
+        logging.getLogger().setLevel(logging.WARNING)
+
+    [(_, line)] = EncryptedLogReader(str(tmp_path / "logs"), KEY).read()
+    assert "[WARNING] [keyboard_monitor.test_configured_handler_gets_the_record_format]: Keyword detected: haram" in line
+
+
+def test_restarts_reuse_the_last_segment_and_prune(tmp_path):
+    for run in range(5):
+        writer = EncryptedLogWriter(str(tmp_path), KEY, segment_size=4096, chunk_size=256, keep=2)
+        writer.write(100.0 + run, f"run {run}")
+        writer.close()
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".igl")) == [SEGMENT_PATTERN.format(1)]
+
+    writer = EncryptedLogWriter(str(tmp_path), KEY, segment_size=4096, chunk_size=256, keep=2)
+    writer.write(50.0, "clock set back " + "x" * 300)  # Sealed at once
+    writer.close()
+    assert [entry.last for entry in read_index(str(tmp_path))] == [100.0, 101.0, 102.0, 103.0, 104.0, 104.0]
+    assert [ts for ts, _ in EncryptedLogReader(str(tmp_path), KEY).read(40.0, 60.0)] == [50.0]
+    for run in range(3):
+        writer = EncryptedLogWriter(str(tmp_path), KEY, segment_size=256, chunk_size=256, keep=2)
+        writer.write(200.0 + run, "y" * 300)
+        writer.close()
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".igl")]) <= 2
+
+    entries = read_index(str(tmp_path))
+    assert [entry.last for entry in entries] == sorted(entry.last for entry in entries)
+    with open(tmp_path / "index.bin", "ab") as f:
+        f.write(b"torn")
+    assert [ts for ts, _ in EncryptedLogReader(str(tmp_path), KEY).read(150.0)] == [202.0]
+    EncryptedLogWriter(str(tmp_path), KEY).close()
+    assert os.path.getsize(tmp_path / "index.bin") % 32 == 0
@@ -0,0 +1,105 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import DEFAULT_CONFIG, build_matcher
+from engine_ipc import BYE, HEADER, KEYS, EngineServer, SessionAgent, WireKey, decode_keys, encode_key, pack, unpack
+from runtime import Runtime
+
+
+class FakeLockdown:
+    def __init__(self):
+        self.locks = 0
+        self.is_locked = False
+        self.threads = []
+
+    def lock_system(self, is_bypass=False, detected_at=None):
+        self.threads.append(threading.current_thread().name)
+        self.locks += 1
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+def type_text(agent, text):
+    for char in text:
+        agent.on_press(SimpleNamespace(name="space") if char == " " else SimpleNamespace(char=char))
+
+
+def test_keys_round_trip_through_the_framing():
+    keys = [SimpleNamespace(char="a"), SimpleNamespace(name="space"), SimpleNamespace(name="shift"),
+            SimpleNamespace(char="\x08"), SimpleNamespace(name="backspace"), SimpleNamespace(char="é")]
+    text = "".join(filter(None, map(encode_key, keys)))
+    frame = pack(KEYS, 3, text.encode("utf-8"))
+
+    kind, dropped, body = unpack(frame)
+    assert (kind, dropped) == (KEYS, 3)
+    assert len(frame) == HEADER.size + len("a \b".encode()) + len("é".encode())
+    assert list(decode_keys(body.decode("utf-8"))) == [WireKey("a", None), WireKey(None, "space"),
+                                                         WireKey(None, "backspace"), WireKey("é", None)]
+    with pytest.raises(ValueError):
+        unpack(bytes([BYE, 99, 0, 0]))
+
+
+def test_agents_share_one_engine_and_matcher(tmp_path):
+    runtime = Runtime()
+    runtime.start()
+    lockdown = FakeLockdown()
+    matcher = build_matcher(dict(DEFAULT_CONFIG, keywords=["haram"], keyword_index=None, fuzzy_distance=0))
+    address = str(tmp_path / "engine.sock")
+    engine = EngineServer(runtime, matcher, lockdown, address=address)
+    engine.start()
+    agents = [SessionAgent(address), SessionAgent(address)]
+    try:
+        for agent in agents:
+            agent.start_sender()
+            assert agent.connected.wait(5)
+        wait_for(lambda: len(engine.sessions) == 2)
+        monitors = [session.monitor for session in engine.sessions.values()]
+        assert monitors[0].automaton is monitors[1].automaton is matcher.automaton
+
+        # Halves of a keyword typed in different sessions do not add up
+        type_text(agents[0], "har")
+        type_text(agents[1], "am ")
+        wait_for(lambda: sum(m.processed_events for m in monitors) == 6)
+        assert lockdown.locks == 0
+
+        type_text(agents[1], "haram")
+        wait_for(lambda: lockdown.locks == 1)
+        # Flipped on the loop; the transition's disk writes run on the blocking pool
+        assert lockdown.is_locked
+        assert lockdown.threads[0].startswith("Blocking")
+    finally:
+        for agent in agents:
+            agent.stop()
+        wait_for(lambda: not engine.sessions)
+        runtime.stop()
+
+
+def test_agent_reconnects_and_delivers_keys_typed_meanwhile(tmp_path):
+    runtime = Runtime()
+    runtime.start()
+    lockdown = FakeLockdown()
+    matcher = build_matcher(dict(DEFAULT_CONFIG, keywords=["haram"], keyword_index=None, fuzzy_distance=0))
+    address = str(tmp_path / "engine.sock")
+    agent = SessionAgent(address)
+    agent.RECONNECT_INTERVAL = 0.05
+    agent.start_sender()
+    type_text(agent, "haram")  # Before the engine is up
+    engine = EngineServer(runtime, matcher, lockdown, address=address)
+    engine.start()
+    try:
+        wait_for(lambda: lockdown.locks == 1)
+        assert agent.batches == 1
+    finally:
+        engine.stop()  # Interrupts the session reader while the agent is still connected
+        assert not engine.sessions
+        agent.stop()
+        runtime.stop()
@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from history_store import HistoryStore, main
+from lockdown import Lockdown
+
+DAY = 86400
+
+
+def test_rolling_counts_and_runs(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    start = 1_700_000_000
+    for day in (0, 1, 2, 10, 11):
+        store.record("violation", start + day * DAY)
+    store.record("violation", start + 5 * DAY)  # Clock set back: kept in order after day 11
+
+    assert store.flushes == 0  # Still batched
+    assert store.count("violation", start, start + 2 * DAY) == 3
+    assert store.count("violation", start + DAY, start + 10 * DAY) == 3
+    assert store.count("violation", start + 11 * DAY, start + 11 * DAY) == 2
+    assert store.count("lock", start, start + 20 * DAY) == 0
+    assert [event.run for event in store.events(start, start + 20 * DAY)] == [1, 2, 3, 1, 2, 3]
+
+    assert store.escalation_level(start + 12 * DAY) == 3
+    assert store.escalation_level(start + 19 * DAY) == 0
+    assert store.clean_streak(start + 12 * DAY) == DAY
+    store.close()
+
+    reopened = HistoryStore(str(tmp_path / "history.db"))
+    assert reopened.last("violation").seq == 6
+    assert reopened.record("violation", start + 12 * DAY).run == 4
+    reopened.close()
+
+
+def test_lock_escalation_comes_from_history(tmp_path, capsys):
+    from command_runner import RecordingCommandRunner
+
+    history = HistoryStore(str(tmp_path / "history.db"), window=timedelta(days=7))
+    history.record("violation", time.time() - 8 * DAY, run=3)  # Before a clean week
+    lockdown = Lockdown(lock_file=str(tmp_path / "lockdown.json"), command_runner=RecordingCommandRunner(),
+                        history=history)
+    lockdown._enforce_restrictions = lambda: 0
+    lockdown.violation_count = 4  # Stale journal count, overruled by the history
+
+    lockdown.lock_system()
+    assert lockdown.lock_duration == lockdown.lock_durations[0]
+    lockdown.lock_system()
+    assert lockdown.lock_duration == lockdown.lock_durations[1]
+    assert history.escalation_level() == 2
+    lockdown.unlock_system()
+    lockdown.close()
+
+    assert main(["--db", str(tmp_path / "history.db"), "--days", "30"]) == 0
+    report = capsys.readouterr().out
+    assert "violation 3" in report and "lock 2" in report and "unlock 1" in report
+    assert "Escalation level: 2" in report
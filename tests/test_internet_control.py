@@ -0,0 +1,102 @@
+import json
+from types import SimpleNamespace
+
+from command_runner import RecordingCommandRunner
+from network_state import NetworkReconciler
+
+
+class Adapters:
+    def __init__(self, **adapters):
+        self.up = dict(adapters)
+
+    def __call__(self):
+        return {name: SimpleNamespace(isup=up, flags="") for name, up in self.up.items()}
+
+
+class NetshRunner(RecordingCommandRunner):
+    """
+    Applies netsh commands to fake adapters and a fake firewall, so results can be read back.
+    """
+
+    dry_run = False
+
+    def __init__(self, adapters: Adapters):
+        super().__init__()
+        self.adapters = adapters
+        self.rules = 0
+
+    def _execute(self, args: tuple, timeout: float):
+        super()._execute(args, timeout)
+        if args[1] == "interface":
+            self.adapters.up[args[4]] = args[5] == "admin=enable"
+        elif args[3] == "add":
+            self.rules += 1
+        elif args[3] == "delete":
+            found, self.rules = self.rules, 0
+            return (0, None) if found else (1, "No rules match the specified criteria.")
+        elif args[3] == "show":
+            return (0, None) if self.rules else (1, "No rules match the specified criteria.")
+        return 0, None
+
+
+def changes(runner):
+    return [command for command in runner.commands if command[3] != "show"]
+
+
+def test_relock_and_steady_state_issue_no_commands(tmp_path):
+    adapters = Adapters(**{"Wi-Fi 2": True, "Ethernet": False, "lo": True})
+    runner = NetshRunner(adapters)
+    network = NetworkReconciler(runner, str(tmp_path / "network_state.json"), stats=adapters)
+
+    network.set_blocked(True)
+    assert changes(runner) == [
+        ("netsh", "interface", "set", "interface", "Wi-Fi 2", "admin=disable"),
+        ("netsh", "advfirewall", "firewall", "add", "rule", "name=LockdownBlockAll", "dir=in", "action=block", "enable=yes"),
+        ("netsh", "advfirewall", "firewall", "add", "rule", "name=LockdownBlockAll", "dir=out", "action=block", "enable=yes"),
+    ]
+    assert runner.rules == 2
+
+    runner.commands.clear()
+    assert network.reconcile() == []
+    assert network.set_blocked(True) == []  # Re-lock
+    assert changes(runner) == [] and runner.rules == 2
+
+
+def test_drift_is_corrected_and_unlock_restores_only_what_was_disabled(tmp_path):
+    adapters = Adapters(**{"Wi-Fi": True, "Ethernet": False})
+    runner = NetshRunner(adapters)
+    state_path = tmp_path / "network_state.json"
+    network = NetworkReconciler(runner, str(state_path), stats=adapters)
+    network.set_blocked(True)
+
+    adapters.up["USB Ethernet"] = True  # Plugged in during the lock
+    adapters.up["Wi-Fi"] = True  # Re-enabled by hand
+    runner.commands.clear()
+    network.reconcile()
+    assert sorted(c[4] for c in changes(runner)) == ["USB Ethernet", "Wi-Fi"]
+    assert json.loads(state_path.read_text())["disabled"] == ["USB Ethernet", "Wi-Fi"]
+
+    # A restart during the lock still knows what to re-enable
+    network = NetworkReconciler(runner, str(state_path), stats=adapters)
+    runner.commands.clear()
+    network.set_blocked(False)
+    assert sorted(changes(runner)) == [
+        ("netsh", "advfirewall", "firewall", "delete", "rule", "name=LockdownBlockAll"),
+        ("netsh", "interface", "set", "interface", "USB Ethernet", "admin=enable"),
+        ("netsh", "interface", "set", "interface", "Wi-Fi", "admin=enable"),
+    ]
+    assert adapters.up == {"Wi-Fi": True, "Ethernet": False, "USB Ethernet": True}
+    assert runner.rules == 0 and network.disabled == set()
+
+
+def test_legacy_adapters_are_enabled_once(tmp_path):
+    runner = RecordingCommandRunner()
+    state_path = str(tmp_path / "network_state.json")
+    network = NetworkReconciler(runner, state_path, legacy_adapters=["Wi-Fi", "Ethernet"], stats=Adapters())
+
+    network.set_blocked(False)
+    assert sorted(command[4] for command in runner.commands if command[1] == "interface") == ["Ethernet", "Wi-Fi"]
+
+    runner.commands.clear()
+    network = NetworkReconciler(runner, state_path, legacy_adapters=["Wi-Fi", "Ethernet"], stats=Adapters())
+    assert network.set_blocked(False) == []
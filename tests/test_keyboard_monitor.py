@@ -0,0 +1,296 @@
+import os
+import random
+import string
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from event_queue import KeyEventRing
+from keyboard_monitor import KeyboardMonitor
+from matcher import FuzzyIndex, KeywordAutomaton
+
+
+def char_key(char):
+    return SimpleNamespace(char=char)
+
+
+def named_key(name):
+    return SimpleNamespace(char=None, name=name)
+
+
+def type_text(monitor, text):
+    for char in text:
+        monitor.on_press(named_key('space') if char == ' ' else char_key(char))
+    monitor.process_pending()
+
+
+@pytest.fixture
+def monitor():
+    hits = []
+    monitor = KeyboardMonitor(keywords=["porn", "xxx", "Nude"], lock_callback=lambda: hits.append(True))
+    monitor.hits = hits
+    return monitor
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton(["he", "she", "hers"])
+    assert automaton.search("ushers") == "she"
+    assert automaton.search("ahxers") is None
+
+
+def test_automaton_reports_suffix_keyword_through_failure_links():
+    automaton = KeywordAutomaton(["abcd", "bc"])
+    state = KeywordAutomaton.ROOT
+    for char in "abc":
+        state = automaton.step(state, char)
+    assert automaton.match(state) == "bc"
+
+
+def test_match_fires_on_completing_keystroke(monitor):
+    type_text(monitor, "por")
+    assert monitor.hits == []
+    type_text(monitor, "n")
+    assert monitor.hits == [True]
+
+
+def test_keyword_inside_longer_word(monitor):
+    type_text(monitor, "superxxxfun")
+    assert monitor.hits == [True]
+
+
+def test_keywords_are_case_insensitive(monitor):
+    type_text(monitor, "NUDE")
+    assert monitor.hits == [True]
+
+
+def test_backspace_rewinds_state(monitor):
+    type_text(monitor, "pora")
+    monitor.on_press(named_key('backspace'))
+    type_text(monitor, "n")
+    assert monitor.hits == [True]
+
+
+def test_enter_resets_stream(monitor):
+    type_text(monitor, "po")
+    monitor.on_press(named_key('enter'))
+    type_text(monitor, "rn")
+    assert monitor.hits == []
+
+
+def test_clean_text_does_not_trigger(monitor):
+    type_text(monitor, "pop corn and nuts")
+    assert monitor.hits == []
+
+
+@pytest.mark.parametrize("text", ["nud3", "ｎｕｄｅ", "nudé", "núde", "пude", "NUDΕ"])
+def test_obfuscated_spellings_are_normalized(monitor, text):
+    type_text(monitor, text)
+    assert monitor.hits == [True]
+
+
+@pytest.mark.parametrize("text", ["p o r n", "por-n", "x.x.x", "p_o r  n"])
+def test_keywords_split_by_separators_are_detected(monitor, text):
+    type_text(monitor, text)
+    assert monitor.hits == [True]
+
+
+@pytest.mark.parametrize("text", ["top ornament", "a pop or nothing", "box x axe"])
+def test_separator_skipping_keeps_words_apart(monitor, text):
+    type_text(monitor, text)
+    assert monitor.hits == []
+
+
+def test_separator_skipping_can_be_disabled():
+    hits = []
+    monitor = KeyboardMonitor(keywords=["porn"], lock_callback=lambda: hits.append(True), skip_separators=False)
+    type_text(monitor, "p o r n por-n")
+    assert hits == []
+
+
+def test_keystroke_buffer_is_a_fixed_ring():
+    from keystroke_buffer import KeystrokeBuffer
+
+    buffer = KeystrokeBuffer(4)
+    for i, char in enumerate("abcdef"):
+        buffer.push(char, i, -i)
+    assert buffer.text() == "cdef" and len(buffer) == 4
+    assert buffer.pop() == ("f", 5, -5)
+    buffer.push(" ", 9, 9)
+    buffer.push("x", 10, 10)
+    assert buffer.word() == "x" and buffer.last(2) == " "
+    for _ in range(4):
+        buffer.pop()
+    assert buffer.pop() is None and buffer.last() == ""
+
+
+def test_normalizer_folds_keywords_and_input_alike():
+    from normalizer import Normalizer
+
+    normalizer = Normalizer(leet={'$': 's'})
+    assert normalizer.text("Ｓe$ﬁ") == "sesfi"
+    assert normalizer.text("s3x") == "s3x"  # Only the configured substitutions apply
+    assert normalizer.keywords(["S3X", "sex", "", "́"]) == ["s3x", "sex"]
+
+
+def test_fuzzy_index_tolerates_edits_on_long_keywords():
+    index = FuzzyIndex(["pornography", "mature"], max_distance=2)
+    assert index.lookup("pronography") == "pornography"
+    assert index.lookup("pornogrphy") == "pornography"
+    assert index.lookup("nature") is None
+    assert index.lookup("photography") is None
+
+
+def test_fuzzy_matching_is_off_without_a_fuzzy_distance(monitor):
+    type_text(monitor, "pronography ")
+    assert monitor.hits == []
+
+
+def test_fuzzy_monitor_detects_misspelled_keyword():
+    hits = []
+    monitor = KeyboardMonitor(keywords=["pornography"], lock_callback=lambda: hits.append(True), fuzzy_distance=2)
+    type_text(monitor, "the pronography")
+    assert hits == []  # Only a completed word is matched fuzzily
+    type_text(monitor, " ")
+    assert hits == [True]
+    type_text(monitor, "pornogrphy")
+    monitor.on_press(named_key('enter'))
+    monitor.process_pending()
+    assert hits == [True, True]
+
+
+def test_words_sharing_a_prefix_with_fuzzy_keywords_do_not_lock():
+    from config import DEFAULT_CONFIG, build_matcher
+
+    hits = []
+    monitor = KeyboardMonitor(lock_callback=lambda: hits.append(True), keywords=[])
+    monitor.swap_matcher(build_matcher(dict(DEFAULT_CONFIG, keyword_index=None)))  # fuzzy_distance 2
+    type_text(monitor, "i lingered there, we stripped the teaser and fitted girders. ")
+    monitor.on_press(named_key('enter'))
+    monitor.process_pending()
+    assert hits == []
+    type_text(monitor, "lingere ")
+    assert hits == [True]
+
+
+class CountingVariants(dict):
+    def __init__(self, variants):
+        super().__init__(variants)
+        self.probes = 0
+
+    def get(self, key, default=None):
+        self.probes += 1
+        return super().get(key, default)
+
+
+def fuzzy_work(keyword_count: int, text: str):
+    """
+    Deletion-index probes and Levenshtein verifications spent typing text with
+    keyword_count random keywords loaded. The wall-clock budget is checked by
+    benchmarks/bench_keyboard_monitor.py --fuzzy 2.
+    """
+    rng = random.Random(7)
+    keywords = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(keyword_count)]
+    monitor = KeyboardMonitor(keywords=keywords, lock_callback=lambda: None, fuzzy_distance=2)
+    index = monitor.fuzzy_index
+    index._variants = CountingVariants(index._variants)
+    verifications = []
+    distance = index._distance
+    index._distance = lambda *args, **kwargs: verifications.append(1) or distance(*args, **kwargs)
+    type_text(monitor, text)
+    return index._variants.probes, len(verifications)
+
+
+def test_fuzzy_work_per_keystroke_does_not_grow_with_keywords():
+    rng = random.Random(11)
+    text = " ".join("".join(rng.choices("etaoinshrdlu", k=rng.randint(2, 12))) for _ in range(300))
+
+    probes_1k, verified_1k = fuzzy_work(1000, text)
+    probes_10k, verified_10k = fuzzy_work(10000, text)
+    # Only deletions of the typed word are probed; the counts differ only where an exact
+    # match reset the word
+    assert probes_10k <= probes_1k * 1.05
+    assert probes_10k <= len(text) * (1 + 12 + 12 * 11 // 2)  # At most C(12, <=2) deletions per keystroke
+    assert verified_10k <= len(text) * 2  # Few candidates survive the index
+
+
+def test_compiled_index_round_trips_through_mmap(tmp_path):
+    from keyword_index import compile_index, load_index
+
+    index_path = str(tmp_path / "keywords.idx")
+    compile_index(["Porn", "xxx", "striptease", "porn"], index_path)
+    automaton = load_index(index_path)
+
+    assert sorted(automaton.keywords) == ["porn", "striptease", "xxx"]
+    assert automaton.search("watching striptease") == "striptease"
+    assert automaton.search("pop corn") is None
+
+
+def test_recompiling_switches_generations_under_a_mapped_index(tmp_path):
+    from keyword_index import compile_index, load_index, resolve_index
+
+    index_path = str(tmp_path / "keywords.idx")
+    compile_index(["nude"], index_path)
+    old = load_index(index_path)
+    compile_index(["nude", "xxx"], index_path)
+
+    assert resolve_index(index_path) == str(tmp_path / "keywords.idx.2")
+    assert sorted(load_index(index_path).keywords) == ["nude", "xxx"]
+    assert old.search("so nude") == "nude"  # The old mapping stays valid
+    assert sorted(os.listdir(tmp_path)) == ["keywords.idx", "keywords.idx.2"]
+
+
+def test_monitor_runs_on_mapped_index(tmp_path):
+    from keyword_index import compile_index, load_index
+
+    index_path = str(tmp_path / "keywords.idx")
+    compile_index(["nude"], index_path)
+    hits = []
+    monitor = KeyboardMonitor(automaton=load_index(index_path), lock_callback=lambda: hits.append(True))
+    type_text(monitor, "nu d nude")
+    assert hits == [True]
+
+
+def test_ring_drops_and_counts_when_full():
+    ring = KeyEventRing(capacity=4)
+    assert all(ring.push(i) for i in range(4))
+    assert ring.push(4) is False
+    assert ring.dropped == 1
+    assert ring.drain(3) == [0, 1, 2]
+    assert ring.depth == 1
+    assert ring.push(5)
+    assert ring.drain() == [3, 5]
+
+
+def test_on_press_only_enqueues(monitor):
+    monitor.on_press(char_key('x'))
+    monitor.on_press(char_key('x'))
+    monitor.on_press(char_key('x'))
+    assert monitor.hits == []
+    assert monitor.stats()['queue_depth'] == 3
+    monitor.process_pending()
+    assert monitor.hits == [True]
+    assert monitor.stats()['processed_events'] == 3
+
+
+def test_consumer_thread_detects_keywords():
+    detected = threading.Event()
+    monitor = KeyboardMonitor(keywords=["porn"], lock_callback=detected.set)
+    monitor.start_consumer()
+    for char in "porn":
+        monitor.on_press(char_key(char))
+    assert detected.wait(2)
+    monitor.stop()
+    assert monitor.stats()['dropped_events'] == 0
+
+
+def test_fuzzy_scope_of_the_default_keywords():
+    from config import DEFAULT_CONFIG, build_matcher
+
+    matcher = build_matcher(dict(DEFAULT_CONFIG, keyword_index=None))
+    fuzzy = matcher.fuzzy_index
+    assert sorted(k for k in DEFAULT_CONFIG["keywords"] if fuzzy.allowed_distance(k)) == ["fitgirl", "lingerie",
+                                                                                           "striptease"]
+    assert fuzzy.lookup("lingere") == "lingerie" and fuzzy.lookup("stripteese") == "striptease"
+    assert fuzzy.lookup("nature") is None and fuzzy.lookup("pron") is None  # Short keywords match exactly only
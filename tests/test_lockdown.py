@@ -0,0 +1,195 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from lockdown import Lockdown
+from session_manager import SessionJournal
+
+
+@pytest.fixture
+def lock_file(tmp_path):
+    return str(tmp_path / "lockdown.json")
+
+
+def test_reapplies_active_lock_from_journal(lock_file, monkeypatch):
+    journal = SessionJournal(lock_file)
+    journal.append({'is_locked': True, 'lock_end_time': time.time() + 600, 'is_bypass': True, 'violation_count': 3}, durable=True)
+    journal.close()
+
+    lockdown = Lockdown(lock_file=lock_file)
+    applied = []
+    monkeypatch.setattr(lockdown, "lock_system",
+                        lambda duration, is_bypass, is_restore: applied.append((duration, is_bypass, is_restore)))
+    lockdown.check_and_reapply_lock()
+
+    assert lockdown.violation_count == 3
+    assert len(applied) == 1
+    assert 590 <= applied[0][0] <= 600 and applied[0][1] is True and applied[0][2] is True
+
+
+def test_restored_lock_is_not_a_new_violation(lock_file):
+    from command_runner import RecordingCommandRunner
+
+    journal = SessionJournal(lock_file)
+    journal.append({'is_locked': True, 'lock_end_time': time.time() + 600, 'violation_count': 2}, durable=True)
+    journal.close()
+
+    lockdown = Lockdown(lock_file=lock_file, command_runner=RecordingCommandRunner())
+    lockdown._enforce_restrictions = lambda: 0
+    lockdown.check_and_reapply_lock()
+
+    assert lockdown.is_locked and 590 <= lockdown.lock_end_time - time.time() <= 600
+    assert lockdown.violation_count == 2
+    lockdown.unlock_system()
+
+
+def test_expired_lock_is_cleared_but_violations_kept(lock_file):
+    last_violation = datetime.now().isoformat()
+    journal = SessionJournal(lock_file)
+    journal.append({'is_locked': True, 'lock_end_time': time.time() - 5, 'violation_count': 2,
+                    'last_violation_time': last_violation}, durable=True)
+    journal.close()
+
+    lockdown = Lockdown(lock_file=lock_file)
+    lockdown.check_and_reapply_lock()
+    lockdown.journal.close()
+
+    assert lockdown.violation_count == 2
+    state = SessionJournal(lock_file).recover()
+    assert state['is_locked'] is False
+    assert state['violation_count'] == 2
+
+
+def test_fresh_start_without_state(lock_file):
+    lockdown = Lockdown(lock_file=lock_file)
+    lockdown.violation_count = 4
+    lockdown.check_and_reapply_lock()
+    assert lockdown.violation_count == 1
+
+
+class FakeProcess:
+    def __init__(self, pid, name, create_time=1.0, fail=None):
+        self.pid = pid
+        self.info = {'name': name, 'create_time': create_time}
+        self.fail = fail
+        self.kills = 0
+
+    def kill(self):
+        self.kills += 1
+        if self.fail:
+            raise self.fail
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def enforcing(lock_file, monkeypatch):
+    import process_snapshot
+
+    table = []
+    monkeypatch.setattr(process_snapshot.psutil, "process_iter", lambda attrs: iter(list(table)))
+    lockdown = Lockdown(lock_file=lock_file)
+    lockdown._executor = InlineExecutor()
+    return lockdown, table
+
+
+def test_tick_only_evaluates_new_processes(enforcing):
+    lockdown, table = enforcing
+    shell = FakeProcess(10, "cmd.exe")
+    table += [FakeProcess(1, "svchost.exe"), shell, FakeProcess(11, "chrome.exe")]
+    lockdown._enforce_restrictions()
+    lockdown._enforce_restrictions()
+
+    assert shell.kills == 1
+    assert lockdown.kills_by_policy == {'tools': 1, 'network': 1, 'explorer': 0}
+
+
+def test_browser_cache_purge_is_queued_not_run_inline(enforcing):
+    lockdown, table = enforcing
+    requested = []
+    lockdown._cache_purger.request = requested.append
+    lockdown.ENABLE_CACHE_NUKE = True
+    browser = FakeProcess(11, "Chrome.exe")
+    table.append(browser)
+    lockdown._enforce_restrictions()
+
+    assert browser.kills == 1
+    assert requested == ["chrome.exe"]
+
+
+def test_reused_pid_is_evaluated_again(enforcing):
+    lockdown, table = enforcing
+    table.append(FakeProcess(10, "taskmgr.exe", create_time=1.0))
+    lockdown._enforce_restrictions()
+    table[:] = [FakeProcess(10, "taskmgr.exe", create_time=2.0)]
+    lockdown._enforce_restrictions()
+
+    assert lockdown.kills_by_policy['tools'] == 2
+    assert lockdown._killed_pids == {(10, 2.0)}
+
+
+def test_failed_kill_is_retried_next_tick(enforcing):
+    import psutil
+
+    lockdown, table = enforcing
+    stubborn = FakeProcess(12, "powershell.exe", fail=psutil.AccessDenied(12))
+    table.append(stubborn)
+    lockdown._enforce_restrictions()
+    lockdown._enforce_restrictions()
+
+    assert stubborn.kills == 2
+    assert lockdown._killed_pids == set()
+
+
+def test_lock_expires_on_schedule_and_extension_moves_expiry(lock_file):
+    from command_runner import RecordingCommandRunner
+
+    lockdown = Lockdown(lock_file=lock_file, command_runner=RecordingCommandRunner())
+    lockdown._enforce_restrictions = lambda: 0
+    try:
+        started = time.monotonic()
+        lockdown.lock_system(duration=1)
+        lockdown.lock_system(duration=2)
+        assert lockdown._expiry_task.remaining() > 1.5
+
+        assert lockdown.unlocked.wait(timeout=10)
+        assert time.monotonic() - started >= 1.9
+        assert not lockdown.is_locked
+        assert not lockdown._enforcement_task.active
+    finally:
+        lockdown.close()
+
+
+def test_violation_after_expiry_fired_keeps_the_lock(lock_file):
+    from command_runner import RecordingCommandRunner
+
+    lockdown = Lockdown(lock_file=lock_file, command_runner=RecordingCommandRunner())
+    lockdown._enforce_restrictions = lambda: 0
+    try:
+        lockdown.lock_system(duration=60)
+        expired = lockdown._generation  # The timer fired; its unlock is still queued on the pool
+        lockdown._scheduler.cancel(lockdown._expiry_task)
+        lockdown.lock_system(duration=60)
+        lockdown._expire_lock(expired)
+
+        assert lockdown.is_locked
+        assert lockdown._expiry_task.active
+        assert not lockdown.unlocked.is_set()
+    finally:
+        lockdown.close()
+
+
+def test_decay_is_scheduled_for_the_end_of_the_clean_streak(lock_file):
+    from datetime import timedelta
+
+    lockdown = Lockdown(lock_file=lock_file)
+    lockdown.violation_count = 3
+    lockdown.last_violation_time = datetime.now() - timedelta(days=7) + timedelta(seconds=30)
+    assert 25 <= lockdown._seconds_until_decay() <= 30
+
+    lockdown.last_violation_time = datetime.now() - timedelta(days=1)
+    assert lockdown._seconds_until_decay() == Lockdown.DECAY_CHECK_INTERVAL
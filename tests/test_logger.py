@@ -0,0 +1,76 @@
+import logging
+import queue
+
+import pytest
+
+import logger
+
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+    yield
+    logger.shutdown()
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.flushes = 0
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_records_reach_the_log_file(tmp_path):
+    log_file = tmp_path / "lockdown.log"
+    logger.configure(level="INFO", console=False, log_file=str(log_file))
+    log = logger.get_logger("lockdown")
+    log.info("lock applied")
+    log.debug("not written")
+    logger.shutdown()
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 1
+    assert "[INFO] [lockdown.test_records_reach_the_log_file]: lock applied" in lines[0]
+
+
+def test_module_levels_override_root(tmp_path, monkeypatch):
+    monkeypatch.setenv(logger.MODULES_ENV, "anti_bypass=DEBUG")
+    handler = CountingHandler()
+    logger.configure(level="WARNING", console=False, module_levels={"keyboard_monitor": "DEBUG"}, extra_handlers=[handler])
+    logger.get_logger("keyboard_monitor").debug("monitor debug")
+    logger.get_logger("anti_bypass").debug("watchdog debug")
+    logger.get_logger("lockdown").info("lockdown info")
+    logger.shutdown()
+
+    assert handler.records == ["monitor debug", "watchdog debug"]
+    logging.getLogger("keyboard_monitor").setLevel(logging.NOTSET)
+    logging.getLogger("anti_bypass").setLevel(logging.NOTSET)
+
+
+def test_listener_flushes_once_per_batch():
+    log_queue = queue.SimpleQueue()
+    handler = CountingHandler()
+    for i in range(100):
+        log_queue.put(logging.LogRecord("t", logging.INFO, __file__, 1, f"record {i}", None, None))
+    listener = logger.BatchingQueueListener(log_queue, [handler], batch_size=64)
+    listener.start()
+    listener.stop()
+
+    assert len(handler.records) == 100
+    assert handler.flushes == listener.batches <= 3
+
+
+def test_disabled_debug_is_not_enqueued():
+    handler = CountingHandler()
+    logger.configure(level="INFO", console=False, extra_handlers=[handler])
+    log = logger.get_logger("keyboard_monitor")
+    for _ in range(1000):
+        log.debug("keystroke")
+    logger.shutdown()
+    assert handler.records == []
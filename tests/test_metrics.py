@@ -0,0 +1,52 @@
+import json
+from types import SimpleNamespace
+
+from metrics import Histogram, MetricsRegistry, StatsWriter
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram((1, 10, 100))
+    for value in [0.5, 5, 5, 50, 500]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"<=1": 1, "<=10": 2, "<=100": 1, ">100": 1}
+    assert snapshot["count"] == 5 and snapshot["max"] == 500
+    assert histogram.percentile(0.5) == 10
+    assert histogram.percentile(0.99) == 500
+
+
+def test_registry_returns_the_same_metric():
+    registry = MetricsRegistry()
+    registry.counter("kills.tools").inc()
+    registry.counter("kills.tools").inc(2)
+    registry.gauge("scan").set(7)
+    metrics = registry.snapshot()["metrics"]
+    assert metrics == {"kills.tools": 3, "scan": 7}
+
+
+def test_stats_writer_replaces_file(tmp_path):
+    registry = MetricsRegistry()
+    registry.histogram("tick_ms").observe(3)
+    writer = StatsWriter(str(tmp_path / "stats.json"), registry=registry)
+    writer.write()
+    with open(tmp_path / "stats.json") as f:
+        stats = json.load(f)
+    assert stats["metrics"]["tick_ms"]["count"] == 1
+    assert not (tmp_path / "stats.json.tmp").exists()
+
+
+def test_monitor_records_keystroke_metrics():
+    import metrics
+    from keyboard_monitor import KeyboardMonitor
+
+    monitor = KeyboardMonitor(keywords=["xxx"], lock_callback=lambda: None)
+    handled = metrics.histogram("keystroke.handle_us").count
+    detections = metrics.counter("keystroke.detections").value
+    for char in "axxx" * 20:
+        monitor.on_press(SimpleNamespace(char=char))
+        monitor.process_pending()
+
+    assert metrics.histogram("keystroke.handle_us").count == handled + 80
+    assert metrics.counter("keystroke.detections").value == detections + 20
+    assert monitor.last_detection is not None
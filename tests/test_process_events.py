@@ -0,0 +1,55 @@
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from process_events import NetlinkProcessEventSource, PollingProcessEventSource
+
+
+def wait_for_spawn(source, timeout=5.0):
+    seen = {}
+    found = threading.Event()
+    target = {}
+
+    def on_process(proc):
+        seen[proc.pid] = proc.info['name']
+        if proc.pid == target.get('pid'):
+            found.set()
+
+    source.start(on_process)
+    time.sleep(0.2)
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(2)"])
+    target['pid'] = child.pid
+    if child.pid in seen:
+        found.set()
+    try:
+        assert found.wait(timeout)
+        return time.perf_counter() - started
+    finally:
+        source.stop()
+        child.kill()
+        child.wait()
+
+
+def test_polling_source_reports_new_processes():
+    wait_for_spawn(PollingProcessEventSource(interval=0.1))
+
+
+@pytest.mark.skipif(not NetlinkProcessEventSource.available(), reason="proc connector needs Linux and CAP_NET_ADMIN")
+def test_netlink_source_reports_exec_within_milliseconds():
+    latency = wait_for_spawn(NetlinkProcessEventSource())
+    assert latency < 1.0
+
+
+def test_netlink_parser_extracts_exec_tgid():
+    def message(what, pid, tgid):
+        event = struct.pack("=IIQ", what, 0, 0) + struct.pack("=II", pid, tgid)
+        cn_msg = struct.pack("=IIIIHH", 1, 1, 0, 0, len(event), 0)
+        return struct.pack("=IHHII", 16 + len(cn_msg) + len(event), 3, 0, 0, 0) + cn_msg + event
+
+    data = message(0x1, 5, 5) + message(0x2, 42, 40)
+    assert list(NetlinkProcessEventSource._parse_exec_pids(data)) == [40]
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from runtime import Runtime
+
+
+def _started():
+    runtime = Runtime(max_workers=2)
+    runtime.start()
+    return runtime
+
+
+def test_timers_repeat_reschedule_and_cancel():
+    runtime = _started()
+    ticks = []
+    fired = threading.Event()
+
+    def tick():
+        ticks.append(threading.current_thread().name)
+        return 0.01 if len(ticks) < 3 else None
+
+    runtime.call_later(0, tick)
+    late = runtime.call_later(10, fired.set)
+    runtime.reschedule(late, 0.05)
+    cancelled = runtime.call_later(0.02, lambda: ticks.append("cancelled"))
+    runtime.cancel(cancelled)
+
+    assert fired.wait(2)
+    time.sleep(0.05)
+    runtime.stop()
+    assert ticks == ["Runtime"] * 3
+    assert not late.active and not cancelled.active
+
+
+def test_keystrokes_are_bridged_onto_the_loop():
+    from keyboard_monitor import KeyboardMonitor
+    from types import SimpleNamespace
+
+    runtime = _started()
+    detected = threading.Event()
+    monitor = KeyboardMonitor(keywords=["haram"], lock_callback=detected.set)
+    monitor.start_consumer(runtime)
+    for char in "xharam":
+        monitor.on_press(SimpleNamespace(char=char))
+
+    assert detected.wait(2)
+    assert monitor.processed_events == 6
+    assert monitor._consumer_thread is None  # No detection thread of its own
+    runtime.stop()
+
+
+def test_shutdown_runs_steps_in_reverse_and_drains_blocking_work():
+    runtime = Runtime(max_workers=2)
+    order = []
+    runtime.on_shutdown(lambda: order.append("lockdown"), "lockdown")
+    runtime.on_shutdown(lambda: order.append("monitor"), "monitor")
+
+    async def main():
+        result = await runtime.run_blocking(lambda: threading.current_thread().name)
+        runtime.call_later(3600, lambda: order.append("never"))
+        runtime.request_stop()
+        return result
+
+    assert runtime.run(main()).startswith("Blocking")
+    assert order == ["monitor", "lockdown"]
+    assert runtime.pending == 0 and runtime.loop.is_closed()
+    assert runtime.wait_stopped(0)
+
+
+def test_stop_from_another_thread():
+    runtime = Runtime()
+    threading.Timer(0.05, runtime.request_stop).start()
+    runtime.run()
+    assert runtime.wait_stopped(0)
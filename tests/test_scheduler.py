@@ -0,0 +1,62 @@
+import time
+import threading
+
+import pytest
+
+from scheduler import Scheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler()
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_runs_tasks_in_deadline_order(scheduler):
+    order = []
+    done = threading.Event()
+    scheduler.call_later(0.15, lambda: done.set() or order.append("late"))
+    scheduler.call_later(0.05, lambda: order.append("early"))
+    assert done.wait(2)
+    time.sleep(0.02)
+    assert order == ["early", "late"]
+
+
+def test_cancel_and_reschedule(scheduler):
+    fired = []
+    cancelled = scheduler.call_later(0.05, lambda: fired.append("cancelled"))
+    moved = scheduler.call_later(5, lambda: fired.append("moved"))
+    scheduler.cancel(cancelled)
+    scheduler.reschedule(moved, 0.05)
+    time.sleep(0.3)
+
+    assert fired == ["moved"]
+    assert not cancelled.active and not moved.active
+
+
+def test_periodic_task_sets_its_own_interval(scheduler):
+    calls = []
+
+    def tick():
+        calls.append(time.monotonic())
+        return 0.02 if len(calls) < 5 else None
+
+    scheduler.call_later(0, tick)
+    time.sleep(0.4)
+    assert len(calls) == 5
+
+
+def test_idle_scheduler_does_not_wake(scheduler):
+    scheduler.call_later(60, lambda: None)
+    time.sleep(0.3)
+    assert scheduler.wakeups <= 1
+    assert scheduler.pending == 1
+
+
+def test_failing_task_does_not_stop_the_scheduler(scheduler):
+    done = threading.Event()
+    scheduler.call_later(0, lambda: 1 / 0)
+    scheduler.call_later(0.05, done.set)
+    assert done.wait(2)
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from session_manager import SessionJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SessionJournal(str(tmp_path / "lockdown.json"), compact_every=4, fsync_interval=0.01)
+    yield journal
+    journal.close()
+
+
+def reopen(journal):
+    return SessionJournal(journal.snapshot_path, compact_every=journal.compact_every)
+
+
+def test_fresh_journal_recovers_nothing(journal):
+    assert journal.recover() is None
+
+
+def test_appends_only_write_changed_fields(journal):
+    journal.append({'is_locked': True, 'violation_count': 2}, durable=True)
+    journal.append({'is_locked': True, 'violation_count': 3})
+    journal.append({'is_locked': True, 'violation_count': 3})
+    journal.sync()
+
+    with open(journal.journal_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{'is_locked': True, 'violation_count': 2}, {'violation_count': 3}]
+    assert reopen(journal).recover() == {'is_locked': True, 'violation_count': 3}
+
+
+def test_compaction_writes_snapshot_and_truncates_journal(journal):
+    for count in range(1, 6):
+        journal.append({'violation_count': count})
+    journal.sync()
+
+    with open(journal.snapshot_path) as f:
+        assert json.load(f) == {'violation_count': 4}
+    with open(journal.journal_path) as f:
+        assert f.read() == '{"violation_count":5}\n'
+    assert reopen(journal).recover() == {'violation_count': 5}
+
+
+def test_torn_tail_is_ignored_and_repaired(journal):
+    journal.append({'is_locked': True, 'lock_end_time': 100}, durable=True)
+    with open(journal.journal_path, "a") as f:
+        f.write('{"is_locked": fal')
+
+    recovered = reopen(journal)
+    assert recovered.recover() == {'is_locked': True, 'lock_end_time': 100}
+    recovered.append({'is_locked': False}, durable=True)
+    recovered.close()
+    assert reopen(journal).recover() == {'is_locked': False, 'lock_end_time': 100}
+
+
+def test_append_before_recover_keeps_persisted_state(journal):
+    journal.append({'is_locked': True, 'lock_duration': 7200, 'violation_count': 2}, durable=True)
+    journal.compact()
+    journal.close()
+
+    restarted = reopen(journal)  # recover() not called
+    restarted.compact_every = 1  # This append compacts at once
+    restarted.append({'last_violation_time': 'now'})
+    restarted.close()
+    assert reopen(journal).recover() == {'is_locked': True, 'lock_duration': 7200, 'violation_count': 2,
+                                         'last_violation_time': 'now'}